@@ -0,0 +1,174 @@
+"""
+Yoğun okunan GET uçlarının async karşılıkları.
+
+Bu view'lar DRF yerine doğrudan Django'nun async view desteğini ve async ORM'ini
+kullanır; ASGI altında (uvicorn worker) bir istek veritabanını beklerken worker
+thread'i tutmaz ve tek worker çok sayıda eşzamanlı polling istemcisine hizmet
+verebilir. Yanıt gövdeleri sync uçlarla byte bazında aynıdır. Uçlar AllowAny
+olduğu için kimlik doğrulama yapılmaz.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET
+from rest_framework.renderers import JSONRenderer
+
+from sigorta_api.middleware import timed
+
+from .conditional import build_validators, set_validator_headers
+from .cookies import cookie_jar_queryset, cookie_jar_response
+from .models import (
+    Company, InsuranceCompany, InsuranceCompanyCookie, InsuranceCompanyItem, Partage, QueryType
+)
+from .serializers import (
+    InsuranceCompanyCookieSerializer, InsuranceCompanyItemDetailSerializer,
+    InsuranceCompanyItemSerializer, sibling_candidates
+)
+from .totp import aresolve_totp_secret, get_totp
+from .versions import aget_versions
+
+# Öğe yanıtlarının bağlı olduğu modeller (InsuranceCompanyItemViewSet.conditional_models ile aynı)
+ITEM_MODELS = [InsuranceCompanyItem, InsuranceCompanyCookie, InsuranceCompany, Partage, Company, QueryType]
+COOKIE_MODELS = [InsuranceCompanyItem, InsuranceCompanyCookie]
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def not_found(model):
+    return json_response(
+        {"detail": f"No {model._meta.object_name} matches the given query."}, status=404
+    )
+
+
+def item_queryset():
+    """Liste serializer'ının ihtiyaç duyduğu ilişkileri önceden yükleyen sorgu."""
+    return InsuranceCompanyItem.objects.select_related('insurance_company').prefetch_related('query_types', 'cookies')
+
+
+async def abuild_sibling_groups(items):
+    """serializers.build_sibling_groups'un async ORM ile çalışan karşılığı."""
+    groups, candidate_querysets = sibling_candidates(items)
+    for candidates in candidate_querysets:
+        async for candidate in candidates:
+            group = groups.get((candidate.partage_id, candidate.insurance_company_id))
+            if group is not None:
+                group.append(candidate)
+    return groups
+
+
+@sync_to_async(thread_sensitive=False)
+def render_items(items, sibling_groups):
+    # Veriler önceden yüklendiği için serialize işlemi veritabanına dokunmaz;
+    # CPU ağırlıklı bu adım event loop'u bloklamasın diye ayrı thread'de çalışır
+    serializer = InsuranceCompanyItemSerializer(items, many=True, context={'sibling_groups': sibling_groups})
+    with timed('serialize'):
+        data = serializer.data
+    return JSONRenderer().render(data)
+
+
+async def conditional(request, models, handler):
+    """
+    Sürüm sayaçlarından ETag/Last-Modified üretir; istemcinin kopyası güncelse
+    handler hiç çalışmadan 304 döner.
+    """
+    validators = build_validators(request, models, await aget_versions(models))
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp())
+    )
+    if response is None:
+        response = await handler()
+    if response.status_code == 304 or 200 <= response.status_code < 300:
+        set_validator_headers(response, validators)
+    return response
+
+
+async def item_list_response(request, queryset):
+    async def handler():
+        items = [item async for item in queryset]
+        sibling_groups = await abuild_sibling_groups(items)
+        content = await render_items(items, sibling_groups)
+        return HttpResponse(content, content_type='application/json')
+    return await conditional(request, ITEM_MODELS, handler)
+
+
+@require_GET
+async def item_detail(request, pk):
+    """InsuranceCompanyItemViewSet.retrieve ile aynı çıktı."""
+    async def handler():
+        try:
+            item = await InsuranceCompanyItem.objects.select_related(
+                'insurance_company', 'company', 'partage'
+            ).prefetch_related('query_types', 'cookies').aget(pk=pk)
+        except InsuranceCompanyItem.DoesNotExist:
+            return not_found(InsuranceCompanyItem)
+        with timed('serialize'):
+            data = InsuranceCompanyItemDetailSerializer(item).data
+        return json_response(data)
+    return await conditional(request, ITEM_MODELS, handler)
+
+
+@require_GET
+async def item_cookies(request, pk):
+    """InsuranceCompanyItemViewSet.get_cookies ile aynı çıktı."""
+    async def handler():
+        if not await InsuranceCompanyItem.objects.filter(pk=pk).aexists():
+            return not_found(InsuranceCompanyItem)
+        cookies = [
+            cookie async for cookie in InsuranceCompanyCookie.objects.filter(insurance_company_item_id=pk)
+        ]
+        with timed('serialize'):
+            data = InsuranceCompanyCookieSerializer(cookies, many=True).data
+        return json_response(data)
+    return await conditional(request, COOKIE_MODELS, handler)
+
+
+@require_GET
+async def item_cookie_jar(request, pk):
+    """InsuranceCompanyItemViewSet.cookie_jar ile aynı çıktı."""
+    row = await cookie_jar_queryset(pk).afirst()
+    if row is None:
+        if not await InsuranceCompanyItem.objects.filter(pk=pk).aexists():
+            return not_found(InsuranceCompanyItem)
+        row = (0, '[]', None)
+    return cookie_jar_response(request, pk, *row)
+
+
+@require_GET
+async def active_items(request):
+    """InsuranceCompanyItemViewSet.active_items ile aynı çıktı."""
+    return await item_list_response(request, item_queryset().filter(is_active=True))
+
+
+@require_GET
+async def car_query_items(request):
+    """InsuranceCompanyItemViewSet.car_query_items ile aynı çıktı."""
+    return await item_list_response(request, item_queryset().filter(is_car_query=True))
+
+
+@require_GET
+async def generate_totp(request):
+    """views.generate_totp ile aynı çıktı ve hata mesajları."""
+    try:
+        username = request.GET.get('username')
+        password = request.GET.get('password')
+
+        if not username or not password:
+            return json_response({"error": "username ve password parametreleri gereklidir."}, status=400)
+
+        try:
+            totp_code = await aresolve_totp_secret(username, password)
+        except InsuranceCompanyItem.DoesNotExist:
+            return json_response({"error": "Geçersiz kullanıcı adı veya şifre."}, status=404)
+
+        if not totp_code or totp_code.strip() == "":
+            return json_response({"error": "TOTP secret bulunamadı."}, status=500)
+
+        return json_response(int(get_totp(totp_code).now()))
+
+    except Exception as e:
+        return json_response({"error": "HATA: " + str(e)}, status=500)
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from sigorta_api.db_router import use_primary
+from sigorta_api.metrics import record_cache
+
+
+def token_cache_key(key):
+    # Token anahtarı cache'e açık halde yazılmaz
+    return f"auth_token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token'ı kullanıcı, şirket kullanıcısı ve şirket ile birlikte tek sorguda
+    çözer ve kısa süreli cache'te tutar. Böylece request.user.companyuser ve
+    .company erişimleri ek sorgu gerektirmez. Cache kaydı çıkış, token
+    yenileme, kullanıcı/şirket değişikliklerinde api.signals tarafından silinir.
+    Cache süreç başına (LocMem) ise silme diğer worker'lara ulaşmayacağı için
+    token cache'lenmez ve her istekte veritabanından çözülür.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = None
+        if settings.CACHE_IS_SHARED:
+            token = cache.get(cache_key)
+            record_cache('auth_token', token is not None)
+        if token is None:
+            try:
+                with use_primary():
+                    token = Token.objects.select_related(
+                        'user', 'user__companyuser', 'user__companyuser__company'
+                    ).get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if settings.CACHE_IS_SHARED:
+                cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class CompanyUserBackend(ModelBackend):
+    """
+    ModelBackend ile aynı kuralları uygular (şifre kontrolü, is_active,
+    kullanıcı yoksa zamanlama için yine de hash hesaplanması). Kullanıcıyı
+    şirket kullanıcısı, şirket ve token ile birlikte tek sorguda (join) yükler;
+    böylece company_login bu kayıtlar için ek sorgu yapmaz.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related(
+                'companyuser__company', 'auth_token'
+            ).get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Zamanlama farkından kullanıcı adı tahmin edilmesin diye hash yine de hesaplanır
+            UserModel().set_password(password)
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        return None
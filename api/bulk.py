@@ -0,0 +1,153 @@
+"""
+InsuranceCompanyItem toplu oluşturma/güncelleme (bulk_upsert).
+
+Tüm satırlar tek geçişte doğrulanır; ilişkili kayıtların varlığı satır başına
+değil model başına tek sorguyla denetlenir. Geçerli satırlar tek transaction
+içinde toplu INSERT / UPDATE ile, sorgu türü ara tablo satırları tek bir INSERT
+ile yazılır. Sorgu sayısı satır sayısından bağımsızdır.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Company, InsuranceCompany, InsuranceCompanyItem, Partage, QueryType, make_credential_hash
+from .serializers import InsuranceCompanyItemBulkSerializer
+from .signals import delete_cache_keys
+from .totp import totp_cache_key
+from .versions import mark_changed
+
+MAX_BULK_ROWS = 5000
+# PostgreSQL'in ifade başına 65535 parametre sınırının altında kalır
+BATCH_SIZE = 2000
+
+RELATED_MODELS = {'insurance_company': InsuranceCompany, 'company': Company, 'partage': Partage}
+CREATE_REQUIRED_FIELDS = ('insurance_company', 'company')
+
+
+def row_error(index, errors):
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def validate_rows(rows):
+    """
+    Satırları doğrular; (index, veri) listesi ve hatalı satırların sonuçlarını döndürür.
+    İlişkiler, güncellenecek öğeler ve sorgu türleri model başına tek sorguyla okunur.
+    """
+    validator = InsuranceCompanyItemBulkSerializer(partial=True)
+    errors = {}
+    valid = []
+    seen_ids = set()
+    for index, row in enumerate(rows):
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as e:
+            errors[index] = row_error(index, e.detail)
+            continue
+        if 'id' in data:
+            if data['id'] in seen_ids:
+                errors[index] = row_error(index, {'id': ["Duplicate id in request."]})
+                continue
+            seen_ids.add(data['id'])
+        else:
+            missing = [field for field in CREATE_REQUIRED_FIELDS if field not in data]
+            if missing:
+                errors[index] = row_error(index, {field: ["This field is required."] for field in missing})
+                continue
+        valid.append((index, data))
+
+    known = {
+        field: set(model.objects.filter(
+            pk__in={data[field] for _, data in valid if data.get(field) is not None}
+        ).values_list('pk', flat=True))
+        for field, model in RELATED_MODELS.items()
+    }
+    items = InsuranceCompanyItem.objects.in_bulk(seen_ids)
+    query_type_ids = dict(QueryType.objects.values_list('name', 'pk'))
+
+    checked = []
+    for index, data in valid:
+        row_errors = {
+            field: [f'Invalid pk "{data[field]}" - object does not exist.']
+            for field in RELATED_MODELS
+            if data.get(field) is not None and data[field] not in known[field]
+        }
+        if 'id' in data and data['id'] not in items:
+            row_errors['id'] = ["Not found."]
+        unknown = [code for code in data.get('query_types', []) if code not in query_type_ids]
+        if unknown:
+            row_errors['query_types'] = [f'Unknown query type "{code}".' for code in unknown]
+        if row_errors:
+            errors[index] = row_error(index, row_errors)
+        else:
+            checked.append((index, data))
+    return checked, errors, items, query_type_ids
+
+
+def bulk_upsert_items(rows, all_or_nothing=False):
+    """
+    id içeren satırları günceller (sadece gönderilen alanlar), diğerlerini oluşturur.
+    query_types verilen satırlarda öğenin sorgu türleri verilen kodlarla değiştirilir.
+    Satır sırasıyla sonuç listesi ve yazım yapılıp yapılmadığını döndürür;
+    all_or_nothing ile tek bir hatalı satır tüm isteği reddeder.
+    """
+    checked, errors, items, query_type_ids = validate_rows(rows)
+    if errors and (all_or_nothing or not checked):
+        return [errors.get(index, {'index': index, 'status': 'skipped'}) for index in range(len(rows))], False
+
+    now = timezone.now()
+    results = dict(errors)
+    created, updated, update_fields = [], [], set()
+    replaced_ids, query_types = [], []
+    credential_hashes = set()
+
+    for index, data in checked:
+        codes = data.pop('query_types', None)
+        item_id = data.pop('id', None)
+        if item_id is None:
+            item = InsuranceCompanyItem()
+            created.append((index, item))
+        else:
+            item = items[item_id]
+            credential_hashes.add(item.credential_hash)
+            updated.append((index, item))
+            update_fields.update(data)
+            if codes is not None:
+                replaced_ids.append(item_id)
+        for name, value in data.items():
+            setattr(item, InsuranceCompanyItem._meta.get_field(name).attname, value)
+        # bulk_create/bulk_update save() çağırmadığı için özet elle hesaplanır
+        item.credential_hash = make_credential_hash(item.username, item.password)
+        credential_hashes.add(item.credential_hash)
+        if codes is not None:
+            query_types.append((item, dict.fromkeys(codes)))
+
+    through = InsuranceCompanyItem.query_types.through
+    with transaction.atomic():
+        if created:
+            InsuranceCompanyItem.objects.bulk_create([item for _, item in created], batch_size=BATCH_SIZE)
+        if updated:
+            for _, item in updated:
+                item.updated_at = now
+            InsuranceCompanyItem.objects.bulk_update(
+                [item for _, item in updated],
+                sorted(update_fields | {'credential_hash', 'updated_at'}),
+                batch_size=BATCH_SIZE
+            )
+        if replaced_ids:
+            through.objects.filter(insurancecompanyitem_id__in=replaced_ids).delete()
+        through_rows = [
+            through(insurancecompanyitem_id=item.pk, querytype_id=query_type_ids[code])
+            for item, codes in query_types
+            for code in codes
+        ]
+        if through_rows:
+            through.objects.bulk_create(through_rows, batch_size=BATCH_SIZE * 10)
+        # Toplu işlemler sinyal göndermediği için sürüm sayacı ve TOTP cache'i elle güncellenir
+        mark_changed(InsuranceCompanyItem)
+        delete_cache_keys(totp_cache_key(credential_hash) for credential_hash in credential_hashes if credential_hash)
+
+    for index, item in created:
+        results[index] = {'index': index, 'status': 'created', 'id': item.pk}
+    for index, item in updated:
+        results[index] = {'index': index, 'status': 'updated', 'id': item.pk}
+    return [results[index] for index in range(len(rows))], True
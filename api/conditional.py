@@ -0,0 +1,94 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .versions import get_versions, version_name
+
+
+def build_validators(request, models, versions):
+    """
+    İstek adresi ve modellerin sürüm sayaçlarından (ETag, Last-Modified) üretir.
+    Son değişiklik zamanı da ETag'e girer; cookie sayacında bu zaman süresi dolan
+    cookie'lerle ilerler (versions.changed_at).
+    """
+    parts = [request.get_host(), request.get_full_path()]
+    last_modified = None
+    for model in models:
+        version, updated_at = versions.get(version_name(model), (0, None))
+        parts.append(f"{version_name(model)}:{version}:{updated_at and updated_at.timestamp()}")
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    etag = quote_etag(hashlib.md5("|".join(parts).encode()).hexdigest())
+    return etag, last_modified
+
+
+def set_validator_headers(response, validators):
+    etag, last_modified = validators
+    response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+
+
+class NotModified(Exception):
+    """initial() içinde koşullu istek karşılandığında handler'ı atlamak için kullanılır."""
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    GET isteklerinde ETag / Last-Modified doğrulayıcılarını tablo sürüm
+    sayaçlarından üretir. Doğrulayıcılar serializer çalışmadan önce, tek bir
+    sorguyla kontrol edilir; veri değişmemişse 304 döner.
+    """
+    conditional_actions = ('list', 'retrieve', 'all_items_no_pagination')
+    # Yanıtın bağlı olduğu modeller; aksiyon bazında conditional_action_models ile değiştirilebilir
+    conditional_models = ()
+    conditional_action_models = {}
+
+    def get_conditional_models(self):
+        return self.conditional_action_models.get(self.action, self.conditional_models)
+
+    def get_validators(self, request):
+        models = self.get_conditional_models()
+        # ResponseCacheMixin sayaçları bu istekte zaten okuduysa tekrar sorgulanmaz
+        versions = getattr(self, 'data_versions', None)
+        if versions is None:
+            versions = get_versions(models)
+        return build_validators(request, models, versions)
+
+    def is_conditional_request(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and self.action in self.conditional_actions
+            and bool(self.get_conditional_models())
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if not self.is_conditional_request(request):
+            return
+
+        self.validators = self.get_validators(request)
+        etag, last_modified = self.validators
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp())
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            set_validator_headers(exc.response, self.validators)
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'validators', None) and 200 <= response.status_code < 300:
+            set_validator_headers(response, self.validators)
+        return response
@@ -0,0 +1,160 @@
+"""
+Süresi dolan cookie'lerin (InsuranceCompanyCookie.expires) temizliği.
+
+Silme, expires üzerindeki kısmi indeksle en eski satırlardan başlayarak sınırlı
+boyutlu partiler halinde yapılır; her parti kendi kısa transaction'ıdır, böylece
+büyük bir temizlik tabloyu uzun süre kilitlemez. Silinen cookie'ler diğer
+silmeler gibi anlık görüntüye ve delta senkronizasyonuna (silme kayıtları) yansır.
+Yönetim komutu (sweep_expired_cookies) ya da COOKIE_SWEEP_INTERVAL ile gunicorn
+worker'ları içinde periyodik olarak çalıştırılır; worker'lardan aynı anda sadece
+PostgreSQL advisory lock'unu alan temizlik yapar.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from sigorta_api.metrics import record_cookie_sweep
+
+from .cookies import defer_cookie_jars, delete_cookies, lock_cookie_jars
+from .models import InsuranceCompanyCookie
+
+logger = logging.getLogger(__name__)
+
+SweepResult = namedtuple('SweepResult', ['rows', 'bytes', 'batches'])
+
+# Satırın yaklaşık boyutu: metin alanlarının uzunluklarının toplamı
+ROW_SIZE = Length('name') + Length('value') + Length('domain') + Length('path')
+
+# pg_try_advisory_lock anahtarı (uygulamaya özgü sabit bir bigint)
+SWEEP_LOCK_ID = 7_301_551_842_013
+SWEEP_LOCK_KEY = 'cookie-sweeper:lock'
+
+
+def sweep_batch(now, batch_size):
+    """
+    En fazla batch_size süresi dolmuş cookie'yi tek transaction'da siler; (satır, byte) döndürür.
+    Kilitler cookie yazma yoluyla (upsert_cookies, apply_cookie_delta) aynı sırada
+    alınır: önce etkilenen öğelerin anlık görüntüleri, sonra cookie satırları.
+    """
+    with transaction.atomic(), defer_cookie_jars():
+        candidates = dict(
+            InsuranceCompanyCookie.objects.filter(expires__lte=now)
+            .order_by('expires')
+            .values_list('id', 'insurance_company_item_id')[:batch_size]
+        )
+        if not candidates:
+            return 0, 0
+        lock_cookie_jars(set(candidates.values()))
+        rows = list(
+            # Kilit beklenirken yenilenen cookie'ler expires koşuluyla yeniden elenir
+            InsuranceCompanyCookie.objects.filter(pk__in=list(candidates), expires__lte=now)
+            # Eşzamanlı bir temizleyicinin kilitlediği satırlar atlanır
+            .select_for_update(skip_locked=True)
+            .annotate(size=ROW_SIZE)
+            .values_list('id', 'size')
+        )
+        if rows:
+            delete_cookies([cookie_id for cookie_id, _ in rows])
+    return len(rows), sum(size or 0 for _, size in rows)
+
+
+def sweep_expired_cookies(batch_size=None, max_batches=None, pause=0, now=None):
+    """
+    Süresi dolmuş cookie'leri partiler halinde siler. max_batches verilirse en
+    fazla o kadar parti işlenir; pause partiler arasında beklenecek süredir (sn).
+    """
+    batch_size = batch_size or settings.COOKIE_SWEEP_BATCH_SIZE
+    now = now or timezone.now()
+    total_rows = total_bytes = batches = 0
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        rows, size = sweep_batch(now, batch_size)
+        if not rows:
+            break
+        batches += 1
+        total_rows += rows
+        total_bytes += size
+        record_cookie_sweep(rows, size)
+        if rows < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    if total_rows:
+        logger.info(
+            "Süresi dolan %d cookie silindi (~%d byte, %d parti, %.1f ms)",
+            total_rows, total_bytes, batches, (time.perf_counter() - started) * 1000
+        )
+    return SweepResult(total_rows, total_bytes, batches)
+
+
+@contextmanager
+def sweep_lease(interval):
+    """
+    Temizlik kilidini almayı dener; kilit alındıysa True verir. PostgreSQL'de
+    oturum düzeyinde advisory lock kullanılır ve blok sonunda bırakılır; böylece
+    tüm worker'lar arasında aynı anda tek temizlik çalışır. Diğer veritabanları
+    (geliştirme, SQLite) tek süreçle çalıştığı için cache kilidi yeterlidir.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        yield cache.add(SWEEP_LOCK_KEY, os.getpid(), interval)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [SWEEP_LOCK_ID])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [SWEEP_LOCK_ID])
+
+
+class CookieSweeper(threading.Thread):
+    """
+    Süreç içinde interval saniyede bir temizlik yapan arka plan iş parçacığı.
+    Birden fazla worker'da aynı anda sadece temizlik kilidini (sweep_lease) alan
+    worker çalışır; diğerleri o turu atlar.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='cookie-sweeper', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                with sweep_lease(self.interval) as acquired:
+                    if acquired:
+                        sweep_expired_cookies()
+            except Exception:
+                logger.exception("Cookie temizliği başarısız oldu")
+            finally:
+                # Bu iş parçacığının bağlantısı bir sonraki tura kadar açık kalmasın
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+
+
+_sweeper = None
+
+
+def start_sweeper():
+    """COOKIE_SWEEP_INTERVAL > 0 ise süreç başına bir kez temizleyiciyi başlatır."""
+    global _sweeper
+    if settings.COOKIE_SWEEP_INTERVAL <= 0 or _sweeper is not None:
+        return None
+    _sweeper = CookieSweeper(settings.COOKIE_SWEEP_INTERVAL)
+    _sweeper.start()
+    return _sweeper
@@ -0,0 +1,450 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+from .models import InsuranceCompanyCookie, InsuranceCompanyCookieJar, InsuranceCompanyCookieTombstone
+from .versions import mark_changed
+
+logger = logging.getLogger(__name__)
+
+_pending_jars = threading.local()
+
+COOKIE_UPDATE_FIELDS = [
+    'value', 'path', 'expires', 'creation', 'last_access',
+    'http_only', 'secure', 'same_site', 'priority', 'version', 'updated_at',
+]
+# Bir cookie'nin değişip değişmediğine bakılan alanlar
+COOKIE_COMPARE_FIELDS = [field for field in COOKIE_UPDATE_FIELDS if field not in ('version', 'updated_at')]
+
+
+class CookieJarConflict(Exception):
+    """İstemcinin bildirdiği sürüm sunucudaki anlık görüntü sürümüyle uyuşmuyor."""
+
+    def __init__(self, version):
+        super().__init__(f"Cookie jar version is {version}")
+        self.version = version
+
+
+def get_field(data, *field_names):
+    """C# PascalCase ve Python camelCase field'larını destekler."""
+    for field_name in field_names:
+        if field_name in data:
+            return data[field_name]
+    return None
+
+
+def parse_cookie_datetime(value, field_name):
+    """ISO formatındaki tarih metnini datetime'a çevirir; hatalı değerler için None döner."""
+    if not value:
+        return None
+    try:
+        if value.endswith('Z'):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError, AttributeError) as e:
+        logger.warning("%s parse error: %s", field_name, e)
+        return None
+
+
+def normalize_cookie(item, cookie_data):
+    """İstemciden gelen cookie sözlüğünü kaydedilmemiş bir InsuranceCompanyCookie'ye çevirir."""
+    return InsuranceCompanyCookie(
+        insurance_company_item=item,
+        name=get_field(cookie_data, 'name', 'Name') or '',
+        value=get_field(cookie_data, 'value', 'Value') or '',
+        domain=get_field(cookie_data, 'domain', 'Domain') or '',
+        path=get_field(cookie_data, 'path', 'Path') or '/',
+        expires=parse_cookie_datetime(get_field(cookie_data, 'expires', 'Expires'), 'Expires'),
+        creation=parse_cookie_datetime(get_field(cookie_data, 'creation', 'Creation'), 'Creation'),
+        last_access=parse_cookie_datetime(get_field(cookie_data, 'lastAccess', 'LastAccess'), 'LastAccess'),
+        http_only=get_field(cookie_data, 'httpOnly', 'HttpOnly') or False,
+        secure=get_field(cookie_data, 'secure', 'Secure') or False,
+        same_site=get_field(cookie_data, 'sameSite', 'SameSite') or 0,
+        priority=get_field(cookie_data, 'priority', 'Priority') or 0,
+    )
+
+
+def existing_cookie_rows(item_id):
+    """Öğenin mevcut cookie'lerini (name, domain) anahtarıyla (id, karşılaştırma alanları...) olarak döndürür."""
+    rows = InsuranceCompanyCookie.objects.filter(insurance_company_item_id=item_id).values_list(
+        'id', 'name', 'domain', *COOKIE_COMPARE_FIELDS
+    )
+    return {(row[1], row[2]): (row[0], *row[3:]) for row in rows}
+
+
+def cookie_changed(cookie, row):
+    return any(getattr(cookie, field) != value for field, value in zip(COOKIE_COMPARE_FIELDS, row[1:]))
+
+
+def write_cookies(cookies, version):
+    """
+    Yeni ve değişen cookie'leri verilen sürümle tek bir
+    INSERT ... ON CONFLICT DO UPDATE ifadesiyle yazar.
+    """
+    for cookie in cookies:
+        cookie.version = version
+    InsuranceCompanyCookie.objects.bulk_create(
+        cookies,
+        update_conflicts=True,
+        unique_fields=['insurance_company_item', 'name', 'domain'],
+        update_fields=COOKIE_UPDATE_FIELDS,
+    )
+    # bulk_create sinyal göndermediği için sürüm sayacı elle artırılır
+    mark_changed(InsuranceCompanyCookie)
+
+
+def delete_cookies(cookie_ids):
+    # Silme sinyalleri silinen anahtarları kaydeder (record_removal)
+    InsuranceCompanyCookie.objects.filter(pk__in=cookie_ids).delete()
+
+
+def upsert_cookies(item, cookies_data, clear_existing=True):
+    """
+    Öğenin cookie'lerini tek bir transaction içinde, sabit sayıda SQL ifadesiyle yazar:
+    mevcut cookie'lerin okunması, yeni ve değişen cookie'ler için tek bir
+    INSERT ... ON CONFLICT DO UPDATE, (istenirse) listede olmayanların silinmesi ve
+    eski cookie alanının güncellenmesi. Değişmeyen satırlara dokunulmaz.
+    Oluşturulan ve güncellenen cookie adlarını ve anlık görüntü sürümünü döndürür.
+    """
+    cookies = [normalize_cookie(item, cookie_data) for cookie_data in cookies_data]
+
+    created_cookies = []
+    updated_cookies = []
+
+    with transaction.atomic(), defer_cookie_jars():
+        current_version = current_jar_version(item.pk)
+        existing = existing_cookie_rows(item.pk)
+        # clearExisting ile tüm cookie'ler yeniden oluşturulmuş gibi raporlanır
+        reported_keys = set() if clear_existing else set(existing)
+
+        # Aynı istekte tekrar eden anahtarlarda son değer geçerlidir; tek ifadede
+        # aynı satır iki kez güncellenemeyeceği için listeyi tekilleştir
+        unique_cookies = {}
+        for cookie in cookies:
+            key = (cookie.name, cookie.domain)
+            if key in reported_keys:
+                updated_cookies.append(cookie.name)
+            else:
+                created_cookies.append(cookie.name)
+                reported_keys.add(key)
+            unique_cookies[key] = cookie
+
+        changed = [
+            cookie for key, cookie in unique_cookies.items()
+            if key not in existing or cookie_changed(cookie, existing[key])
+        ]
+        removed_ids = [row[0] for key, row in existing.items() if key not in unique_cookies] if clear_existing else []
+
+        version = current_version
+        if changed or removed_ids:
+            version = change_version(item.pk, current_version)
+        if changed:
+            write_cookies(changed, version)
+        if removed_ids:
+            delete_cookies(removed_ids)
+
+        # Eski cookie alanını da aynı transaction içinde güncelle
+        if cookies:
+            item.cookie = "; ".join(f"{cookie.name}={cookie.value}" for cookie in cookies)
+            item.save(update_fields=['cookie'])
+
+    return created_cookies, updated_cookies, version
+
+
+def apply_cookie_delta(item, base_version, cookies_data, removed_data):
+    """
+    Delta senkronizasyonu: sadece eklenen/değişen cookie'ler ve silinen
+    (name, domain) anahtarları base_version'a göre uygulanır. Anlık görüntü
+    sürümü base_version'dan farklıysa CookieJarConflict fırlatılır; istemci
+    önce cookie_changes ile aradaki değişiklikleri almalıdır. Eski cookie alanı
+    (item.cookie) bu yolda güncellenmez. (sürüm, oluşturulan, güncellenen,
+    silinen) döndürür.
+    """
+    cookies = {}
+    for cookie_data in cookies_data:
+        cookie = normalize_cookie(item, cookie_data)
+        cookies[(cookie.name, cookie.domain)] = cookie
+    removed_keys = {
+        (get_field(data, 'name', 'Name') or '', get_field(data, 'domain', 'Domain') or '')
+        for data in removed_data
+    }
+
+    with transaction.atomic(), defer_cookie_jars():
+        current_version = current_jar_version(item.pk)
+        if base_version != current_version:
+            raise CookieJarConflict(current_version)
+
+        existing = existing_cookie_rows(item.pk)
+        created = [key for key in cookies if key not in existing]
+        updated = [key for key, cookie in cookies.items() if key in existing and cookie_changed(cookie, existing[key])]
+        removed = [key for key in removed_keys if key in existing and key not in cookies]
+
+        if not (created or updated or removed):
+            return current_version, [], [], []
+
+        version = change_version(item.pk, current_version)
+        if created or updated:
+            write_cookies([cookies[key] for key in created + updated], version)
+        if removed:
+            delete_cookies([existing[key][0] for key in removed])
+
+    return version, [name for name, _ in created], [name for name, _ in updated], [name for name, _ in removed]
+
+
+def cookie_changes(item_id, since):
+    """
+    since sürümünden sonra eklenen/değişen cookie satırlarını (COOKIE_JAR_FIELDS
+    sırasıyla) ve silinen (name, domain) anahtarlarını döndürür. since güncel
+    sürümden ileriyse CookieJarConflict fırlatılır.
+    """
+    version = InsuranceCompanyCookieJar.objects.filter(
+        insurance_company_item_id=item_id
+    ).values_list('version', flat=True).first() or 0
+    if since > version:
+        raise CookieJarConflict(version)
+    if since == version:
+        return version, [], []
+
+    rows = list(cookie_jar_rows(
+        InsuranceCompanyCookie.objects.filter(unexpired(), insurance_company_item_id=item_id, version__gt=since)
+    ))
+    # Silinip yeniden eklenen cookie güncel satırıyla bildirilir
+    changed_keys = {(row[0], row[2]) for row in rows}
+    removed = [
+        key for key in InsuranceCompanyCookieTombstone.objects.filter(
+            insurance_company_item_id=item_id, version__gt=since
+        ).order_by('name', 'domain').values_list('name', 'domain')
+        if key not in changed_keys
+    ]
+    return version, rows, removed
+
+
+# Anlık görüntüdeki alanlar, istemcinin toplu güncellemede gönderdiği adlarla;
+# yönetim amaçlı kayıt zaman damgaları dahil edilmez
+COOKIE_JAR_FIELDS = (
+    ('name', 'name'),
+    ('value', 'value'),
+    ('domain', 'domain'),
+    ('path', 'path'),
+    ('expires', 'expires'),
+    ('creation', 'creation'),
+    ('last_access', 'lastAccess'),
+    ('http_only', 'httpOnly'),
+    ('secure', 'secure'),
+    ('same_site', 'sameSite'),
+    ('priority', 'priority'),
+)
+
+
+EXPIRES_INDEX = [field for field, _ in COOKIE_JAR_FIELDS].index('expires')
+
+
+def unexpired(now=None):
+    """Süresi dolmamış (ya da oturum) cookie'leri seçen koşul."""
+    return Q(expires__isnull=True) | Q(expires__gt=now or timezone.now())
+
+
+def drop_expired(data, now):
+    """Kodlanmış anlık görüntüden süresi dolmuş cookie'leri çıkarır; (veri, kalan sayısı) döndürür."""
+    cookies = [
+        cookie for cookie in json.loads(data)
+        if 'expires' not in cookie or parse_cookie_datetime(cookie['expires'], 'Expires') > now
+    ]
+    return json.dumps(cookies, ensure_ascii=False, separators=(',', ':')), len(cookies)
+
+
+def format_cookie_datetime(value):
+    # DRF DateTimeField ile aynı biçim; parse_cookie_datetime geri okuyabilir
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    return value.isoformat().replace('+00:00', 'Z')
+
+
+def encode_cookie_jar(rows):
+    """
+    COOKIE_JAR_FIELDS sırasındaki değer demetlerini sıkıştırılmış bir JSON dizisine
+    çevirir. Boş tarih alanları yazılmaz.
+    """
+    cookies = []
+    for row in rows:
+        cookie = {}
+        for (_, key), value in zip(COOKIE_JAR_FIELDS, row):
+            if isinstance(value, datetime):
+                value = format_cookie_datetime(value)
+            elif value is None:
+                continue
+            cookie[key] = value
+        cookies.append(cookie)
+    return json.dumps(cookies, ensure_ascii=False, separators=(',', ':'))
+
+
+def cookie_jar_rows(queryset):
+    return queryset.order_by('name', 'domain').values_list(*(field for field, _ in COOKIE_JAR_FIELDS))
+
+
+def current_jar_version(item_id):
+    """
+    Anlık görüntünün güncel sürümünü okur (hiç yazılmamışsa 0). Transaction
+    içinde satır kilitlenir; aynı öğenin eşzamanlı değişiklikleri sıraya girer.
+    """
+    jars = InsuranceCompanyCookieJar.objects.filter(insurance_company_item_id=item_id)
+    if transaction.get_connection().in_atomic_block:
+        jars = jars.select_for_update()
+    return jars.values_list('version', flat=True).first() or 0
+
+
+def lock_cookie_jars(item_ids):
+    """
+    Birden fazla öğenin anlık görüntü satırlarını öğe id sırasıyla kilitler.
+    Birden çok öğenin cookie'lerini değiştiren işlemler bunu cookie satırlarından
+    önce çağırır; kilit sırası tek öğeli yazma yolu (önce anlık görüntü, sonra
+    cookie'ler) ile aynı kalır ve kilitlenme (deadlock) oluşmaz.
+    """
+    list(
+        InsuranceCompanyCookieJar.objects.filter(insurance_company_item_id__in=item_ids)
+        .order_by('insurance_company_item_id')
+        .select_for_update()
+        .values_list('pk', flat=True)
+    )
+
+
+def change_version(item_id, current_version=None):
+    """
+    Değişikliğin damgalanacağı sürümü döndürür. defer_cookie_jars() bloğu içinde
+    aynı öğenin tüm değişiklikleri tek bir sürüm alır.
+    """
+    versions = getattr(_pending_jars, 'versions', None)
+    if versions is not None and item_id in versions:
+        return versions[item_id]
+    if current_version is None:
+        current_version = current_jar_version(item_id)
+    version = current_version + 1
+    if versions is not None:
+        versions[item_id] = version
+    return version
+
+
+def save_cookie_jar(item_id, version):
+    """
+    Öğenin cookie satırlarından anlık görüntüyü verilen sürümle yeniden yazar.
+    Cookie değişikliğiyle aynı transaction içinde çağrılmalıdır.
+    """
+    rows = list(cookie_jar_rows(InsuranceCompanyCookie.objects.filter(insurance_company_item_id=item_id)))
+    fields = {
+        'data': encode_cookie_jar(rows),
+        'next_expiry': min((row[EXPIRES_INDEX] for row in rows if row[EXPIRES_INDEX] is not None), default=None),
+        'version': version,
+    }
+    jars = InsuranceCompanyCookieJar.objects.filter(insurance_company_item_id=item_id)
+    if jars.update(**fields, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            InsuranceCompanyCookieJar.objects.create(insurance_company_item_id=item_id, **fields)
+    except IntegrityError:
+        # Eşzamanlı bir istek satırı önce oluşturdu
+        jars.update(**fields, updated_at=timezone.now())
+
+
+def save_removals(item_id, keys, version):
+    InsuranceCompanyCookieTombstone.objects.bulk_create(
+        [
+            InsuranceCompanyCookieTombstone(insurance_company_item_id=item_id, name=name, domain=domain, version=version)
+            for name, domain in sorted(keys)
+        ],
+        update_conflicts=True,
+        unique_fields=['insurance_company_item', 'name', 'domain'],
+        update_fields=['version', 'removed_at'],
+    )
+
+
+def schedule_cookie_jar(item_id, version):
+    """
+    defer_cookie_jars() bloğu içinde anlık görüntüyü blok sonuna erteler, aksi halde
+    hemen yazar. Çok satırlı silmelerde her satır için ayrı yazım yapılmaz.
+    """
+    versions = getattr(_pending_jars, 'versions', None)
+    if versions is None:
+        save_cookie_jar(item_id, version)
+    else:
+        versions.setdefault(item_id, version)
+
+
+def record_removal(item_id, name, domain):
+    """Silinen cookie'yi değişiklik sorguları için kaydeder ve anlık görüntüyü yeniler."""
+    version = change_version(item_id)
+    removals = getattr(_pending_jars, 'removals', None)
+    if removals is None:
+        save_removals(item_id, {(name, domain)}, version)
+        save_cookie_jar(item_id, version)
+    else:
+        removals.setdefault(item_id, set()).add((name, domain))
+
+
+@contextmanager
+def defer_cookie_jars():
+    """
+    Bloktaki cookie değişikliklerinin silme kayıtlarını ve anlık görüntülerini
+    blok sonunda öğe başına bir kez yazar.
+    """
+    if getattr(_pending_jars, 'versions', None) is not None:
+        # İç içe bloklarda yazım en dıştaki bloğa bırakılır
+        yield
+        return
+    _pending_jars.versions = {}
+    _pending_jars.removals = {}
+    try:
+        yield
+        versions, removals = _pending_jars.versions, _pending_jars.removals
+    finally:
+        _pending_jars.versions = _pending_jars.removals = None
+    for item_id, version in sorted(versions.items()):
+        if item_id in removals:
+            save_removals(item_id, removals[item_id], version)
+        save_cookie_jar(item_id, version)
+
+
+def cookie_jar_queryset(item_id):
+    """Anlık görüntünün (sürüm, kodlanmış veri) bilgisini birincil anahtarla okur."""
+    return InsuranceCompanyCookieJar.objects.filter(
+        insurance_company_item_id=item_id
+    ).values_list('version', 'data', 'next_expiry')
+
+
+def cookie_jar_response(request, item_id, version, data, next_expiry=None):
+    """
+    Kayıtlı kodlanmış diziyi yeniden ayrıştırmadan yanıt gövdesine yerleştirir.
+    ETag sürümden üretilir; If-None-Match eşleşirse gövdesiz 304 döner. Anlık
+    görüntüdeki bir cookie'nin süresi dolmuşsa (temizleyici henüz silmediyse)
+    gövde ayıklanır ve ETag'e kalan cookie sayısı eklenir.
+    """
+    etag = f'"cookie-jar-{item_id}-{version}"'
+    now = timezone.now()
+    if next_expiry is not None and next_expiry <= now:
+        data, remaining = drop_expired(data, now)
+        etag = f'"cookie-jar-{item_id}-{version}-{remaining}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            f'{{"version":{version},"cookies":{data}}}'.encode(), content_type='application/json'
+        )
+    response['ETag'] = etag
+    return response
+
+
+def cookie_changes_response(version, rows, removed):
+    """cookie_changes sonucunu, cookie'leri anlık görüntüyle aynı biçimde kodlayarak döndürür."""
+    removed = json.dumps(
+        [{'name': name, 'domain': domain} for name, domain in removed], ensure_ascii=False, separators=(',', ':')
+    )
+    return HttpResponse(
+        f'{{"version":{version},"cookies":{encode_cookie_jar(rows)},"removed":{removed}}}'.encode(),
+        content_type='application/json'
+    )
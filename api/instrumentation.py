@@ -0,0 +1,28 @@
+from rest_framework.renderers import JSONRenderer
+
+from sigorta_api.middleware import add_elapsed, timed, timing_checkpoint
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """Render süresini Server-Timing ölçümlerine ekleyen JSONRenderer."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class ServerTimingMixin:
+    """
+    Handler'da (initial ile finalize_response arası) veritabanı dışında geçen
+    süreyi serialize ölçümüne ekler. View'lar yanıt verisini handler içinde
+    serializer.data ile ürettiği için bu süre ağırlıklı olarak serialize
+    maliyetidir. Örneklenmeyen isteklerde ek maliyet tek bir ContextVar okumasıdır.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.timing_checkpoint = timing_checkpoint()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        add_elapsed('serialize', getattr(self, 'timing_checkpoint', None))
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,110 @@
+import copy
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.utils import ConnectionHandler
+
+from .benchmark_servers import percentile
+
+# Bağlantı modları; DATABASES['default'] üzerine uygulanır
+MODES = {
+    'fresh': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "İstek başına yeni bağlantı, kalıcı bağlantı (sağlık kontrollü) ve psycopg 3 havuzu "
+        "modlarında istek yaşam döngüsünü (request_started/finished) taklit ederek küçük "
+        "sorguların istek başı gecikmesini ölçer. docker-compose Postgres'i ile çalıştırılmalıdır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--requests', type=int, default=500, help="İş parçacığı başına istek sayısı")
+        parser.add_argument('--queries', type=int, default=3, help="İstek başına sorgu sayısı")
+        parser.add_argument('--threads', type=int, default=1, help="Eşzamanlı istek işleyen iş parçacığı sayısı")
+        parser.add_argument('--pool-size', type=int, default=4, help="Havuz modunda en fazla bağlantı")
+        parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES['default']
+        results = []
+        for mode in options['modes']:
+            if mode == 'pool' and base['ENGINE'] != 'django.db.backends.postgresql':
+                self.stdout.write(f"{mode:<10} atlandı: havuz sadece PostgreSQL ile desteklenir")
+                continue
+            # Ayrı bir ConnectionHandler; komut uygulamanın kendi bağlantılarını kullanmaz
+            handler = ConnectionHandler({'default': self.mode_settings(base, mode, options['pool_size'])})
+            try:
+                result = self.run_mode(handler, options['requests'], options['queries'], options['threads'])
+            finally:
+                self.close(handler)
+            result['mode'] = mode
+            results.append(result)
+            self.stdout.write(
+                f"{mode:<10} {result['requests_per_second']:>9.1f} istek/sn  p50 {result['p50_ms']:>7.2f} ms  "
+                f"p95 {result['p95_ms']:>7.2f} ms  p99 {result['p99_ms']:>7.2f} ms"
+            )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'database': base['ENGINE'],
+                'requests': options['requests'],
+                'queries': options['queries'],
+                'threads': options['threads'],
+                'results': results,
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    def mode_settings(self, base, mode, pool_size):
+        config = copy.deepcopy(base)
+        options = config.setdefault('OPTIONS', {})
+        options.pop('pool', None)
+        overrides = dict(MODES[mode])
+        if overrides.pop('pool', False):
+            options['pool'] = {'min_size': 1, 'max_size': pool_size}
+        config.update(overrides)
+        return config
+
+    def run_mode(self, handler, requests, queries, threads):
+        def worker(_):
+            # ConnectionHandler bağlantıları iş parçacığı başına tutar
+            connection = handler['default']
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                # Django'nun request_started ve request_finished sinyallerindeki adım
+                connection.close_if_unusable_or_obsolete()
+                for _ in range(queries):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = [latency for chunk in executor.map(worker, range(threads)) for latency in chunk]
+        elapsed = time.perf_counter() - started
+        return {
+            'requests_per_second': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(statistics.median(latencies) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'seconds': round(elapsed, 3),
+        }
+
+    def close(self, handler):
+        connection = handler['default']
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
@@ -0,0 +1,160 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import InsuranceCompanyItem
+
+# Dockerfile.backend.prod'daki gunicorn komutu ve ASGI karşılığı.
+# Her hedef, kendi sunucusu için uygun uç noktaları (sync veya async) ölçer.
+TARGETS = {
+    'wsgi': {
+        'command': ['gunicorn', 'sigorta_api.wsgi:application'],
+        'prefix': '/api/v1/',
+    },
+    'asgi': {
+        'command': ['gunicorn', '-k', 'uvicorn.workers.UvicornWorker', 'sigorta_api.asgi:application'],
+        'prefix': '/api/v1/async/',
+    },
+}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Yoğun okunan GET uçlarını gunicorn WSGI (sync view'lar) ve gunicorn + uvicorn "
+        "ASGI (async view'lar) sunucuları altında eşzamanlı polling yüküyle karşılaştırır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+        parser.add_argument('--wsgi-workers', type=int, default=3)
+        parser.add_argument('--asgi-workers', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=50, help="Eşzamanlı polling istemcisi sayısı")
+        parser.add_argument('--requests', type=int, default=500, help="Uç nokta başına toplam istek sayısı")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--item', type=int, help="Ölçülecek InsuranceCompanyItem id'si")
+        parser.add_argument('--skip-lists', action='store_true', help="active_items/car_query_items uçlarını atla")
+        parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+
+    def handle(self, *args, **options):
+        item = self.get_item(options['item'])
+        results = []
+        for target in options['targets']:
+            workers = options[f'{target}_workers']
+            server = self.start_server(target, workers, options['port'])
+            try:
+                for name, path in self.get_paths(TARGETS[target]['prefix'], item, options['skip_lists']):
+                    result = self.run_load(options['port'], path, options['concurrency'], options['requests'])
+                    result.update({'target': target, 'workers': workers, 'endpoint': name, 'path': path})
+                    results.append(result)
+                    self.stdout.write(
+                        f"{target:<5} {name:<16} {result['requests_per_second']:>9.1f} istek/sn  "
+                        f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                        f"hata {result['errors']}"
+                    )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'database': settings.DATABASES['default']['ENGINE'],
+                'results': results,
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    def get_item(self, item_id):
+        items = InsuranceCompanyItem.objects.exclude(username__isnull=True).exclude(password__isnull=True)
+        item = items.filter(pk=item_id).first() if item_id else items.filter(is_active=True).first()
+        if item is None:
+            raise CommandError("Ölçüm için kullanıcı adı ve şifresi olan bir InsuranceCompanyItem bulunamadı.")
+        return item
+
+    def get_paths(self, prefix, item, skip_lists):
+        paths = [
+            ('retrieve', f'{prefix}insurance-company-items/{item.id}/'),
+            ('get_cookies', f'{prefix}insurance-company-items/{item.id}/get_cookies/'),
+            ('generate_totp', f'{prefix}totp/?username={item.username}&password={item.password}'),
+        ]
+        if not skip_lists:
+            paths += [
+                ('active_items', f'{prefix}insurance-company-items/active_items/'),
+                ('car_query_items', f'{prefix}insurance-company-items/car_query_items/'),
+            ]
+        return paths
+
+    def start_server(self, target, workers, port):
+        command = TARGETS[target]['command'] + ['--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+        server = subprocess.Popen(
+            [sys.executable, '-m'] + command,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'sigorta_api.settings')},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{target} sunucusu başlatılamadı: {' '.join(command)}")
+            try:
+                connection = HTTPConnection('127.0.0.1', port, timeout=1)
+                connection.request('GET', '/api/v1/')
+                connection.getresponse().read()
+                connection.close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"{target} sunucusu 30 saniye içinde yanıt vermedi.")
+
+    def run_load(self, port, path, concurrency, total):
+        """concurrency kadar keep-alive istemciyle toplam total istek gönderir."""
+        per_client = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+        def client(count):
+            latencies, errors = [], 0
+            connection = HTTPConnection('127.0.0.1', port, timeout=60)
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except OSError:
+                    errors += 1
+                    connection.close()
+                    connection = HTTPConnection('127.0.0.1', port, timeout=60)
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(client, per_client))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+        return {
+            'requests_per_second': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'errors': sum(errors for _, errors in outcomes),
+            'seconds': round(elapsed, 3),
+        }
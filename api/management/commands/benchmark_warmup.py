@@ -0,0 +1,121 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from .benchmark_servers import Command as BenchmarkServersCommand
+
+# Varsayılan gunicorn komutu ile sigorta_api.gunicorn_conf profili (preload + ısıtma)
+PROFILES = {
+    'baseline': ['gunicorn', 'sigorta_api.wsgi:application'],
+    'warmup': ['gunicorn', '-c', 'python:sigorta_api.gunicorn_conf', 'sigorta_api.wsgi:application'],
+}
+
+
+class Command(BenchmarkServersCommand):
+    help = (
+        "gunicorn yeniden başlatıldıktan sonra her worker'ın ilk isteklerinin süresini "
+        "varsayılan komut ve sigorta_api.gunicorn_conf profili ile karşılaştırır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--rounds', type=int, default=3, help="Profil başına yeniden başlatma sayısı")
+        parser.add_argument('--settle', type=float, default=1.0, help="Worker'lar açıldıktan sonra beklenecek süre (sn)")
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--item', type=int, help="Ölçülecek InsuranceCompanyItem id'si")
+        parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+
+    def handle(self, *args, **options):
+        item = self.get_item(options['item'])
+        paths = self.get_paths('/api/v1/', item, skip_lists=False)
+        results = []
+        for profile in options['profiles']:
+            samples = {name: {'first': [], 'warm': []} for name, _ in paths}
+            for _ in range(options['rounds']):
+                server = self.start_profile(profile, options['workers'], options['port'], options['settle'])
+                try:
+                    for name, path in paths:
+                        # Eşzamanlı istekler sync worker'lara birer birer dağılır
+                        samples[name]['first'].extend(self.wave(options['port'], path, options['workers']))
+                        samples[name]['warm'].extend(self.wave(options['port'], path, options['workers']))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+
+            for name, path in paths:
+                result = {
+                    'profile': profile,
+                    'endpoint': name,
+                    'path': path,
+                    'first_ms': round(statistics.median(samples[name]['first']) * 1000, 2),
+                    'first_max_ms': round(max(samples[name]['first']) * 1000, 2),
+                    'warm_ms': round(statistics.median(samples[name]['warm']) * 1000, 2),
+                }
+                results.append(result)
+                self.stdout.write(
+                    f"{profile:<8} {name:<16} ilk {result['first_ms']:>8.1f} ms "
+                    f"(en fazla {result['first_max_ms']:>8.1f})  sıcak {result['warm_ms']:>7.1f} ms"
+                )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'workers': options['workers'],
+                'rounds': options['rounds'],
+                'database': settings.DATABASES['default']['ENGINE'],
+                'results': results,
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    def start_profile(self, profile, workers, port, settle):
+        """Sunucuyu başlatır ve tüm worker'lar açılana kadar istek göndermeden bekler."""
+        command = PROFILES[profile] + ['--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+        server = subprocess.Popen(
+            [sys.executable, '-m'] + command,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'sigorta_api.settings')},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        booted = threading.Semaphore(0)
+
+        def read_log():
+            # Log çıktısı sürekli okunur; aksi halde pipe dolup sunucuyu bloke eder
+            for line in server.stderr:
+                if 'Booting worker' in line:
+                    booted.release()
+
+        threading.Thread(target=read_log, daemon=True).start()
+        deadline = time.monotonic() + 60
+        for _ in range(workers):
+            if not booted.acquire(timeout=max(deadline - time.monotonic(), 0)) or server.poll() is not None:
+                server.terminate()
+                raise CommandError(f"{profile} sunucusu başlatılamadı: {' '.join(command)}")
+        time.sleep(settle)
+        return server
+
+    def wave(self, port, path, count):
+        def request(_):
+            connection = HTTPConnection('127.0.0.1', port, timeout=60)
+            started = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            connection.close()
+            if response.status != 200:
+                raise CommandError(f"{path}: HTTP {response.status}")
+            return elapsed
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return list(executor.map(request, range(count)))
@@ -0,0 +1,83 @@
+import csv
+import json
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Company
+from api.password_pool import shutdown_pool
+from api.provisioning import BATCH_SIZE, provision_company_users
+
+# CSV'de rol id'leri tek sütunda bu ayraçla verilir (örn. "1;3")
+ROLE_SEPARATOR = ';'
+
+
+class Command(BaseCommand):
+    help = (
+        "CSV ya da JSON dosyasındaki kullanıcıları bir şirkete toplu olarak ekler. Şifre hash'leri "
+        "süreç havuzunda paralel hesaplanır; kullanıcılar --batch-size satırlık transaction'larla "
+        "yazılır. CSV sütunları: username, email, password, first_name, last_name, is_admin, "
+        "is_active, expires_at, roles (';' ile ayrılmış rol id'leri). JSON dosyası aynı alanlara "
+        "sahip nesnelerin listesidir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_code', help="Kullanıcıların ekleneceği şirketin kodu")
+        parser.add_argument('path', help="Kullanıcı dosyası (.csv ya da .json)")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Verilmezse dosya uzantısından belirlenir")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Şifre hash süreç sayısı (varsayılan CPU sayısı; 1 ise süreç içinde hesaplanır)"
+        )
+        parser.add_argument(
+            '--all-or-nothing', action='store_true',
+            help="Partide hatalı bir satır varsa o partiden hiçbir kullanıcı oluşturulmaz"
+        )
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(code=options['company_code']).first()
+        if company is None:
+            raise CommandError(f"Şirket bulunamadı: {options['company_code']}")
+
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"Dosya bulunamadı: {path}")
+        rows = self.read_rows(path, options['format'] or path.suffix.lstrip('.').lower())
+
+        batch_size = max(options['batch_size'], 1)
+        created = failed = 0
+        for start in range(0, len(rows), batch_size):
+            results, _ = provision_company_users(
+                company, rows[start:start + batch_size], options['all_or_nothing'], options['workers']
+            )
+            for result in results:
+                if result['status'] == 'created':
+                    created += 1
+                elif result['status'] == 'error':
+                    failed += 1
+                    self.stderr.write(f"Satır {start + result['index'] + 1}: {json.dumps(result['errors'], ensure_ascii=False)}")
+
+        shutdown_pool()
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} kullanıcı oluşturuldu, {failed} satır hatalı, {len(rows) - created - failed} satır atlandı."
+        ))
+
+    def read_rows(self, path, file_format):
+        if file_format == 'json':
+            rows = json.loads(path.read_text(encoding='utf-8'))
+            if not isinstance(rows, list):
+                raise CommandError("JSON dosyası kullanıcı nesnelerinin listesi olmalıdır.")
+            return rows
+        if file_format == 'csv':
+            with path.open(encoding='utf-8-sig', newline='') as f:
+                return [self.csv_row(row) for row in csv.DictReader(f)]
+        raise CommandError(f"Desteklenmeyen dosya biçimi: {file_format}")
+
+    def csv_row(self, row):
+        # Boş hücreler gönderilmemiş sayılır; serializer varsayılanları uygulanır
+        data = {key: value for key, value in row.items() if key and value not in (None, '')}
+        if 'roles' in data:
+            data['roles'] = [role_id.strip() for role_id in data['roles'].split(ROLE_SEPARATOR) if role_id.strip()]
+        return data
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import InsuranceCompanyItem, make_credential_hash
+
+
+class Command(BaseCommand):
+    help = "InsuranceCompanyItem.credential_hash alanlarını yeniden hesaplar (SECRET_KEY değişikliğinden sonra çalıştırılmalıdır)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        items = InsuranceCompanyItem.objects.only('id', 'username', 'password', 'credential_hash')
+        changed = []
+        for item in items.iterator(chunk_size=batch_size):
+            credential_hash = make_credential_hash(item.username, item.password)
+            if credential_hash != item.credential_hash:
+                item.credential_hash = credential_hash
+                changed.append(item)
+
+        with transaction.atomic():
+            InsuranceCompanyItem.objects.bulk_update(changed, ['credential_hash'], batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(changed)} öğenin kimlik bilgisi özeti güncellendi."))
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.cookie_sweeper import sweep_expired_cookies
+from sigorta_api.metrics import store
+
+
+class Command(BaseCommand):
+    help = (
+        "Süresi dolmuş InsuranceCompanyCookie satırlarını sınırlı boyutlu partiler halinde siler "
+        "ve silinen satır sayısı ile yaklaşık boyutu raporlar. --interval ile sürekli çalışır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.COOKIE_SWEEP_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help="Tur başına en fazla işlenecek parti")
+        parser.add_argument('--pause', type=float, default=0, help="Partiler arasında beklenecek süre (sn)")
+        parser.add_argument('--interval', type=float, help="Verilirse temizlik bu aralıkla (sn) tekrarlanır")
+
+    def handle(self, *args, **options):
+        while True:
+            result = sweep_expired_cookies(options['batch_size'], options['max_batches'], options['pause'])
+            store.flush()
+            self.stdout.write(self.style.SUCCESS(
+                f"{result.rows} süresi dolmuş cookie silindi (~{result.bytes} byte, {result.batches} parti)."
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
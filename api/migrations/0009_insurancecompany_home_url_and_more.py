@@ -0,0 +1,95 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alter_insurancecompanyitem_partage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insurancecompany',
+            name='home_url',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Anasayfa URL'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompany',
+            name='explorer_url',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Explorer URL'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompany',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='insurance_company_logos/', verbose_name='Sigorta Şirketi Logosu'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompany',
+            name='login_url',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Giriş URL'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='password',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Şifre'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='phone_number',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Telefon Numarası'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='proxy_password',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Proxy Şifre'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='proxy_url',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Proxy URL'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='proxy_username',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Proxy Kullanıcı Adı'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='totp_code',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Totp Kodu'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='username',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Kullanıcı Adı'),
+        ),
+        migrations.CreateModel(
+            name='InsuranceCompanyCookie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Cookie Adı')),
+                ('value', models.TextField(verbose_name='Cookie Değeri')),
+                ('domain', models.CharField(max_length=255, verbose_name='Domain')),
+                ('path', models.CharField(default='/', max_length=255, verbose_name='Path')),
+                ('expires', models.DateTimeField(blank=True, null=True, verbose_name='Son Kullanma Tarihi')),
+                ('creation', models.DateTimeField(blank=True, null=True, verbose_name='Oluşturulma Tarihi')),
+                ('last_access', models.DateTimeField(blank=True, null=True, verbose_name='Son Erişim Tarihi')),
+                ('http_only', models.BooleanField(default=False, verbose_name='HTTP Only')),
+                ('secure', models.BooleanField(default=False, verbose_name='Secure')),
+                ('same_site', models.IntegerField(choices=[(0, 'None'), (1, 'Lax'), (2, 'Strict')], default=0, verbose_name='SameSite')),
+                ('priority', models.IntegerField(choices=[(0, 'Low'), (1, 'Medium'), (2, 'High')], default=0, verbose_name='Priority')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Kayıt Tarihi')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('insurance_company_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookies', to='api.insurancecompanyitem', verbose_name='Sigorta Şirketi Öğesi')),
+            ],
+            options={
+                'verbose_name': 'Sigorta Şirketi Cookie',
+                'verbose_name_plural': 'Sigorta Şirketi Cookies',
+                'ordering': ['-created_at'],
+                'unique_together': {('insurance_company_item', 'name', 'domain')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+VERSIONED_TABLES = [
+    'api.company',
+    'api.insurancecompany',
+    'api.insurancecompanyitem',
+    'api.insurancecompanycookie',
+    'api.partage',
+    'api.querytype',
+]
+
+
+def create_versions(apps, schema_editor):
+    DataVersion = apps.get_model('api', 'DataVersion')
+    DataVersion.objects.bulk_create([DataVersion(name=name) for name in VERSIONED_TABLES], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_insurancecompany_home_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Tablo')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Sürüm')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Veri Sürümü',
+                'verbose_name_plural': 'Veri Sürümleri',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
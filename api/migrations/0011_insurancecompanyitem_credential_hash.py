@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:12
+
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+
+def make_credential_hash(username, password):
+    # api.models.make_credential_hash'in bu migration anındaki kopyası; canlı
+    # yardımcı ileride değişse de geçmiş migration aynı sonucu üretir
+    if not username or not password:
+        return None
+    return salted_hmac(
+        "api.InsuranceCompanyItem.credential_hash",
+        f"{username}\x00{password}",
+        algorithm="sha256"
+    ).hexdigest()
+
+
+def backfill_credential_hashes(apps, schema_editor):
+    InsuranceCompanyItem = apps.get_model('api', 'InsuranceCompanyItem')
+    items = list(InsuranceCompanyItem.objects.only('id', 'username', 'password'))
+    for item in items:
+        item.credential_hash = make_credential_hash(item.username, item.password)
+    InsuranceCompanyItem.objects.bulk_update(items, ['credential_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insurancecompanyitem',
+            name='credential_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True, verbose_name='Kimlik Bilgisi Özeti'),
+        ),
+        migrations.RunPython(backfill_credential_hashes, migrations.RunPython.noop),
+    ]
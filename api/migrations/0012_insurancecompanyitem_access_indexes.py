@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_insurancecompanyitem_credential_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='insurancecompanyitem',
+            index=models.Index(fields=['partage', 'insurance_company', '-created_at'], name='item_partage_ic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insurancecompanyitem',
+            index=models.Index(fields=['partage', '-created_at'], name='item_partage_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insurancecompanyitem',
+            index=models.Index(fields=['company', '-created_at'], name='item_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insurancecompanyitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='item_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insurancecompanyitem',
+            index=models.Index(condition=models.Q(('is_car_query', True)), fields=['-created_at'], name='item_car_query_created_idx'),
+        ),
+        migrations.RunSQL(
+            # by_query_type: query_types__name filtresi ara tabloda querytype_id ile başlar;
+            # öğe id'sini de içeren bu indeks ara tabloya dönmeden (index-only) taranır
+            sql='CREATE INDEX item_query_types_qt_item_idx ON api_insurancecompanyitem_query_types (querytype_id, insurancecompanyitem_id)',
+            reverse_sql='DROP INDEX item_query_types_qt_item_idx',
+        ),
+        # Eski tek kolonlu FK indeksleri, bileşik indeksler oluşturulduktan sonra kaldırılır
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='company',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.company', verbose_name='Şirket'),
+        ),
+        migrations.AlterField(
+            model_name='insurancecompanyitem',
+            name='partage',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.partage', verbose_name='Partaj'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:58
+
+import json
+from datetime import datetime
+from itertools import groupby
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# api.cookies'taki alan listesi ve kodlamanın bu migration anındaki kopyası;
+# canlı kod ileride değişse de geçmiş migration aynı anlık görüntüyü üretir
+COOKIE_JAR_FIELDS = (
+    ('name', 'name'),
+    ('value', 'value'),
+    ('domain', 'domain'),
+    ('path', 'path'),
+    ('expires', 'expires'),
+    ('creation', 'creation'),
+    ('last_access', 'lastAccess'),
+    ('http_only', 'httpOnly'),
+    ('secure', 'secure'),
+    ('same_site', 'sameSite'),
+    ('priority', 'priority'),
+)
+
+
+def format_cookie_datetime(value):
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    return value.isoformat().replace('+00:00', 'Z')
+
+
+def encode_cookie_jar(rows):
+    cookies = []
+    for row in rows:
+        cookie = {}
+        for (_, key), value in zip(COOKIE_JAR_FIELDS, row):
+            if isinstance(value, datetime):
+                value = format_cookie_datetime(value)
+            elif value is None:
+                continue
+            cookie[key] = value
+        cookies.append(cookie)
+    return json.dumps(cookies, ensure_ascii=False, separators=(',', ':'))
+
+
+def backfill_cookie_jars(apps, schema_editor):
+    InsuranceCompanyCookie = apps.get_model('api', 'InsuranceCompanyCookie')
+    InsuranceCompanyCookieJar = apps.get_model('api', 'InsuranceCompanyCookieJar')
+    rows = InsuranceCompanyCookie.objects.order_by('insurance_company_item_id', 'name', 'domain').values_list(
+        'insurance_company_item_id', *(field for field, _ in COOKIE_JAR_FIELDS)
+    )
+    jars = [
+        InsuranceCompanyCookieJar(
+            insurance_company_item_id=item_id, data=encode_cookie_jar(row[1:] for row in item_rows)
+        )
+        for item_id, item_rows in groupby(rows.iterator(), key=lambda row: row[0])
+    ]
+    InsuranceCompanyCookieJar.objects.bulk_create(jars, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_insurancecompanyitem_access_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InsuranceCompanyCookieJar',
+            fields=[
+                ('insurance_company_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cookie_jar', serialize=False, to='api.insurancecompanyitem', verbose_name='Sigorta Şirketi Öğesi')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Sürüm')),
+                ('data', models.TextField(default='[]', verbose_name="Kodlanmış Cookie'ler")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Sigorta Şirketi Cookie Anlık Görüntüsü',
+                'verbose_name_plural': 'Sigorta Şirketi Cookie Anlık Görüntüleri',
+            },
+        ),
+        migrations.RunPython(backfill_cookie_jars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_cookie_versions(apps, schema_editor):
+    # Mevcut cookie'ler öğelerinin güncel anlık görüntü sürümünü alır
+    InsuranceCompanyCookie = apps.get_model('api', 'InsuranceCompanyCookie')
+    InsuranceCompanyCookieJar = apps.get_model('api', 'InsuranceCompanyCookieJar')
+    InsuranceCompanyCookie.objects.update(version=Subquery(
+        InsuranceCompanyCookieJar.objects.filter(
+            insurance_company_item_id=OuterRef('insurance_company_item_id')
+        ).values('version')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_insurancecompanycookiejar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insurancecompanycookie',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sürüm'),
+        ),
+        migrations.RunPython(backfill_cookie_versions, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='InsuranceCompanyCookieTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Cookie Adı')),
+                ('domain', models.CharField(max_length=255, verbose_name='Domain')),
+                ('version', models.PositiveIntegerField(verbose_name='Sürüm')),
+                ('removed_at', models.DateTimeField(auto_now=True, verbose_name='Silinme Tarihi')),
+                ('insurance_company_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cookie_tombstones', to='api.insurancecompanyitem', verbose_name='Sigorta Şirketi Öğesi')),
+            ],
+            options={
+                'verbose_name': 'Silinen Sigorta Şirketi Cookie',
+                'verbose_name_plural': 'Silinen Sigorta Şirketi Cookies',
+                'unique_together': {('insurance_company_item', 'name', 'domain')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:09
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def backfill_next_expiry(apps, schema_editor):
+    InsuranceCompanyCookie = apps.get_model('api', 'InsuranceCompanyCookie')
+    InsuranceCompanyCookieJar = apps.get_model('api', 'InsuranceCompanyCookieJar')
+    InsuranceCompanyCookieJar.objects.update(next_expiry=Subquery(
+        InsuranceCompanyCookie.objects.filter(insurance_company_item_id=OuterRef('pk'))
+        .values('insurance_company_item_id')
+        .annotate(next_expiry=Min('expires'))
+        .values('next_expiry')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_cookie_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insurancecompanycookiejar',
+            name='next_expiry',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='En Yakın Son Kullanma Tarihi'),
+        ),
+        migrations.AddIndex(
+            model_name='insurancecompanycookie',
+            index=models.Index(condition=models.Q(('expires__isnull', False)), fields=['expires'], name='cookie_expires_idx'),
+        ),
+        migrations.RunPython(backfill_next_expiry, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,31 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.utils.crypto import salted_hmac
+
+from sigorta_api.db_router import use_primary
+from sigorta_api.metrics import record_cache
 
 # Create your models here.
 
+def permission_cache_key(company_user_id):
+    return f"company_user_permissions:{company_user_id}"
+
+
+def make_credential_hash(username, password):
+    """
+    Kullanıcı adı ve şifre çiftinin SECRET_KEY ile anahtarlanmış özetini döndürür.
+    SECRET_KEY değişirse rebuild_credential_hashes komutu çalıştırılmalıdır.
+    """
+    if not username or not password:
+        return None
+    return salted_hmac(
+        "api.InsuranceCompanyItem.credential_hash",
+        f"{username}\x00{password}",
+        algorithm="sha256"
+    ).hexdigest()
+
+
 class Company(models.Model):
     name = models.CharField(verbose_name="Şirket Adı", max_length=255)
     code  = models.CharField(verbose_name="Şirket Kodu", max_length=255, unique=True)
@@ -91,17 +115,53 @@ class CompanyUser(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.company.code}"
     
-    def has_permission(self, query_type_name):
+    def get_effective_permissions(self):
+        """
+        Kullanıcının aktif rollerinden derlenen yetki yapısını döndürür.
+        Sonuç paylaşılan cache'te (CACHE_IS_SHARED) tutulur; rol, rol izni ve admin
+        değişikliklerinde api.signals tarafından geçersiz kılınır. Süreç içi cache'te
+        silme diğer worker'lara ulaşmayacağı için sonuç sadece bu nesnede (istek
+        boyunca) saklanır.
+        """
+        if not settings.CACHE_IS_SHARED:
+            if getattr(self, '_effective_permissions', None) is None:
+                self._effective_permissions = self.build_effective_permissions()
+            return self._effective_permissions
+
+        key = permission_cache_key(self.pk)
+        permissions = cache.get(key)
+        record_cache('permissions', permissions is not None)
+        if permissions is None:
+            permissions = self.build_effective_permissions()
+            cache.set(key, permissions, settings.PERMISSION_CACHE_TIMEOUT)
+        return permissions
+
+    def build_effective_permissions(self):
+        query_types = {}
+        with use_primary():
+            rows = list(RolePermission.objects.filter(
+                role__companyuser=self,
+                role__is_active=True
+            ).values_list('query_type__name', 'can_query', 'can_create', 'can_update'))
+        for query_type_name, can_query, can_create, can_update in rows:
+            current = query_types.setdefault(query_type_name, {
+                'can_query': False,
+                'can_create': False,
+                'can_update': False,
+            })
+            current['can_query'] |= can_query
+            current['can_create'] |= can_create
+            current['can_update'] |= can_update
+        
+        return {'is_admin': self.is_admin, 'query_types': query_types}
+    
+    def has_permission(self, query_type_name, permission='can_query'):
         """Kullanıcının belirli bir sorgu türü için yetkisi olup olmadığını kontrol eder."""
-        if self.is_admin:
+        permissions = self.get_effective_permissions()
+        if permissions['is_admin']:
             return True
-            
-        user_roles = self.roles.filter(is_active=True)
-        return RolePermission.objects.filter(
-            role__in=user_roles,
-            query_type__name=query_type_name,
-            can_query=True
-        ).exists()
+        
+        return permissions['query_types'].get(query_type_name, {}).get(permission, False)
     
     class Meta:
         verbose_name = "Şirket Kullanıcısı"
@@ -147,7 +207,8 @@ class Partage(models.Model):
 
 class InsuranceCompanyItem(models.Model):
     insurance_company = models.ForeignKey(InsuranceCompany, verbose_name="Sigorta Şirketi", on_delete=models.CASCADE)
-    company = models.ForeignKey(Company, verbose_name="Şirket", on_delete=models.CASCADE)
+    # company ve partage için tek kolonlu FK indeksleri yerine Meta.indexes'teki bileşik indeksler kullanılır
+    company = models.ForeignKey(Company, verbose_name="Şirket", on_delete=models.CASCADE, db_index=False)
     username = models.CharField(verbose_name="Kullanıcı Adı", max_length=255,null=True, blank=True)
     password = models.CharField(verbose_name="Şifre", max_length=255,null=True, blank=True)
     query_types = models.ManyToManyField(QueryType, verbose_name="Sorgu Türleri", blank=True)
@@ -162,17 +223,40 @@ class InsuranceCompanyItem(models.Model):
     is_car_query = models.BooleanField(verbose_name="Araç Sorgulama", default=False)
     cookie_use = models.BooleanField(verbose_name="Cookie Kullanımı", default=False)
     cookie = models.TextField(verbose_name="Cookie", null=True, blank=True)
-    partage = models.ForeignKey(Partage, verbose_name="Partaj", on_delete=models.CASCADE,null=True, blank=True)
+    partage = models.ForeignKey(Partage, verbose_name="Partaj", on_delete=models.CASCADE,null=True, blank=True, db_index=False)
+    credential_hash = models.CharField(verbose_name="Kimlik Bilgisi Özeti", max_length=64, null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(verbose_name="Oluşturulma Tarihi", auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name="Güncellenme Tarihi", auto_now=True)
     
     def __str__(self):
         return f"{self.insurance_company.name} - {self.company.name}"
     
+    def save(self, *args, **kwargs):
+        # Eski özet, TOTP cache kaydını geçersiz kılmak için saklanır
+        self.previous_credential_hash = self.credential_hash
+        self.credential_hash = make_credential_hash(self.username, self.password)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'username', 'password'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'credential_hash'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Sigorta Şirketi Öğesi"
         verbose_name_plural = "Sigorta Şirketi Öğeleri"
         ordering = ["-created_at"]
+        # Sık kullanılan filtreler varsayılan sıralama (-created_at) ile birlikte
+        # indekslenir; böylece filtre ve sıralama tek bir index taramasıyla yapılır
+        indexes = [
+            # by_partage_and_insurance_company, same_insurance_company_items, kardeş grupları
+            models.Index(fields=['partage', 'insurance_company', '-created_at'], name='item_partage_ic_created_idx'),
+            # by_partage, same_partage_companies
+            models.Index(fields=['partage', '-created_at'], name='item_partage_created_idx'),
+            # Company.insurance_items
+            models.Index(fields=['company', '-created_at'], name='item_company_created_idx'),
+            # active_items, car_query_items (sadece ilgili satırları içeren kısmi indeksler)
+            models.Index(fields=['-created_at'], name='item_active_created_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['-created_at'], name='item_car_query_created_idx', condition=models.Q(is_car_query=True)),
+        ]
 
 class InsuranceCompanyCookie(models.Model):
     insurance_company_item = models.ForeignKey(InsuranceCompanyItem, verbose_name="Sigorta Şirketi Öğesi", on_delete=models.CASCADE, related_name='cookies')
@@ -195,6 +279,8 @@ class InsuranceCompanyCookie(models.Model):
         (1, 'Medium'),
         (2, 'High')
     ])
+    # Cookie'nin son değiştiği anlık görüntü sürümü (InsuranceCompanyCookieJar.version)
+    version = models.PositiveIntegerField(verbose_name="Sürüm", default=0, editable=False)
     created_at = models.DateTimeField(verbose_name="Kayıt Tarihi", auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name="Güncellenme Tarihi", auto_now=True)
     
@@ -206,5 +292,69 @@ class InsuranceCompanyCookie(models.Model):
         verbose_name_plural = "Sigorta Şirketi Cookies"
         ordering = ["-created_at"]
         unique_together = ['insurance_company_item', 'name', 'domain']
+        indexes = [
+            # Süresi dolan cookie temizliği (api.cookie_sweeper); oturum cookie'leri indekse girmez
+            models.Index(fields=['expires'], name='cookie_expires_idx', condition=models.Q(expires__isnull=False)),
+        ]
+
+
+class InsuranceCompanyCookieJar(models.Model):
+    """
+    Öğenin tüm cookie'lerinin JSON olarak kodlanmış, sürümlü anlık görüntüsü.
+    Cookie satırları her değiştiğinde aynı transaction içinde yeniden yazılır
+    (api.cookies.save_cookie_jar); istemciler cookie'leri tek bir birincil anahtar
+    okumasıyla alır. Asıl kaynak InsuranceCompanyCookie tablosudur.
+    """
+    insurance_company_item = models.OneToOneField(InsuranceCompanyItem, verbose_name="Sigorta Şirketi Öğesi", on_delete=models.CASCADE, primary_key=True, related_name='cookie_jar')
+    version = models.PositiveIntegerField(verbose_name="Sürüm", default=1)
+    data = models.TextField(verbose_name="Kodlanmış Cookie'ler", default="[]")
+    # Anlık görüntüdeki en yakın son kullanma tarihi; geçtiyse okumada süresi dolanlar ayıklanır
+    next_expiry = models.DateTimeField(verbose_name="En Yakın Son Kullanma Tarihi", null=True, blank=True)
+    updated_at = models.DateTimeField(verbose_name="Güncellenme Tarihi", auto_now=True)
+    
+    def __str__(self):
+        return f"{self.insurance_company_item} v{self.version}"
+    
+    class Meta:
+        verbose_name = "Sigorta Şirketi Cookie Anlık Görüntüsü"
+        verbose_name_plural = "Sigorta Şirketi Cookie Anlık Görüntüleri"
 
 
+class InsuranceCompanyCookieTombstone(models.Model):
+    """
+    Silinen bir cookie'nin hangi anlık görüntü sürümünde silindiği. Değişiklik
+    sorgularında (api.cookies.cookie_changes) silinen cookie'leri bildirmek için
+    tutulur; anahtar başına tek satır olduğundan tablo büyümez.
+    """
+    insurance_company_item = models.ForeignKey(InsuranceCompanyItem, verbose_name="Sigorta Şirketi Öğesi", on_delete=models.CASCADE, related_name='cookie_tombstones')
+    name = models.CharField(verbose_name="Cookie Adı", max_length=255)
+    domain = models.CharField(verbose_name="Domain", max_length=255)
+    version = models.PositiveIntegerField(verbose_name="Sürüm")
+    removed_at = models.DateTimeField(verbose_name="Silinme Tarihi", auto_now=True)
+    
+    def __str__(self):
+        return f"{self.insurance_company_item} - {self.name} v{self.version}"
+    
+    class Meta:
+        verbose_name = "Silinen Sigorta Şirketi Cookie"
+        verbose_name_plural = "Silinen Sigorta Şirketi Cookies"
+        unique_together = ['insurance_company_item', 'name', 'domain']
+
+
+
+
+class DataVersion(models.Model):
+    """
+    Tablo bazlı sürüm sayacı. İlgili tabloda her değişiklikte artırılır ve
+    koleksiyonların ETag / Last-Modified değerleri bu sayaçlardan üretilir.
+    """
+    name = models.CharField(verbose_name="Tablo", max_length=100, unique=True)
+    version = models.BigIntegerField(verbose_name="Sürüm", default=0)
+    updated_at = models.DateTimeField(verbose_name="Güncellenme Tarihi", auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+    
+    class Meta:
+        verbose_name = "Veri Sürümü"
+        verbose_name_plural = "Veri Sürümleri"
@@ -0,0 +1,150 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from drf_yasg import openapi
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+cursor_parameter = openapi.Parameter(
+    'cursor',
+    openapi.IN_QUERY,
+    description=(
+        "Verilirse keyset (cursor) sayfalama kullanılır; ilk sayfa için boş bırakılır (?cursor=), "
+        "sonraki sayfalar için yanıttaki next bağlantısı izlenir"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+page_size_parameter = openapi.Parameter(
+    'page_size',
+    openapi.IN_QUERY,
+    description="Keyset sayfalamada sayfa başına kayıt sayısı",
+    type=openapi.TYPE_INTEGER
+)
+
+keyset_parameters = [cursor_parameter, page_size_parameter]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Sorgunun mevcut sıralamasına id (pk) eklenerek oluşturulan anahtar üzerinden
+    sayfalar. Sonraki sayfa OFFSET yerine son satırın sıralama değerlerinden
+    büyük/küçük koşuluyla alındığı için derin sayfalar da sabit maliyetlidir.
+    Sadece ileri yönde gezinmeyi destekler.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = "Geçersiz cursor."
+
+    @classmethod
+    def is_requested(cls, request):
+        return request is not None and cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """Görünümün keyset_ordering'i ya da sorgunun sıralaması; sonuna pk eklenir."""
+        ordering = list(
+            getattr(view, 'keyset_ordering', None) or queryset.query.order_by or queryset.model._meta.ordering
+        )
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        if not any(field.lstrip('-') in pk_names for field in ordering):
+            ordering.append('pk')
+        return ordering
+
+    def decode_cursor(self, request, length):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != length:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, values):
+        # Tarihler mikro saniye hassasiyetiyle yazılır; eşitlik karşılaştırması kayıpsız olmalı
+        payload = json.dumps(values, default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def after(self, ordering, values):
+        """(a, b, c) > (x, y, z) karşılaştırmasını alan bazında yönleri gözeterek kurar."""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for previous_field, value in zip(ordering[:index], values):
+                term &= Q(**{previous_field.lstrip('-'): value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset, view)
+        page_size = self.get_page_size(request)
+
+        # Sıralama değerleri ilişkili tablolarda olabileceği için anotasyon olarak okunur
+        keys = {f'keyset_{index}': F(field.lstrip('-')) for index, field in enumerate(self.ordering)}
+        queryset = queryset.annotate(**keys).order_by(*self.ordering)
+        values = self.decode_cursor(request, len(self.ordering))
+        if values is not None:
+            queryset = queryset.filter(self.after(self.ordering, values))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last_values = [getattr(rows[-1], key) for key in keys] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_values))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    ?cursor= verildiğinde list aksiyonu görünümün varsayılan sayfalaması
+    (PageNumberPagination veya hiç) yerine KeysetPagination kullanır.
+    """
+    # Boşsa sorgunun mevcut sıralaması kullanılır
+    keyset_ordering = None
+
+    @property
+    def paginator(self):
+        if KeysetPagination.is_requested(getattr(self, 'request', None)):
+            if not isinstance(getattr(self, '_paginator', None), KeysetPagination):
+                self._paginator = KeysetPagination()
+            return self._paginator
+        return super().paginator
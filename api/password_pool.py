@@ -0,0 +1,91 @@
+"""
+Şifre hash'lerinin süreç havuzunda paralel hesaplanması.
+
+PBKDF2 gibi hasher'lar bilerek yavaştır ve CPU'ya bağlıdır; GIL yüzünden iş
+parçacıkları hızlandırmaz. Toplu kullanıcı oluşturmada (api.provisioning)
+hash'ler istenen sayıda süreçlik, süreç başına bir kez oluşturulan bir havuza
+parçalar halinde dağıtılır. Havuzu provision_company_users komutu kullanır;
+istek yolunda PASSWORD_HASH_WORKERS varsayılan olarak 1'dir ve havuz açılmaz.
+Bu modül model içe aktarmaz; havuz süreçleri sadece hash hesaplar ve
+veritabanına bağlanmaz.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Bundan az şifre için süreçlere gönderme maliyeti kazancı aşar
+MIN_POOL_PASSWORDS = 4
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def setup_worker():
+    # spawn ile başlatılan süreçlerde ayarlar ve uygulamalar yüklenir; fork'ta zaten hazırdır
+    django.setup()
+
+
+def encode_passwords(hasher_path, passwords):
+    """Havuz sürecinde çalışır; hasher ana süreçte seçildiği gibi kullanılır."""
+    hasher = import_string(hasher_path)()
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
+
+
+def get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=setup_worker)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """Havuzu kapatır (gunicorn worker'ı çıkarken)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Şifreleri make_password ile aynı sonucu verecek şekilde hash'ler ve sırayı korur.
+    None şifreler kullanılamaz şifre olarak işaretlenir.
+    """
+    workers = workers or settings.PASSWORD_HASH_WORKERS
+    hashed = [make_password(None) if password is None else None for password in passwords]
+    pending = [index for index, password in enumerate(passwords) if password is not None]
+    values = [passwords[index] for index in pending]
+
+    hasher = get_hasher()
+    # Havuz süreçleri ayarları kendi süreçlerinde okuduğu için hasher sınıf yoluyla iletilir
+    hasher_path = f'{type(hasher).__module__}.{type(hasher).__qualname__}'
+    if workers > 1 and len(values) >= MIN_POOL_PASSWORDS:
+        chunk_size = -(-len(values) // workers)
+        chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+        try:
+            results = get_pool(workers).map(encode_passwords, [hasher_path] * len(chunks), chunks)
+            encoded = [value for chunk in results for value in chunk]
+        except BrokenProcessPool:
+            logger.exception("Şifre hash havuzu çöktü; hash'ler süreç içinde hesaplanıyor")
+            shutdown_pool()
+            encoded = encode_passwords(hasher_path, values)
+    else:
+        encoded = encode_passwords(hasher_path, values)
+
+    for index, value in zip(pending, encoded):
+        hashed[index] = value
+    return hashed
@@ -0,0 +1,125 @@
+"""
+Toplu CompanyUser oluşturma (acente içe aktarımı).
+
+Satırlar tek geçişte doğrulanır; kullanıcı adı tekliği ve roller satır başına
+değil toplu tek sorguyla denetlenir. Şifre hash'leri süreç havuzunda paralel
+hesaplanır (api.password_pool), ardından User, CompanyUser ve rol bağlantıları
+tek transaction içinde toplu INSERT'lerle yazılır. Company.user_limit parti
+başına bir kez, şirket satırı kilitliyken denetlenir.
+"""
+from django.contrib.auth.models import User, UserManager
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Company, CompanyUser, Role
+from .password_pool import hash_passwords
+from .serializers import CompanyUserProvisionSerializer
+
+MAX_PROVISION_ROWS = 1000
+BATCH_SIZE = 1000
+
+USER_LIMIT_ERROR = "Şirket kullanıcı limiti aşıldı."
+
+
+def row_error(index, errors):
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def validate_rows(rows):
+    """Satırları doğrular; (index, veri) listesi ve hatalı satırların sonuçlarını döndürür."""
+    validator = CompanyUserProvisionSerializer()
+    errors = {}
+    valid = []
+    usernames = set()
+    for index, row in enumerate(rows):
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as e:
+            errors[index] = row_error(index, e.detail)
+            continue
+        # create_user ile aynı normalizasyon
+        data['username'] = User.normalize_username(data['username'])
+        data['email'] = UserManager.normalize_email(data['email'])
+        if data['username'] in usernames:
+            errors[index] = row_error(index, {'username': ["Duplicate username in request."]})
+            continue
+        usernames.add(data['username'])
+        valid.append((index, data))
+
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    roles = set(Role.objects.filter(
+        pk__in={role_id for _, data in valid for role_id in data['roles']}
+    ).values_list('pk', flat=True))
+
+    checked = []
+    for index, data in valid:
+        row_errors = {}
+        if data['username'] in taken:
+            row_errors['username'] = ["A user with that username already exists."]
+        unknown = [role_id for role_id in data['roles'] if role_id not in roles]
+        if unknown:
+            row_errors['roles'] = [f'Invalid pk "{role_id}" - object does not exist.' for role_id in unknown]
+        if row_errors:
+            errors[index] = row_error(index, row_errors)
+        else:
+            checked.append((index, data))
+    return checked, errors
+
+
+def results_without_write(rows, errors):
+    return [errors.get(index, {'index': index, 'status': 'skipped'}) for index in range(len(rows))], False
+
+
+def provision_company_users(company, rows, all_or_nothing=False, workers=None):
+    """
+    Satırlardan company şirketine kullanıcı oluşturur. Satır sırasıyla sonuç listesi
+    ve yazım yapılıp yapılmadığını döndürür; all_or_nothing ile tek bir hatalı satır
+    (kullanıcı limiti aşımı dahil) tüm partiyi reddeder. user_limit 0 ise sınır yoktur.
+    """
+    checked, errors = validate_rows(rows)
+    if errors and (all_or_nothing or not checked):
+        return results_without_write(rows, errors)
+
+    # CPU'ya bağlı iş transaction ve kilit dışında yapılır
+    passwords = hash_passwords([data['password'] for _, data in checked], workers)
+
+    now = timezone.now()
+    with transaction.atomic():
+        user_limit = Company.objects.select_for_update().filter(pk=company.pk).values_list('user_limit', flat=True).get()
+        if user_limit > 0:
+            remaining = max(user_limit - CompanyUser.objects.filter(company_id=company.pk).count(), 0)
+            for index, _ in checked[remaining:]:
+                errors[index] = row_error(index, {'non_field_errors': [USER_LIMIT_ERROR]})
+            if len(checked) > remaining and (all_or_nothing or not remaining):
+                return results_without_write(rows, errors)
+            checked, passwords = checked[:remaining], passwords[:remaining]
+
+        users = User.objects.bulk_create([
+            User(
+                username=data['username'], email=data['email'], password=password,
+                first_name=data['first_name'], last_name=data['last_name'], date_joined=now
+            )
+            for (_, data), password in zip(checked, passwords)
+        ], batch_size=BATCH_SIZE)
+        company_users = CompanyUser.objects.bulk_create([
+            CompanyUser(
+                user_id=user.pk, company_id=company.pk, is_admin=data['is_admin'],
+                is_active=data['is_active'], expires_at=data['expires_at']
+            )
+            for (_, data), user in zip(checked, users)
+        ], batch_size=BATCH_SIZE)
+        through = CompanyUser.roles.through
+        through.objects.bulk_create([
+            through(companyuser_id=company_user.pk, role_id=role_id)
+            for (_, data), company_user in zip(checked, company_users)
+            for role_id in dict.fromkeys(data['roles'])
+        ], batch_size=BATCH_SIZE * 10)
+
+    results = dict(errors)
+    for (index, data), company_user in zip(checked, company_users):
+        results[index] = {
+            'index': index, 'status': 'created', 'id': company_user.pk,
+            'user_id': company_user.user_id, 'username': data['username']
+        }
+    return [results[index] for index in range(len(rows))], True
@@ -0,0 +1,112 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from sigorta_api.db_router import pin_primary, use_primary
+from sigorta_api.metrics import record_cache
+
+from .conditional import set_validator_headers
+from .streaming import StreamingListMixin
+from .versions import get_versions, version_name
+
+
+class CachedResponse(Exception):
+    """initial() içinde cache'ten yanıt bulunduğunda handler'ı atlamak için kullanılır."""
+    def __init__(self, response):
+        self.response = response
+
+
+class ResponseCacheMixin:
+    """
+    Az değişen referans verisi uçlarının render edilmiş yanıtlarını cache'te tutar.
+
+    Anahtar; görünüm, aksiyon, istek adresi (query parametreleri dahil), kullanıcının
+    şirketi ve bağlı modellerin veritabanındaki sürüm sayaçlarından (DataVersion)
+    oluşur. Sayaçlar model sinyalleriyle commit sonrasında artırıldığı için yazma
+    işlemleri eski yanıtları tüm worker'larda kendiliğinden geçersiz kılar; cache
+    süreç başına olsa bile eski yanıt dönmez. Sayaçlar tek sorguda okunur.
+    ConditionalGetMixin'den sonra (MRO'da daha içte) yer almalıdır; okunan sayaçlar
+    doğrulayıcılar için de kullanılır, isabette ise doğrulayıcılar cache'ten gelir.
+    """
+    response_cache_actions = ('list', 'all_items_no_pagination')
+    # Boşsa görünümün queryset modeli kullanılır
+    response_cache_models = ()
+
+    def get_response_cache_models(self):
+        return self.response_cache_models or [self.queryset.model]
+
+    def is_response_cacheable(self, request):
+        if request.method not in ('GET', 'HEAD') or self.action not in self.response_cache_actions:
+            return False
+        return not (isinstance(self, StreamingListMixin) and self.wants_stream(request))
+
+    def get_tenant(self, request):
+        company_user = getattr(request.user, 'companyuser', None) if request.user.is_authenticated else None
+        return company_user.company_id if company_user else 'anon'
+
+    def get_response_cache_key(self, request):
+        models = self.get_response_cache_models()
+        # ConditionalGetMixin'in modelleri de aynı sorguda okunur
+        conditional_models = self.get_conditional_models() if hasattr(self, 'get_conditional_models') else ()
+        # Cache'e yazılacak yanıtın anahtarı replika gecikmesinden etkilenmesin
+        with use_primary():
+            self.data_versions = get_versions({*models, *conditional_models})
+        parts = [request.get_host(), request.get_full_path()]
+        for model in models:
+            # Sayaç satırı silinip yeniden oluşturulursa updated_at anahtarı yine değiştirir
+            version, updated_at = self.data_versions.get(version_name(model), (0, None))
+            parts.append(f"{version_name(model)}:{version}:{updated_at and updated_at.timestamp()}")
+        digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+        return f"response:{type(self).__name__}:{self.action}:{self.get_tenant(request)}:{digest}"
+
+    def initial(self, request, *args, **kwargs):
+        # Kimlik doğrulama ve yetki kontrolleri cache'e bakılmadan önce çalışır
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        if not self.is_response_cacheable(request):
+            return
+
+        self.response_cache_key = self.get_response_cache_key(request)
+        cached = cache.get(self.response_cache_key)
+        record_cache('response', cached is not None)
+        if cached is None:
+            # Cache'e yazılacak yanıt replika gecikmesinden etkilenmemeli
+            pin_primary()
+            return
+
+        content, content_type, validators = cached
+        response = None
+        if validators:
+            etag, last_modified = validators
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=last_modified and int(last_modified.timestamp())
+            )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        if validators:
+            set_validator_headers(response, validators)
+        raise CachedResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CachedResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key and response.status_code == 200 and not response.streaming and hasattr(response, 'render'):
+            response.render()
+            # ConditionalGetMixin doğrulayıcıları da yanıtla birlikte saklanır
+            validators = getattr(self, 'validators', None)
+            cache.set(
+                key,
+                (response.content, response['Content-Type'], validators),
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
@@ -1,9 +1,13 @@
 from rest_framework import serializers
+from django.db import models
 from .models import Company, CompanyUser, InsuranceCompany, InsuranceCompanyItem, InsuranceCompanyCookie, Role, QueryType, RolePermission, Partage
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth import authenticate
+from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
+from .sparse import PrefetchListSerializer, SparseFieldsMixin
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,26 +45,52 @@ class CompanySerializer(serializers.ModelSerializer):
         model = Company
         fields = '__all__'
 
-class CompanyUserSerializer(serializers.ModelSerializer):
+class CompanyUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     company = CompanySerializer(read_only=True)
     roles = RoleSerializer(many=True, read_only=True)
     
+    expandable_fields = {'user': 'pk', 'company': 'pk', 'roles': 'pk'}
+    prefetch_fields = ['user', 'company', 'roles']
+    
     class Meta:
         model = CompanyUser
         fields = '__all__'
+        list_serializer_class = PrefetchListSerializer
         
 class CompanyUserCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CompanyUser
         fields = '__all__'
 
+class CompanyUserProvisionSerializer(serializers.Serializer):
+    """
+    Toplu kullanıcı oluşturmada (api.provisioning) tek bir satırın alan doğrulaması.
+    Kullanıcı adı tekliği ve rollerin varlığı satır başına sorgu yerine toplu denetlenir.
+    """
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(required=False, allow_blank=True, default='')
+    password = serializers.CharField(max_length=128, required=False, allow_null=True, default=None, trim_whitespace=False)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    is_admin = serializers.BooleanField(required=False, default=False)
+    is_active = serializers.BooleanField(required=False, default=True)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True, default=None)
+    roles = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+
 class CompanyLoginSerializer(serializers.Serializer):
     username = serializers.CharField(max_length=150)
     password = serializers.CharField(max_length=128, write_only=True)
     company_code = serializers.CharField(max_length=255)
     
     def validate(self, data):
+        """
+        Kullanıcı authenticate() ile doğrulanır; böylece AUTHENTICATION_BACKENDS,
+        user_login_failed sinyali ve is_active kontrolü devrededir. Varsayılan
+        backend (api.backends.CompanyUserBackend) kullanıcıyı şirket kullanıcısı,
+        şirket ve token ile tek sorguda yükler. Şirket sorgusu sadece kullanıcının
+        şirketi istenen koddan farklıysa yapılır; şirket hataları yine önceliklidir.
+        """
         username = data.get('username')
         password = data.get('password')
         company_code = data.get('company_code')
@@ -68,42 +98,55 @@ class CompanyLoginSerializer(serializers.Serializer):
         if not username or not password or not company_code:
             raise ValidationError("Kullanıcı adı, şifre ve şirket kodu gerekli.")
         
-        # Şirket kodunu kontrol et
+        # Kullanıcıyı doğrula
+        user = authenticate(request=self.context.get('request'), username=username, password=password)
+        
         try:
-            company = Company.objects.get(code=company_code)
-            if not company.is_active:
-                raise ValidationError("Şirket aktif değil.")
-            
-            # Şirket süresi dolmuş mu kontrol et
-            if company.expires_at and company.expires_at < timezone.now():
-                raise ValidationError("Şirket abonelik süresi dolmuş.")
-        except Company.DoesNotExist:
-            raise ValidationError("Geçersiz şirket kodu.")
+            company_user = user.companyuser if user else None
+        except CompanyUser.DoesNotExist:
+            company_user = None
         
-        # Kullanıcıyı doğrula
-        user = authenticate(username=username, password=password)
-        if not user:
+        # Şirket kodunu kontrol et
+        if company_user and company_user.company.code == company_code:
+            company = company_user.company
+        else:
+            company = Company.objects.filter(code=company_code).first()
+            if company is None:
+                raise ValidationError("Geçersiz şirket kodu.")
+        
+        if not company.is_active:
+            raise ValidationError("Şirket aktif değil.")
+        
+        # Şirket süresi dolmuş mu kontrol et
+        if company.expires_at and company.expires_at < timezone.now():
+            raise ValidationError("Şirket abonelik süresi dolmuş.")
+        
+        if user is None:
             raise ValidationError("Geçersiz kullanıcı adı veya şifre.")
         
         # Kullanıcının bu şirkete bağlı olup olmadığını kontrol et
-        try:
-            company_user = CompanyUser.objects.get(user=user, company=company)
-            
-            # Kullanıcı aktif mi kontrol et
-            if not company_user.is_active:
-                raise ValidationError("Kullanıcı hesabı aktif değil.")
-            
-            # Kullanıcı süresi dolmuş mu kontrol et
-            if company_user.expires_at and company_user.expires_at < timezone.now():
-                raise ValidationError("Kullanıcı hesabı süresi dolmuş.")
-                
-        except CompanyUser.DoesNotExist:
+        if company_user is None or company_user.company_id != company.id:
             raise ValidationError("Bu kullanıcı bu şirkete bağlı değil.")
         
+        # Kullanıcı aktif mi kontrol et
+        if not company_user.is_active:
+            raise ValidationError("Kullanıcı hesabı aktif değil.")
+        
+        # Kullanıcı süresi dolmuş mu kontrol et
+        if company_user.expires_at and company_user.expires_at < timezone.now():
+            raise ValidationError("Kullanıcı hesabı süresi dolmuş.")
+        
+        # Token oluştur veya join ile gelen mevcut olanı kullan
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token, created = Token.objects.get_or_create(user=user)
+        
         # Doğrulama başarılı, kullanıcı ve şirket bilgilerini döndür
         data['user'] = user
         data['company'] = company
         data['company_user'] = company_user
+        data['token'] = token
         return data
 
 class InsuranceCompanySerializer(serializers.ModelSerializer):
@@ -111,30 +154,42 @@ class InsuranceCompanySerializer(serializers.ModelSerializer):
         model = InsuranceCompany
         fields = '__all__'
 
+class UnexpiredCookieListSerializer(serializers.ListSerializer):
+    """Süresi dolmuş cookie'leri yanıttan çıkarır; satırlar api.cookie_sweeper silene kadar tabloda kalır."""
+
+    def to_representation(self, data):
+        now = timezone.now()
+        cookies = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return super().to_representation([cookie for cookie in cookies if cookie.expires is None or cookie.expires > now])
+
+
 class InsuranceCompanyCookieSerializer(serializers.ModelSerializer):
     class Meta:
         model = InsuranceCompanyCookie
         fields = '__all__'
+        list_serializer_class = UnexpiredCookieListSerializer
 
 class InsuranceCompanyCookieCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = InsuranceCompanyCookie
         exclude = ['created_at', 'updated_at']
 
-class PartageSerializer(serializers.ModelSerializer):
+class PartageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Partage
         fields = '__all__'
 
-class PartageDetailSerializer(serializers.ModelSerializer):
+class PartageDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     related_companies = serializers.SerializerMethodField()
     
+    expandable_fields = {'related_companies': None}
+    
     class Meta:
         model = Partage
         fields = '__all__'
     
     def get_related_companies(self, obj):
-        items = InsuranceCompanyItem.objects.filter(partage=obj)
+        items = InsuranceCompanyItem.objects.filter(partage=obj).select_related('company', 'insurance_company')
         
         # Bu öğelerin şirketlerini al
         companies = []
@@ -155,72 +210,162 @@ class PartageDetailSerializer(serializers.ModelSerializer):
         return companies
         
 
-class InsuranceCompanyItemSerializer(serializers.ModelSerializer):
+def sibling_item_data(item):
+    """Aynı partaj ve sigorta şirketine sahip bir öğenin özet bilgisini döndürür."""
+    return {
+        'id': item.id,
+        'company': {
+            'id': item.company.id,
+            'name': item.company.name,
+            'code': item.company.code
+        },
+        'insurance_company': {
+            'id': item.insurance_company.id,
+            'name': item.insurance_company.name,
+            'code': item.insurance_company.code
+        },
+        'partage': {
+            'id': item.partage.id, 
+            'name': item.partage.name, 
+            'code': item.partage.code
+        },
+        'is_active': item.is_active,
+        'is_proxy_active': item.is_proxy_active,
+        'is_car_query': item.is_car_query
+    }
+
+
+def build_sibling_groups(items):
+    """
+    Verilen öğelerin (partage_id, insurance_company_id) gruplarını toplu olarak yükler.
+    Sonuç, anahtarı grup olan ve değeri o gruptaki tüm öğeler olan bir sözlüktür.
+    """
+    groups, candidate_querysets = sibling_candidates(items)
+    for candidates in candidate_querysets:
+        for candidate in candidates:
+            group = groups.get((candidate.partage_id, candidate.insurance_company_id))
+            if group is not None:
+                group.append(candidate)
+    return groups
+
+
+# Tek sorguda filtrelenen partage id sayısı; SQLite'ın parametre sınırının altında kalır
+SIBLING_CHUNK_SIZE = 500
+
+
+def sibling_candidates(items):
+    """
+    Boş grup sözlüğünü ve gruplara girebilecek öğelerin sorgularını döndürür;
+    sync ve async yüklemede ortak kullanılır. Sorgular partage ve sigorta şirketi
+    id'lerini ayrı __in filtreleriyle (indeks kullanılabilir) seçer; istenmeyen
+    çiftlerin satırları çağıran tarafından grup sözlüğünde bulunmadığı için atlanır.
+    Partage id'leri SIBLING_CHUNK_SIZE'lık parçalara bölünür.
+    """
+    keys = {
+        (item.partage_id, item.insurance_company_id)
+        for item in items
+        if item.partage_id and item.insurance_company_id
+    }
+    groups = {key: [] for key in keys}
+    partage_ids = sorted({partage_id for partage_id, _ in keys})
+    insurance_company_ids = {insurance_company_id for _, insurance_company_id in keys}
+    candidate_querysets = [
+        InsuranceCompanyItem.objects.filter(
+            partage_id__in=partage_ids[start:start + SIBLING_CHUNK_SIZE],
+            insurance_company_id__in=insurance_company_ids
+        ).select_related('company', 'insurance_company', 'partage')
+        for start in range(0, len(partage_ids), SIBLING_CHUNK_SIZE)
+    ]
+    return groups, candidate_querysets
+
+
+class InsuranceCompanyItemListSerializer(PrefetchListSerializer):
+    """
+    Listeyi serialize etmeden önce ilişkili kayıtları ve kardeş öğe gruplarını
+    toplu olarak yükler; böylece sorgu sayısı satır sayısından bağımsız kalır.
+    """
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'same_insurance_company_items' in self.child.fields and 'sibling_groups' not in self._context:
+            self._context['sibling_groups'] = build_sibling_groups(items)
+        return super().to_representation(items)
+
+
+class InsuranceCompanyItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     query_types = QueryTypeSerializer(many=True, read_only=True)
     same_insurance_company_items = serializers.SerializerMethodField()
     insurance_company = InsuranceCompanySerializer(read_only=True)
     cookies = InsuranceCompanyCookieSerializer(many=True, read_only=True)
     
+    expandable_fields = {
+        'insurance_company': 'pk',
+        'query_types': 'pk',
+        'cookies': None,
+        'same_insurance_company_items': None,
+    }
+    prefetch_fields = ['insurance_company', 'query_types', 'cookies']
+    
     class Meta:
         model = InsuranceCompanyItem
-        fields = '__all__'
+        exclude = ['credential_hash']
+        list_serializer_class = InsuranceCompanyItemListSerializer
     
     def get_same_insurance_company_items(self, obj):
-        # Bu öğenin partajını ve sigorta şirketini al
-        partage = obj.partage
-        insurance_company = obj.insurance_company
-        
-        if not partage or not insurance_company:
+        if not obj.partage_id or not obj.insurance_company_id:
             return []
         
-        # Aynı partaja ve aynı sigorta şirketine sahip diğer öğeleri bul
-        related_items = InsuranceCompanyItem.objects.filter(
-            partage=partage,
-            insurance_company=insurance_company
-        ).exclude(id=obj.id).distinct()
-        
-        # Öğe bilgilerini hazırla
-        items_data = []
-        for related_item in related_items:
-            item_data = {
-                'id': related_item.id,
-                'company': {
-                    'id': related_item.company.id,
-                    'name': related_item.company.name,
-                    'code': related_item.company.code
-                },
-                'insurance_company': {
-                    'id': related_item.insurance_company.id,
-                    'name': related_item.insurance_company.name,
-                    'code': related_item.insurance_company.code
-                },
-                'partage': {
-                    'id': related_item.partage.id, 
-                    'name': related_item.partage.name, 
-                    'code': related_item.partage.code
-                },
-                'is_active': related_item.is_active,
-                'is_proxy_active': related_item.is_proxy_active,
-                'is_car_query': related_item.is_car_query
-            }
-            items_data.append(item_data)
+        # Liste serializer'ı grupları context üzerinden önceden yüklemiş olabilir
+        sibling_groups = self.context.get('sibling_groups')
+        key = (obj.partage_id, obj.insurance_company_id)
+        if sibling_groups is None or key not in sibling_groups:
+            sibling_groups = build_sibling_groups([obj])
         
-        return items_data
+        # Aynı partaja ve aynı sigorta şirketine sahip diğer öğeleri döndür
+        return [
+            sibling_item_data(related_item)
+            for related_item in sibling_groups[key]
+            if related_item.id != obj.id
+        ]
     
     
         
 class InsuranceCompanyItemCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = InsuranceCompanyItem
-        fields = '__all__'
+        exclude = ['credential_hash']
 
-class InsuranceCompanyItemDetailSerializer(serializers.ModelSerializer):
+class InsuranceCompanyItemBulkSerializer(serializers.ModelSerializer):
+    """
+    Toplu yazımda (api.bulk) tek bir satırın alan doğrulaması. İlişkiler id, sorgu
+    türleri kod olarak alınır; varlıkları satır başına sorgu yerine toplu denetlenir.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    insurance_company = serializers.IntegerField(min_value=1)
+    company = serializers.IntegerField(min_value=1)
+    partage = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    query_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=QueryType.INSURANCE_TYPE_CHOICES), required=False
+    )
+
+    class Meta:
+        model = InsuranceCompanyItem
+        exclude = ['credential_hash', 'created_at', 'updated_at']
+
+class InsuranceCompanyItemDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     insurance_company = InsuranceCompanySerializer(read_only=True)
     company = CompanySerializer(read_only=True)
     query_types = QueryTypeSerializer(many=True, read_only=True)
     partage = PartageSerializer(read_only=True)
     cookies = InsuranceCompanyCookieSerializer(many=True, read_only=True)
     
+    expandable_fields = {
+        'insurance_company': 'pk',
+        'company': 'pk',
+        'query_types': 'pk',
+        'partage': 'pk',
+        'cookies': None,
+    }
+    
     class Meta:
         model = InsuranceCompanyItem
-        fields = '__all__' 
\ No newline at end of file
+        exclude = ['credential_hash'] 
\ No newline at end of file
@@ -0,0 +1,182 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache_key
+from .cookies import change_version, record_removal, schedule_cookie_jar
+from .totp import totp_cache_key
+from .models import (
+    Company, CompanyUser, InsuranceCompany, InsuranceCompanyCookie, InsuranceCompanyItem,
+    Partage, QueryType, Role, RolePermission, permission_cache_key
+)
+from .versions import mark_changed
+
+VERSIONED_MODELS = [Company, InsuranceCompany, InsuranceCompanyItem, InsuranceCompanyCookie, Partage, QueryType, Role]
+
+
+def delete_cache_keys(keys):
+    """Cache anahtarlarını işlem commit edildiğinde siler."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_permissions(company_user_ids):
+    """Verilen şirket kullanıcılarının yetki önbelleğini siler."""
+    delete_cache_keys(permission_cache_key(company_user_id) for company_user_id in set(company_user_ids))
+
+
+def invalidate_tokens(token_keys):
+    """Verilen token'ların kimlik doğrulama cache kayıtlarını siler."""
+    delete_cache_keys(token_cache_key(key) for key in set(token_keys))
+
+
+def company_user_ids_for_roles(role_ids):
+    return CompanyUser.roles.through.objects.filter(
+        role_id__in=role_ids
+    ).values_list('companyuser_id', flat=True)
+
+
+@receiver(pre_save, sender=RolePermission)
+def role_permission_pre_save(sender, instance, **kwargs):
+    # Yetki başka bir role taşınırsa eski rolün kullanıcıları da etkilenir
+    instance._previous_role_id = None
+    if instance.pk is not None:
+        instance._previous_role_id = RolePermission.objects.filter(
+            pk=instance.pk
+        ).values_list('role_id', flat=True).first()
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def role_permission_changed(sender, instance, **kwargs):
+    role_ids = {instance.role_id, getattr(instance, '_previous_role_id', None)} - {None}
+    invalidate_permissions(company_user_ids_for_roles(role_ids))
+
+
+@receiver(pre_save, sender=Role)
+def role_pre_save(sender, instance, **kwargs):
+    # Sadece aktiflik durumu değiştiğinde kullanıcıların yetkileri etkilenir
+    if instance.pk is None:
+        return
+    previous = Role.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+    if previous is not None and previous != instance.is_active:
+        invalidate_permissions(company_user_ids_for_roles([instance.pk]))
+
+
+@receiver(pre_delete, sender=Role)
+def role_pre_delete(sender, instance, **kwargs):
+    # Ara tablo satırları cascade ile silinmeden önce etkilenen kullanıcıları topla
+    invalidate_permissions(company_user_ids_for_roles([instance.pk]))
+
+
+@receiver(pre_save, sender=QueryType)
+def query_type_pre_save(sender, instance, **kwargs):
+    # Yetki yapısı sorgu türü adına göre tutulduğu için ad değişikliği önbelleği bozar
+    if instance.pk is None:
+        return
+    previous = QueryType.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    if previous is not None and previous != instance.name:
+        role_ids = RolePermission.objects.filter(query_type=instance).values_list('role_id', flat=True)
+        invalidate_permissions(company_user_ids_for_roles(role_ids))
+
+
+@receiver(pre_save, sender=CompanyUser)
+def company_user_pre_save(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    previous = CompanyUser.objects.filter(pk=instance.pk).values_list('is_admin', flat=True).first()
+    if previous is not None and previous != instance.is_admin:
+        invalidate_permissions([instance.pk])
+
+
+@receiver(post_delete, sender=CompanyUser)
+def company_user_deleted(sender, instance, **kwargs):
+    invalidate_permissions([instance.pk])
+
+
+@receiver(m2m_changed, sender=CompanyUser.roles.through)
+def company_user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # company_user.roles.add/remove/clear
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_permissions([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # role.companyuser_set.add/remove
+        invalidate_permissions(pk_set or [])
+    elif action == 'pre_clear':
+        # role.companyuser_set.clear: satırlar silinmeden önce kullanıcıları topla
+        invalidate_permissions(instance.companyuser_set.values_list('pk', flat=True))
+
+
+def versioned_model_changed(sender, **kwargs):
+    mark_changed(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(versioned_model_changed, sender=model, dispatch_uid=f'version-save-{model._meta.label_lower}')
+    post_delete.connect(versioned_model_changed, sender=model, dispatch_uid=f'version-delete-{model._meta.label_lower}')
+
+
+@receiver(m2m_changed, sender=InsuranceCompanyItem.query_types.through)
+def item_query_types_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        mark_changed(InsuranceCompanyItem)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Çıkış ve token yenileme
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=CompanyUser)
+@receiver(post_delete, sender=CompanyUser)
+def company_user_changed(sender, instance, **kwargs):
+    invalidate_tokens(Token.objects.filter(user_id=instance.user_id).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Company)
+def company_changed(sender, instance, **kwargs):
+    invalidate_tokens(Token.objects.filter(user__companyuser__company=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=InsuranceCompanyItem)
+@receiver(post_delete, sender=InsuranceCompanyItem)
+def item_credentials_changed(sender, instance, **kwargs):
+    # Hem eski hem yeni kimlik bilgisi özetine ait TOTP kayıtları silinir
+    hashes = {instance.credential_hash, getattr(instance, 'previous_credential_hash', None)}
+    delete_cache_keys(totp_cache_key(credential_hash) for credential_hash in hashes if credential_hash)
+
+
+@receiver(pre_save, sender=InsuranceCompanyCookie)
+def cookie_pre_save(sender, instance, **kwargs):
+    # Tekil kayıtlar (yönetim paneli, ORM) da değişiklik sorgularında görünsün
+    instance.version = change_version(instance.insurance_company_item_id)
+    if instance.pk is None:
+        return
+    previous = InsuranceCompanyCookie.objects.filter(pk=instance.pk).values_list('name', 'domain').first()
+    if previous is not None and previous != (instance.name, instance.domain):
+        # Anahtarı değişen cookie istemciler için eski anahtarın silinmesidir
+        record_removal(instance.insurance_company_item_id, *previous)
+
+
+@receiver(post_save, sender=InsuranceCompanyCookie)
+def cookie_saved(sender, instance, **kwargs):
+    schedule_cookie_jar(instance.insurance_company_item_id, instance.version)
+
+
+@receiver(post_delete, sender=InsuranceCompanyCookie)
+def cookie_deleted(sender, instance, origin=None, **kwargs):
+    # Öğe (ya da üst kaydı) silinirken anlık görüntü de cascade ile silinir
+    origin_model = origin._meta.model if hasattr(origin, '_meta') else getattr(origin, 'model', None)
+    if origin_model is InsuranceCompanyCookie:
+        record_removal(instance.insurance_company_item_id, instance.name, instance.domain)
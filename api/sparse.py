@@ -0,0 +1,95 @@
+from django.db import models
+from django.db.models import prefetch_related_objects
+from drf_yasg import openapi
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+fields_parameter = openapi.Parameter(
+    'fields',
+    openapi.IN_QUERY,
+    description="Virgülle ayrılmış alan listesi; verilirse sadece bu alanlar döndürülür (ör. id,username)",
+    type=openapi.TYPE_STRING
+)
+
+expand_parameter = openapi.Parameter(
+    'expand',
+    openapi.IN_QUERY,
+    description=(
+        "Virgülle ayrılmış ilişki listesi; fields veya expand verildiğinde sadece burada "
+        "listelenen ilişkiler iç içe döndürülür, diğerleri id olarak döner ya da çıkarılır"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+sparse_parameters = [fields_parameter, expand_parameter]
+
+
+def split_param(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= ile alan seçimi ve ?expand= ile iç içe ilişkilerin isteğe bağlı açılması.
+
+    İki parametre de verilmezse çıktı değişmez. Biri verildiğinde expandable_fields
+    içindeki ilişkilerden sadece expand'de listelenenler iç içe serialize edilir;
+    diğerleri 'pk' ise id (veya id listesi) olarak döner, None ise tamamen çıkarılır.
+    Parametreler sadece en üst seviye serializer için istekten okunur.
+    """
+    # Alan adı -> ilişki açılmadığında kullanılacak gösterim ('pk' veya None)
+    expandable_fields = {}
+
+    def get_sparse_params(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return None
+        query_params = getattr(request, 'query_params', request.GET)
+        if 'fields' not in query_params and 'expand' not in query_params:
+            return None
+        return split_param(query_params.get('fields')), split_param(query_params.get('expand'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        params = self.get_sparse_params()
+        if params is None:
+            return fields
+
+        requested, expanded = params
+        for name, collapsed in self.expandable_fields.items():
+            if name not in fields or name in expanded:
+                continue
+            if collapsed == 'pk':
+                many = isinstance(fields[name], (serializers.ListSerializer, ManyRelatedField))
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many)
+            else:
+                del fields[name]
+
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+
+class PrefetchListSerializer(serializers.ListSerializer):
+    """
+    Listeyi serialize etmeden önce child serializer'ın prefetch_fields içinde
+    tanımlı ve etkin alanlarda kullanılan ilişkilerini toplu olarak yükler.
+    Sadece id olarak dönen tekil ilişkiler için sorgu yapılmaz.
+    """
+    def get_prefetch_lookups(self):
+        lookups = []
+        for name in getattr(self.child, 'prefetch_fields', ()):
+            field = self.child.fields.get(name)
+            if field is not None and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                lookups.append(name)
+        return lookups
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_related_objects(items, *self.get_prefetch_lookups())
+        return super().to_representation(items)
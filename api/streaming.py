@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from drf_yasg import openapi
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+stream_parameter = openapi.Parameter(
+    'stream',
+    openapi.IN_QUERY,
+    description="1 ise liste parça parça (streaming) JSON olarak döndürülür",
+    type=openapi.TYPE_BOOLEAN,
+    default=False
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class StreamingListMixin:
+    """
+    Sayfalanmamış listeleri ?stream=1 verildiğinde sunucu taraflı cursor ile
+    okuyup parça parça serialize eder ve geçerli bir JSON dizisi olarak yazar.
+    Bellek kullanımı tablo boyutuna değil stream_batch_size'a bağlıdır.
+    """
+    stream_batch_size = 500
+
+    def wants_stream(self, request):
+        return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+    def list_response(self, queryset):
+        if self.wants_stream(self.request):
+            return StreamingHttpResponse(self.stream_json(queryset), content_type='application/json')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def stream_json(self, queryset):
+        renderer = JSONRenderer()
+        rows = queryset.iterator(chunk_size=self.stream_batch_size)
+
+        yield b'['
+        for index, batch in enumerate(batched(rows, self.stream_batch_size)):
+            # Her parça JSONRenderer ile render edilip köşeli parantezleri atılır;
+            # böylece çıktı normal yanıtla byte bazında aynı kalır
+            serializer = self.get_serializer(batch, many=True)
+            if index:
+                yield b','
+            yield renderer.render(serializer.data)[1:-1]
+        yield b']'
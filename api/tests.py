@@ -1,3 +1,2588 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from itertools import groupby
+from unittest import mock
 
-# Create your tests here.
+import django
+import pyotp
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, is_password_usable, make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from sigorta_api.metrics import MetricsStore, store as metrics_store
+from sigorta_api.middleware import DuplicateQueryError, ReplicaRoutingMiddleware, normalize_sql
+from sigorta_api.warmup import warm_imports, warm_models, warm_serializers, warm_urls
+
+from .async_views import abuild_sibling_groups
+from .authentication import token_cache_key
+from .bulk import MAX_BULK_ROWS
+from .cookie_sweeper import sweep_expired_cookies, sweep_lease
+from .cookies import COOKIE_JAR_FIELDS, encode_cookie_jar
+from .models import (
+    Company, CompanyUser, InsuranceCompany, InsuranceCompanyItem, InsuranceCompanyCookie,
+    InsuranceCompanyCookieJar, Role, QueryType, RolePermission, Partage, make_credential_hash, permission_cache_key
+)
+from .pagination import KeysetPagination
+from .password_pool import MIN_POOL_PASSWORDS, hash_passwords, shutdown_pool
+from .serializers import SIBLING_CHUNK_SIZE, InsuranceCompanyCookieSerializer, build_sibling_groups
+from .versions import bump_versions, get_versions, version_name
+from .views import InsuranceCompanyItemViewSet
+
+# Benchmark veri seti boyutları (ortam değişkenleri ile büyütülebilir)
+ITEM_COUNT = int(os.environ.get('API_BENCHMARK_ITEMS', 2000))
+COOKIES_PER_ITEM = int(os.environ.get('API_BENCHMARK_COOKIES_PER_ITEM', 3))
+USER_COUNT = int(os.environ.get('API_BENCHMARK_USERS', 50))
+INSURANCE_COMPANY_COUNT = 20
+PARTAGE_COUNT = 20
+ROLE_COUNT = 5
+COOKIE_SYNC_SIZE = 40
+BULK_UPSERT_SIZE = 200
+PROVISION_SIZE = 40
+STREAM_BATCH_SIZE = InsuranceCompanyItemViewSet.stream_batch_size
+
+BENCHMARK_PASSWORD = 'bench-password'
+TOTP_SECRET = 'JBSWY3DPEHPK3PXP'
+
+# Süre bütçeleri yavaş CI makineleri için bu çarpanla gevşetilebilir
+TIME_FACTOR = float(os.environ.get('API_BENCHMARK_TIME_FACTOR', 1.0))
+
+# Eşzamanlı giriş benchmark'ı için iş parçacığı ve toplam istek sayısı
+LOGIN_CONCURRENCY = int(os.environ.get('API_BENCHMARK_LOGIN_CONCURRENCY', 4))
+LOGIN_REQUESTS = int(os.environ.get('API_BENCHMARK_LOGIN_REQUESTS', 40))
+
+# Sonuçların JSON olarak yazılacağı dosya (boşsa yazılmaz)
+OUTPUT_PATH = os.environ.get('API_BENCHMARK_OUTPUT')
+
+# Uç nokta başına (en fazla sorgu sayısı, en fazla süre [sn]) bütçeleri.
+# Sorgu sayılarına kimlik doğrulama ve ETag doğrulayıcı sorguları da dahildir.
+# Streaming yanıtların bütçesi parti sayısına göre hesaplanır.
+BUDGETS = {
+    # Roller
+    'roles-list': (4, 0.5),
+    'roles-retrieve': (3, 0.5),
+    'roles-all-items-no-pagination': (3, 0.5),
+    'roles-permissions': (3, 0.5),
+    # Sorgu türleri
+    'query-types-list': (4, 0.5),
+    'query-types-retrieve': (3, 0.5),
+    'query-types-all-items-no-pagination': (3, 0.5),
+    'query-types-all-items-no-pagination-cached': (1, 0.05),
+    # Rol izinleri
+    'role-permissions-list': (3, 0.5),
+    'role-permissions-all-items-no-pagination': (2, 1.0),
+    'role-permissions-by-role': (2, 0.5),
+    'role-permissions-by-query-type': (2, 0.5),
+    # Şirketler
+    'companies-list': (3, 0.5),
+    'companies-all-items-no-pagination': (2, 0.5),
+    'companies-users': (6, 2.0),
+    'companies-insurance-items': (7, 10.0),
+    # Şirket kullanıcıları
+    'company-users-list': (6, 1.0),
+    'company-users-retrieve': (5, 0.5),
+    'company-users-all-items-no-pagination': (5, 2.0),
+    'company-users-admins': (2 + 3, 0.5),
+    'company-users-roles': (3, 0.5),
+    'company-users-check-permission': (3, 0.5),
+    'company-users-add-role': (4, 0.5),
+    'company-users-remove-role': (4, 0.5),
+    'company-users-create': (9, 2.0),
+    'company-users-bulk-provision': (10, 2.0),
+    # Sigorta şirketleri
+    'insurance-companies-list': (3, 0.5),
+    'insurance-companies-retrieve': (3, 0.5),
+    'insurance-companies-all-items-no-pagination': (3, 0.5),
+    'insurance-companies-items': (7, 2.0),
+    # Partajlar
+    'partages-list': (4, 0.5),
+    'partages-list-cached': (1, 0.05),
+    'partages-retrieve': (4, 2.0),
+    'partages-all-items-no-pagination': (3, 0.5),
+    'partages-related-companies': (3, 2.0),
+    # Sigorta şirketi öğeleri
+    'items-list': (7, 10.0),
+    'items-list-keyset-deep': (7, 0.5),
+    'items-retrieve': (8, 0.5),
+    'items-create': (10, 0.5),
+    'items-partial-update': (4, 0.5),
+    'items-destroy': (8, 1.0),
+    'items-all-items-no-pagination': (7, 10.0),
+    'items-all-items-no-pagination-sparse': (3, 2.0),
+    'items-all-items-no-pagination-stream': (3 + 4 * -(-ITEM_COUNT // STREAM_BATCH_SIZE), 10.0),
+    'items-active-items': (6, 10.0),
+    'items-car-query-items': (6, 10.0),
+    'items-by-query-type': (6, 10.0),
+    'items-by-partage': (6, 2.0),
+    'items-by-partage-and-insurance-company': (6, 0.5),
+    'items-same-partage-companies': (4, 2.0),
+    'items-same-insurance-company-items': (5, 0.5),
+    'items-add-query-type': (5, 0.5),
+    'items-remove-query-type': (4, 0.5),
+    'items-bulk-update-partage': (3, 0.5),
+    'items-bulk-upsert': (13, 1.0),
+    'items-update-partage-only': (4, 0.5),
+    'items-update-cookies-bulk': (13, 2.0),
+    'items-sync-cookies': (12, 0.5),
+    'items-cookie-changes': (5, 0.5),
+    'items-get-cookies': (3, 0.5),
+    'items-cookie-jar': (2, 0.5),
+    'items-clear-cookies': (10, 0.5),
+    'items-update-cookie': (3, 0.5),
+    # Fonksiyon tabanlı uç noktalar
+    'company-login': (2, 2.0),
+    'generate-totp': (1, 0.5),
+    # Async okuma uçları
+    'async-items-retrieve': (4, 0.5),
+    'async-items-active-items': (5, 10.0),
+    'async-items-car-query-items': (5, 10.0),
+    'async-items-get-cookies': (3, 0.5),
+    'async-items-cookie-jar': (1, 0.5),
+    'async-generate-totp': (1, 0.5),
+}
+
+RESULTS = []
+
+
+def write_results():
+    """Toplanan tüm ölçümleri API_BENCHMARK_OUTPUT dosyasına yazar."""
+    if not OUTPUT_PATH:
+        return
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as output:
+        json.dump({
+            'generated_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'dataset': {
+                'items': ITEM_COUNT,
+                'cookies_per_item': COOKIES_PER_ITEM,
+                'users': USER_COUNT,
+                'insurance_companies': INSURANCE_COMPANY_COUNT,
+                'partages': PARTAGE_COUNT,
+                'roles': ROLE_COUNT,
+            },
+            'time_factor': TIME_FACTOR,
+            'results': sorted(RESULTS, key=lambda result: result['name']),
+        }, output, indent=2, ensure_ascii=False)
+
+
+def seed_benchmark_data():
+    """Gerçekçi boyutta bir veri setini toplu insert'ler ile oluşturur."""
+    company = Company.objects.create(name='Benchmark Şirketi', code='bench', user_limit=USER_COUNT * 2)
+    other_company = Company.objects.create(name='Diğer Şirket', code='other')
+
+    query_types = QueryType.objects.bulk_create([
+        QueryType(name=name, description=label) for name, label in QueryType.INSURANCE_TYPE_CHOICES
+    ])
+    roles = Role.objects.bulk_create([Role(name=f'Rol {i}') for i in range(ROLE_COUNT)])
+    RolePermission.objects.bulk_create([
+        RolePermission(role=role, query_type=query_type, can_query=(i + j) % 2 == 0)
+        for i, role in enumerate(roles)
+        for j, query_type in enumerate(query_types)
+    ])
+
+    # Şifre hash'i bir kez hesaplanır; tüm kullanıcılar aynı şifreyi paylaşır
+    password_hash = make_password(BENCHMARK_PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f'user{i}', email=f'user{i}@bench.local', password=password_hash)
+        for i in range(USER_COUNT)
+    ])
+    company_users = CompanyUser.objects.bulk_create([
+        CompanyUser(user=user, company=company, is_admin=(i == 0))
+        for i, user in enumerate(users)
+    ])
+    CompanyUser.roles.through.objects.bulk_create([
+        CompanyUser.roles.through(companyuser_id=company_user.id, role_id=roles[i % ROLE_COUNT].id)
+        for i, company_user in enumerate(company_users)
+    ])
+
+    insurance_companies = InsuranceCompany.objects.bulk_create([
+        InsuranceCompany(name=f'Sigorta {i:02d}', code=f'ins{i}') for i in range(INSURANCE_COMPANY_COUNT)
+    ])
+    partages = Partage.objects.bulk_create([
+        Partage(name=f'Partaj {i:02d}', code=f'partage{i}', order=i) for i in range(PARTAGE_COUNT)
+    ])
+
+    items = InsuranceCompanyItem.objects.bulk_create([
+        InsuranceCompanyItem(
+            insurance_company=insurance_companies[(i // PARTAGE_COUNT) % INSURANCE_COMPANY_COUNT],
+            company=company if i % 10 else other_company,
+            partage=partages[i % PARTAGE_COUNT],
+            username=f'agent{i}',
+            password=f'secret{i}',
+            credential_hash=make_credential_hash(f'agent{i}', f'secret{i}'),
+            totp_code=TOTP_SECRET,
+            is_active=i % 4 != 0,
+            is_car_query=i % 3 == 0,
+            cookie_use=True,
+        )
+        for i in range(ITEM_COUNT)
+    ])
+    InsuranceCompanyItem.query_types.through.objects.bulk_create([
+        InsuranceCompanyItem.query_types.through(
+            insurancecompanyitem_id=item.id,
+            querytype_id=query_types[(i + offset) % len(query_types)].id
+        )
+        for i, item in enumerate(items)
+        for offset in range(2)
+    ])
+    now = timezone.now()
+    InsuranceCompanyCookie.objects.bulk_create([
+        InsuranceCompanyCookie(
+            insurance_company_item=item,
+            name=f'cookie{j}',
+            value='x' * 64,
+            domain='.sigorta.example',
+            expires=now + timedelta(days=1),
+            creation=now,
+            last_access=now,
+            version=1,
+        )
+        for item in items
+        for j in range(COOKIES_PER_ITEM)
+    ])
+    # bulk_create sinyal göndermediği için anlık görüntüler de toplu yazılır
+    rows = InsuranceCompanyCookie.objects.order_by('insurance_company_item_id', 'name', 'domain').values_list(
+        'insurance_company_item_id', *(field for field, _ in COOKIE_JAR_FIELDS)
+    )
+    InsuranceCompanyCookieJar.objects.bulk_create([
+        InsuranceCompanyCookieJar(insurance_company_item_id=item_id, data=encode_cookie_jar(row[1:] for row in item_rows))
+        for item_id, item_rows in groupby(rows, key=lambda row: row[0])
+    ])
+
+    return {
+        'company': company,
+        'users': users,
+        'company_users': company_users,
+        'roles': roles,
+        'query_types': query_types,
+        'insurance_companies': insurance_companies,
+        'partages': partages,
+        'items': items,
+    }
+
+
+def cookie_payload(count):
+    """update_cookies_bulk için istemci formatında cookie listesi üretir."""
+    return [
+        {
+            'name': f'sync{i}',
+            'value': 'v' * 32,
+            'domain': '.sigorta.example',
+            'path': '/',
+            'expires': '2030-01-01T00:00:00Z',
+            'creation': '2025-01-01T00:00:00Z',
+            'lastAccess': '2025-01-01T00:00:00Z',
+            'httpOnly': True,
+            'secure': True,
+            'sameSite': 1,
+            'priority': 1,
+        }
+        for i in range(count)
+    ]
+
+
+# Testler tek süreçte çalıştığından LocMem cache paylaşılan (Redis) cache gibi davranır
+@override_settings(DUPLICATE_QUERY_STRICT=True, CACHE_IS_SHARED=True)
+class APIBenchmarkTestCase(TestCase):
+    """
+    Tüm API uç noktaları için sorgu sayısı ve süre bütçelerini denetler.
+    Her ölçüm RESULTS listesine eklenir ve API_BENCHMARK_OUTPUT verilmişse
+    sürümler arasında karşılaştırılabilmesi için JSON olarak yazılır.
+    Tekrarlanan sorgu tespiti sıkı modda çalışır; yeni bir N+1 testi düşürür.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        started = time.perf_counter()
+        data = seed_benchmark_data()
+        cls.seed_seconds = time.perf_counter() - started
+
+        cls.company = data['company']
+        cls.admin_company_user = data['company_users'][0]
+        cls.company_user = data['company_users'][1]
+        cls.role = data['roles'][0]
+        cls.extra_role = data['roles'][1]
+        cls.query_type = data['query_types'][0]
+        cls.extra_query_type = data['query_types'][3]
+        cls.insurance_company = data['insurance_companies'][0]
+        cls.partage = data['partages'][0]
+        cls.other_partage = data['partages'][1]
+        cls.item = data['items'][0]
+        cls.token = Token.objects.create(user=data['users'][0])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        write_results()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def benchmark(self, name, method, path, data=None, expected_status=200, client=None):
+        """İsteği çalıştırır, ölçümleri kaydeder ve bütçe aşımında testi düşürür."""
+        client = client or self.client
+        max_queries, max_seconds = BUDGETS[name]
+        max_seconds *= TIME_FACTOR
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data, format='json')
+            if response.streaming:
+                # Streaming yanıtlar asıl işi içerik okunurken yapar
+                content = b''.join(response.streaming_content)
+                response.streaming_content = [content]
+            else:
+                content = response.content
+            elapsed = time.perf_counter() - started
+
+        RESULTS.append({
+            'name': name,
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'queries': len(queries),
+            'query_budget': max_queries,
+            'seconds': round(elapsed, 6),
+            'time_budget': max_seconds,
+            'bytes': len(content),
+        })
+
+        self.assertEqual(response.status_code, expected_status, content[:500])
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f"{name}: {len(queries)} sorgu, bütçe {max_queries}\n" +
+            "\n".join(query['sql'] for query in queries.captured_queries)
+        )
+        self.assertLessEqual(elapsed, max_seconds, f"{name}: {elapsed:.3f} sn, bütçe {max_seconds:.3f} sn")
+        return response
+
+    # Roller
+
+    def test_roles_list(self):
+        self.benchmark('roles-list', 'get', '/api/v1/roles/')
+
+    def test_roles_retrieve(self):
+        self.benchmark('roles-retrieve', 'get', f'/api/v1/roles/{self.role.id}/')
+
+    def test_roles_all_items_no_pagination(self):
+        self.benchmark('roles-all-items-no-pagination', 'get', '/api/v1/roles/all_items_no_pagination/')
+
+    def test_roles_permissions(self):
+        self.benchmark('roles-permissions', 'get', f'/api/v1/roles/{self.role.id}/permissions/')
+
+    # Sorgu türleri
+
+    def test_query_types_list(self):
+        self.benchmark('query-types-list', 'get', '/api/v1/query-types/')
+
+    def test_query_types_retrieve(self):
+        self.benchmark('query-types-retrieve', 'get', f'/api/v1/query-types/{self.query_type.id}/')
+
+    def test_query_types_all_items_no_pagination(self):
+        self.benchmark('query-types-all-items-no-pagination', 'get', '/api/v1/query-types/all_items_no_pagination/')
+
+    def test_query_types_all_items_no_pagination_cached(self):
+        self.client.get('/api/v1/query-types/all_items_no_pagination/')
+        self.benchmark('query-types-all-items-no-pagination-cached', 'get', '/api/v1/query-types/all_items_no_pagination/')
+
+    # Rol izinleri
+
+    def test_role_permissions_list(self):
+        self.benchmark('role-permissions-list', 'get', '/api/v1/role-permissions/')
+
+    def test_role_permissions_all_items_no_pagination(self):
+        self.benchmark('role-permissions-all-items-no-pagination', 'get', '/api/v1/role-permissions/all_items_no_pagination/')
+
+    def test_role_permissions_by_role(self):
+        self.benchmark('role-permissions-by-role', 'get', f'/api/v1/role-permissions/by_role/?role_id={self.role.id}')
+
+    def test_role_permissions_by_query_type(self):
+        self.benchmark(
+            'role-permissions-by-query-type', 'get',
+            f'/api/v1/role-permissions/by_query_type/?query_type_id={self.query_type.id}'
+        )
+
+    # Şirketler
+
+    def test_companies_list(self):
+        self.benchmark('companies-list', 'get', '/api/v1/companies/')
+
+    def test_companies_all_items_no_pagination(self):
+        self.benchmark('companies-all-items-no-pagination', 'get', '/api/v1/companies/all_items_no_pagination/')
+
+    def test_companies_users(self):
+        self.benchmark('companies-users', 'get', f'/api/v1/companies/{self.company.id}/users/')
+
+    def test_companies_insurance_items(self):
+        self.benchmark('companies-insurance-items', 'get', f'/api/v1/companies/{self.company.id}/insurance_items/')
+
+    # Şirket kullanıcıları
+
+    def test_company_users_list(self):
+        self.benchmark('company-users-list', 'get', '/api/v1/company-users/')
+
+    def test_company_users_retrieve(self):
+        self.benchmark('company-users-retrieve', 'get', f'/api/v1/company-users/{self.company_user.id}/')
+
+    def test_company_users_all_items_no_pagination(self):
+        self.benchmark('company-users-all-items-no-pagination', 'get', '/api/v1/company-users/all_items_no_pagination/')
+
+    def test_company_users_admins(self):
+        self.benchmark('company-users-admins', 'get', '/api/v1/company-users/admins/')
+
+    def test_company_users_roles(self):
+        self.benchmark('company-users-roles', 'get', f'/api/v1/company-users/{self.company_user.id}/roles/')
+
+    def test_company_users_check_permission(self):
+        self.benchmark(
+            'company-users-check-permission', 'get',
+            f'/api/v1/company-users/{self.company_user.id}/check_permission/?query_type={self.query_type.name}'
+        )
+
+    def test_company_users_add_role(self):
+        self.benchmark(
+            'company-users-add-role', 'post',
+            f'/api/v1/company-users/{self.company_user.id}/add_role/', {'role_id': self.extra_role.id}
+        )
+
+    def test_company_users_remove_role(self):
+        self.benchmark(
+            'company-users-remove-role', 'post',
+            f'/api/v1/company-users/{self.company_user.id}/remove_role/', {'role_id': self.role.id}
+        )
+
+    def test_company_users_create(self):
+        self.benchmark('company-users-create', 'post', '/api/v1/company-users/', {
+            'company': self.company.id,
+            'user': {'username': 'new-user', 'email': 'new@bench.local', 'password': BENCHMARK_PASSWORD},
+            'roles': [self.role.id],
+        }, expected_status=201)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_company_users_bulk_provision(self):
+        # Sorgu sayısı kullanıcı ve rol sayısından bağımsızdır
+        response = self.benchmark('company-users-bulk-provision', 'post', '/api/v1/company-users/bulk_provision/', {
+            'users': [
+                {'username': f'bulk-user{i}', 'password': BENCHMARK_PASSWORD, 'roles': [self.role.id, self.extra_role.id]}
+                for i in range(PROVISION_SIZE)
+            ],
+        }, expected_status=201)
+        self.assertEqual(response.json()['created_count'], PROVISION_SIZE)
+
+    # Sigorta şirketleri
+
+    def test_insurance_companies_list(self):
+        self.benchmark('insurance-companies-list', 'get', '/api/v1/insurance-companies/')
+
+    def test_insurance_companies_retrieve(self):
+        self.benchmark('insurance-companies-retrieve', 'get', f'/api/v1/insurance-companies/{self.insurance_company.id}/')
+
+    def test_insurance_companies_all_items_no_pagination(self):
+        self.benchmark(
+            'insurance-companies-all-items-no-pagination', 'get',
+            '/api/v1/insurance-companies/all_items_no_pagination/'
+        )
+
+    def test_insurance_companies_items(self):
+        self.benchmark('insurance-companies-items', 'get', f'/api/v1/insurance-companies/{self.insurance_company.id}/items/')
+
+    # Partajlar
+
+    def test_partages_list(self):
+        self.benchmark('partages-list', 'get', '/api/v1/partages/')
+
+    def test_partages_list_cached(self):
+        self.client.get('/api/v1/partages/')
+        self.benchmark('partages-list-cached', 'get', '/api/v1/partages/')
+
+    def test_partages_retrieve(self):
+        self.benchmark('partages-retrieve', 'get', f'/api/v1/partages/{self.partage.id}/')
+
+    def test_partages_all_items_no_pagination(self):
+        self.benchmark('partages-all-items-no-pagination', 'get', '/api/v1/partages/all_items_no_pagination/')
+
+    def test_partages_related_companies(self):
+        self.benchmark('partages-related-companies', 'get', f'/api/v1/partages/{self.partage.id}/related_companies/')
+
+    # Sigorta şirketi öğeleri
+
+    def test_items_list(self):
+        self.benchmark('items-list', 'get', '/api/v1/insurance-company-items/')
+
+    def test_items_retrieve(self):
+        self.benchmark('items-retrieve', 'get', f'/api/v1/insurance-company-items/{self.item.id}/')
+
+    def test_items_create(self):
+        self.benchmark('items-create', 'post', '/api/v1/insurance-company-items/', {
+            'insurance_company': self.insurance_company.id,
+            'company': self.company.id,
+            'partage': self.partage.id,
+            'username': 'new-agent',
+            'password': 'new-secret',
+            'query_types': [self.query_type.id],
+        }, expected_status=201)
+
+    def test_items_partial_update(self):
+        self.benchmark(
+            'items-partial-update', 'patch',
+            f'/api/v1/insurance-company-items/{self.item.id}/', {'is_active': False}
+        )
+
+    def test_items_destroy(self):
+        self.benchmark('items-destroy', 'delete', f'/api/v1/insurance-company-items/{self.item.id}/', expected_status=204)
+
+    def test_items_all_items_no_pagination(self):
+        self.benchmark('items-all-items-no-pagination', 'get', '/api/v1/insurance-company-items/all_items_no_pagination/')
+
+    def test_items_list_keyset_deep(self):
+        # Son sayfanın cursor'ı, OFFSET olmadan doğrudan son anahtardan başlar
+        last = InsuranceCompanyItem.objects.order_by('insurance_company__name', 'pk').values_list(
+            'insurance_company__name', 'pk'
+        )[ITEM_COUNT - 51]
+        cursor = KeysetPagination().encode_cursor(list(last))
+        response = self.benchmark(
+            'items-list-keyset-deep', 'get', f'/api/v1/insurance-company-items/?cursor={cursor}&page_size=50'
+        )
+        self.assertEqual(len(response.json()['results']), 50)
+        self.assertIsNone(response.json()['next'])
+
+    def test_items_all_items_no_pagination_sparse(self):
+        response = self.benchmark(
+            'items-all-items-no-pagination-sparse', 'get',
+            '/api/v1/insurance-company-items/all_items_no_pagination/?fields=id,username,insurance_company'
+        )
+        self.assertEqual(len(response.json()), ITEM_COUNT)
+
+    def test_items_all_items_no_pagination_stream(self):
+        response = self.benchmark(
+            'items-all-items-no-pagination-stream', 'get',
+            '/api/v1/insurance-company-items/all_items_no_pagination/?stream=1'
+        )
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), ITEM_COUNT)
+
+    def test_items_active_items(self):
+        self.benchmark('items-active-items', 'get', '/api/v1/insurance-company-items/active_items/')
+
+    def test_items_car_query_items(self):
+        self.benchmark('items-car-query-items', 'get', '/api/v1/insurance-company-items/car_query_items/')
+
+    def test_items_by_query_type(self):
+        self.benchmark(
+            'items-by-query-type', 'get',
+            f'/api/v1/insurance-company-items/by_query_type/?query_type={self.query_type.name}'
+        )
+
+    def test_items_by_partage(self):
+        self.benchmark('items-by-partage', 'get', f'/api/v1/insurance-company-items/by_partage/?partage_id={self.partage.id}')
+
+    def test_items_by_partage_and_insurance_company(self):
+        self.benchmark(
+            'items-by-partage-and-insurance-company', 'get',
+            '/api/v1/insurance-company-items/by_partage_and_insurance_company/'
+            f'?partage_id={self.partage.id}&insurance_company_id={self.insurance_company.id}'
+        )
+
+    def test_items_same_partage_companies(self):
+        self.benchmark('items-same-partage-companies', 'get', f'/api/v1/insurance-company-items/{self.item.id}/same_partage_companies/')
+
+    def test_items_same_insurance_company_items(self):
+        self.benchmark(
+            'items-same-insurance-company-items', 'get',
+            f'/api/v1/insurance-company-items/{self.item.id}/same_insurance_company_items/'
+        )
+
+    def test_items_add_query_type(self):
+        self.benchmark(
+            'items-add-query-type', 'post',
+            f'/api/v1/insurance-company-items/{self.item.id}/add_query_type/', {'query_type_id': self.extra_query_type.id}
+        )
+
+    def test_items_remove_query_type(self):
+        self.benchmark(
+            'items-remove-query-type', 'post',
+            f'/api/v1/insurance-company-items/{self.item.id}/remove_query_type/', {'query_type_id': self.query_type.id}
+        )
+
+    def test_items_bulk_update_partage(self):
+        item_ids = list(InsuranceCompanyItem.objects.filter(partage=self.partage).values_list('id', flat=True)[:50])
+        self.benchmark('items-bulk-update-partage', 'post', '/api/v1/insurance-company-items/bulk_update_partage/', {
+            'item_ids': item_ids,
+            'partage': self.other_partage.id,
+        })
+
+    def test_items_bulk_upsert(self):
+        # Yarısı güncelleme, yarısı oluşturma; sorgu sayısı satır sayısından bağımsızdır
+        item_ids = list(InsuranceCompanyItem.objects.values_list('id', flat=True)[:BULK_UPSERT_SIZE // 2])
+        rows = [{'id': item_id, 'is_active': False, 'query_types': ['traffic', 'casco']} for item_id in item_ids]
+        rows += [
+            {
+                'insurance_company': self.insurance_company.id,
+                'company': self.company.id,
+                'partage': self.partage.id,
+                'username': f'bulk{i}',
+                'query_types': ['health'],
+            }
+            for i in range(BULK_UPSERT_SIZE - len(rows))
+        ]
+        response = self.benchmark('items-bulk-upsert', 'post', '/api/v1/insurance-company-items/bulk_upsert/', {'items': rows})
+        self.assertEqual(response.json()['error_count'], 0)
+
+    def test_items_update_partage_only(self):
+        self.benchmark(
+            'items-update-partage-only', 'patch',
+            f'/api/v1/insurance-company-items/{self.item.id}/update_partage_only/', {'partage': self.other_partage.id}
+        )
+
+    def test_items_update_cookies_bulk(self):
+        self.benchmark(
+            'items-update-cookies-bulk', 'post',
+            f'/api/v1/insurance-company-items/{self.item.id}/update_cookies_bulk/',
+            {'cookies': cookie_payload(COOKIE_SYNC_SIZE), 'clearExisting': True}
+        )
+
+    def test_items_get_cookies(self):
+        self.benchmark('items-get-cookies', 'get', f'/api/v1/insurance-company-items/{self.item.id}/get_cookies/')
+
+    def test_items_sync_cookies(self):
+        cookie = cookie_payload(1)[0]
+        cookie.update(name='cookie0', domain='.sigorta.example')
+        self.benchmark(
+            'items-sync-cookies', 'post', f'/api/v1/insurance-company-items/{self.item.id}/sync_cookies/',
+            {'baseVersion': 1, 'cookies': [cookie], 'removed': [{'name': 'cookie1', 'domain': '.sigorta.example'}]}
+        )
+
+    def test_items_cookie_changes(self):
+        self.benchmark('items-cookie-changes', 'get', f'/api/v1/insurance-company-items/{self.item.id}/cookie_changes/?since=0')
+
+    def test_items_cookie_jar(self):
+        self.benchmark('items-cookie-jar', 'get', f'/api/v1/insurance-company-items/{self.item.id}/cookie_jar/')
+
+    def test_items_clear_cookies(self):
+        self.benchmark('items-clear-cookies', 'delete', f'/api/v1/insurance-company-items/{self.item.id}/clear_cookies/')
+
+    def test_items_update_cookie(self):
+        self.benchmark(
+            'items-update-cookie', 'post',
+            f'/api/v1/insurance-company-items/{self.item.id}/update_cookie/', {'cookie': 'session_id=abc123; token=xyz789'}
+        )
+
+    # Fonksiyon tabanlı uç noktalar
+
+    def test_company_login(self):
+        response = self.benchmark('company-login', 'post', '/api/v1/login/', {
+            'username': self.admin_company_user.user.username,
+            'password': BENCHMARK_PASSWORD,
+            'company_code': self.company.code,
+        }, client=APIClient())
+        self.assertEqual(response.json()['token'], self.token.key)
+
+    def test_generate_totp(self):
+        response = self.benchmark(
+            'generate-totp', 'get',
+            f'/api/v1/totp/?username={self.item.username}&password={self.item.password}', client=APIClient()
+        )
+        self.assertIsInstance(response.json(), int)
+
+    # Async okuma uçları
+
+    def test_async_items_retrieve(self):
+        self.benchmark('async-items-retrieve', 'get', f'/api/v1/async/insurance-company-items/{self.item.id}/')
+
+    def test_async_items_active_items(self):
+        self.benchmark('async-items-active-items', 'get', '/api/v1/async/insurance-company-items/active_items/')
+
+    def test_async_items_car_query_items(self):
+        self.benchmark('async-items-car-query-items', 'get', '/api/v1/async/insurance-company-items/car_query_items/')
+
+    def test_async_items_get_cookies(self):
+        self.benchmark('async-items-get-cookies', 'get', f'/api/v1/async/insurance-company-items/{self.item.id}/get_cookies/')
+
+    def test_async_items_cookie_jar(self):
+        self.benchmark('async-items-cookie-jar', 'get', f'/api/v1/async/insurance-company-items/{self.item.id}/cookie_jar/')
+
+    def test_async_generate_totp(self):
+        response = self.benchmark(
+            'async-generate-totp', 'get',
+            f'/api/v1/async/totp/?username={self.item.username}&password={self.item.password}', client=APIClient()
+        )
+        self.assertIsInstance(response.json(), int)
+
+
+class SparseFieldsTestCase(TestCase):
+    """?fields= ve ?expand= parametrelerinin çıktıyı ve sorguları daralttığını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='sparse')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        cls.partage = Partage.objects.create(name='Partaj', code='P1')
+        query_type = QueryType.objects.create(name='traffic')
+        cls.items = []
+        for i in range(5):
+            item = InsuranceCompanyItem.objects.create(
+                insurance_company=insurance_company, company=cls.company, partage=cls.partage, username=f'user{i}'
+            )
+            item.query_types.add(query_type)
+            InsuranceCompanyCookie.objects.create(insurance_company_item=item, name='sid', value='v', domain='.x')
+            cls.items.append(item)
+        cls.role = Role.objects.create(name='Operatör')
+        for i in range(3):
+            user = User.objects.create_user(username=f'sparse{i}', password=BENCHMARK_PASSWORD)
+            company_user = CompanyUser.objects.create(user=user, company=cls.company)
+            company_user.roles.add(cls.role)
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_default_output_is_unchanged(self):
+        item = self.client.get('/api/v1/insurance-company-items/').json()[0]
+        self.assertIsInstance(item['insurance_company'], dict)
+        self.assertIsInstance(item['query_types'][0], dict)
+        self.assertIn('cookies', item)
+        self.assertIn('same_insurance_company_items', item)
+
+    def test_fields_skip_unrequested_relations(self):
+        # Sadece kimlik doğrulama, ETag sürüm sorgusu ve öğe sorgusu çalışır
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/insurance-company-items/', {'fields': 'id,username'})
+        self.assertEqual(response.json()[0].keys(), {'id', 'username'})
+
+    def test_unexpanded_relations_are_collapsed(self):
+        response = self.client.get('/api/v1/insurance-company-items/', {'expand': 'insurance_company'})
+        item = response.json()[0]
+        self.assertEqual(item['insurance_company']['code'], 'SGR')
+        self.assertIsInstance(item['query_types'][0], int)
+        self.assertNotIn('cookies', item)
+        self.assertNotIn('same_insurance_company_items', item)
+
+    def test_fields_and_expand_together(self):
+        response = self.client.get(
+            '/api/v1/insurance-company-items/', {'fields': 'id,cookies,insurance_company', 'expand': 'cookies'}
+        )
+        item = response.json()[0]
+        self.assertEqual(item.keys(), {'id', 'cookies', 'insurance_company'})
+        self.assertEqual(item['cookies'][0]['name'], 'sid')
+        self.assertIsInstance(item['insurance_company'], int)
+
+    def test_item_detail(self):
+        item = self.items[0]
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/insurance-company-items/{item.id}/', {'fields': 'id,partage,company'})
+        self.assertEqual(response.json(), {'id': item.id, 'partage': self.partage.id, 'company': self.company.id})
+
+        # İç içe PartageSerializer isteğin fields parametresinden etkilenmez
+        response = self.client.get(f'/api/v1/insurance-company-items/{item.id}/', {'fields': 'partage', 'expand': 'partage'})
+        self.assertEqual(response.json()['partage']['code'], 'P1')
+
+    def test_stream_with_fields(self):
+        response = self.client.get('/api/v1/insurance-company-items/all_items_no_pagination/', {
+            'stream': '1', 'fields': 'id',
+        })
+        content = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(sorted(row['id'] for row in content), sorted(item.id for item in self.items))
+
+    def test_company_users(self):
+        with self.assertNumQueries(3):
+            # kimlik doğrulama, şirket kullanıcısı filtresi, liste
+            response = self.client.get('/api/v1/company-users/all_items_no_pagination/', {'fields': 'id,user,roles'})
+        rows = response.json()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['roles'], [self.role.id])
+        self.assertIsInstance(rows[0]['user'], int)
+
+        response = self.client.get('/api/v1/company-users/all_items_no_pagination/', {'fields': 'user', 'expand': 'user'})
+        self.assertEqual({row['user']['username'] for row in response.json()}, {'sparse0', 'sparse1', 'sparse2'})
+
+    def test_partage_detail_without_related_companies(self):
+        # related_companies istenmediği için partaja bağlı öğeler sorgulanmaz
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/partages/{self.partage.id}/', {'fields': 'id,name,related_companies'})
+        self.assertEqual(response.json(), {'id': self.partage.id, 'name': 'Partaj'})
+        response = self.client.get(f'/api/v1/partages/{self.partage.id}/', {'expand': 'related_companies'})
+        self.assertEqual(len(response.json()['related_companies']), len(self.items))
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class ResponseCacheTestCase(TestCase):
+    """Referans verisi uçlarının yanıt cache'ini ve sinyallerle geçersiz kılınmasını denetler."""
+
+    urls = [
+        '/api/v1/query-types/', '/api/v1/query-types/all_items_no_pagination/',
+        '/api/v1/roles/', '/api/v1/roles/all_items_no_pagination/',
+        '/api/v1/insurance-companies/', '/api/v1/insurance-companies/all_items_no_pagination/',
+        '/api/v1/partages/', '/api/v1/partages/all_items_no_pagination/',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='cache')
+        cls.other_company = Company.objects.create(name='Diğer', code='other')
+        QueryType.objects.create(name='traffic')
+        Role.objects.create(name='Operatör')
+        InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        Partage.objects.create(name='Partaj', code='P1')
+        cls.tokens = []
+        for company in (cls.company, cls.other_company):
+            user = User.objects.create_user(username=f'cache-{company.code}')
+            CompanyUser.objects.create(user=user, company=company)
+            cls.tokens.append(Token.objects.create(user=user))
+
+    def setUp(self):
+        cache.clear()
+        self.client = self.client_for(self.tokens[0])
+
+    def client_for(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def test_cached_responses_need_only_version_query(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                # Sadece sürüm sayaçları okunur
+                with self.assertNumQueries(1):
+                    second = self.client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second.get('ETag'), first.get('ETag'))
+
+    def test_conditional_request_on_cached_response(self):
+        etag = self.client.get('/api/v1/query-types/').get('ETag')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/query-types/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate(self):
+        for url, create in [
+            ('/api/v1/query-types/all_items_no_pagination/', lambda: QueryType.objects.create(name='casco')),
+            ('/api/v1/roles/all_items_no_pagination/', lambda: Role.objects.create(name='Yönetici')),
+            ('/api/v1/insurance-companies/all_items_no_pagination/',
+             lambda: InsuranceCompany.objects.create(name='Yeni', code='YNI')),
+            ('/api/v1/partages/all_items_no_pagination/', lambda: Partage.objects.create(name='Yeni', code='P2')),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(len(self.client.get(url).json()), 1)
+                with self.captureOnCommitCallbacks(execute=True):
+                    create()
+                self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_version_bumps_from_other_workers_invalidate(self):
+        # Başka bir worker'ın yazması bu sürecin cache'ine dokunmaz; sadece sayaç artar
+        url = '/api/v1/query-types/all_items_no_pagination/'
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        QueryType.objects.bulk_create([QueryType(name='casco')])
+        bump_versions([version_name(QueryType)])
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_key_includes_query_params_and_tenant(self):
+        self.client.get('/api/v1/partages/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/partages/', {'fields': 'id'})
+        self.assertGreater(len(queries), 0)
+
+        # Aynı adres başka bir şirketin kullanıcısı için ayrı cache'lenir
+        self.client.get('/api/v1/roles/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client_for(self.tokens[1]).get('/api/v1/roles/')
+        self.assertTrue(any('"api_role"' in query['sql'] for query in queries.captured_queries))
+
+    def test_permissions_checked_before_cache(self):
+        self.client.get('/api/v1/roles/')
+        self.assertEqual(APIClient().get('/api/v1/roles/').status_code, 401)
+
+    def fetch(self, url, params):
+        response = self.client.get(url, params)
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_stream_and_retrieve_not_cached(self):
+        role = Role.objects.get()
+        for url, params in [
+            ('/api/v1/roles/all_items_no_pagination/', {'stream': '1'}),
+            (f'/api/v1/roles/{role.id}/', {}),
+        ]:
+            with self.subTest(url=url):
+                self.fetch(url, params)
+                with CaptureQueriesContext(connection) as queries:
+                    self.fetch(url, params)
+                self.assertTrue(any('"api_role"' in query['sql'] for query in queries.captured_queries))
+
+
+class KeysetPaginationTestCase(TestCase):
+    """?cursor= ile açılan keyset sayfalamanın tabloyu eksiksiz ve tekrarsız gezdiğini denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='keyset')
+        insurance_companies = [
+            InsuranceCompany.objects.create(name=name, code=name) for name in ('Beta', 'Alfa', 'Gama')
+        ]
+        # Aynı sigorta şirketine ait çok sayıda öğe, id'nin eşitlik bozucu olarak kullanılmasını gerektirir
+        InsuranceCompanyItem.objects.bulk_create([
+            InsuranceCompanyItem(insurance_company=insurance_companies[i % 3], company=company, username=f'u{i}')
+            for i in range(23)
+        ])
+        created_at = timezone.now()
+        Partage.objects.bulk_create([Partage(name=f'P{i}', code=f'P{i}') for i in range(12)])
+        # Aynı created_at değerine sahip partajlar (azalan sıralama + pk)
+        Partage.objects.filter(code__in=['P3', 'P4', 'P5', 'P6']).update(created_at=created_at)
+        user = User.objects.create_user(username='keyset')
+        CompanyUser.objects.create(user=user, company=company)
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def walk(self, url, **params):
+        ids = []
+        response = self.client.get(url, {'cursor': '', 'fields': 'id', **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids.extend(row['id'] for row in body['results'])
+            if not body['next']:
+                return ids
+            response = self.client.get(body['next'])
+
+    def test_walks_items_in_viewset_order(self):
+        expected = list(InsuranceCompanyItem.objects.order_by('insurance_company__name', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('/api/v1/insurance-company-items/', page_size=5), expected)
+
+    def test_walks_descending_ordering_with_ties(self):
+        expected = list(Partage.objects.order_by('-created_at', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('/api/v1/partages/', page_size=2), expected)
+
+    def test_default_pagination_unchanged(self):
+        self.assertIsInstance(self.client.get('/api/v1/insurance-company-items/').json(), list)
+        self.assertIn('count', self.client.get('/api/v1/partages/').json())
+
+    def test_page_queries_do_not_use_offset(self):
+        first = self.client.get('/api/v1/insurance-company-items/', {'cursor': '', 'page_size': 5, 'fields': 'id'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.json()['next'])
+        item_queries = [query['sql'] for query in queries.captured_queries if 'api_insurancecompanyitem' in query['sql']]
+        self.assertEqual(len(item_queries), 1)
+        self.assertNotIn('OFFSET', item_queries[0])
+        self.assertIn('LIMIT 6', item_queries[0])
+
+    def test_invalid_cursor(self):
+        for cursor in ('bozuk', KeysetPagination().encode_cursor([1])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/v1/insurance-company-items/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Geçersiz cursor.'})
+
+
+class IndexUsageTestCase(TestCase):
+    """
+    Yoğun kullanılan öğe filtrelerinin benchmark veri seti üzerinde tablo
+    taraması yerine ilgili indeksi kullandığını EXPLAIN çıktısıyla denetler.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_data()
+        cls.item = data['items'][0]
+        cls.partage = data['partages'][0]
+        cls.insurance_company = data['insurance_companies'][0]
+        cls.query_type = data['query_types'][0]
+        cls.company = data['company']
+        cls.token = Token.objects.create(user=data['users'][0])
+        # Planlayıcının gerçekçi seçim yapabilmesi için istatistikleri güncelle
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def explain(self, path, table):
+        """Uç noktayı çağırır ve verilen tabloya dokunan tüm ifadelerin planlarını döndürür."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT') and f'"{table}"' in query['sql']:
+                    cursor.execute(f"{connection.ops.explain_query_prefix()} {query['sql']}")
+                    plans.extend(str(row[-1]) for row in cursor.fetchall())
+        return "\n".join(plans)
+
+    def test_endpoints_use_indexes(self):
+        item_table = InsuranceCompanyItem._meta.db_table
+        through_table = InsuranceCompanyItem.query_types.through._meta.db_table
+        items_url = '/api/v1/insurance-company-items/'
+        for path, table, index in [
+            (f'{items_url}by_partage_and_insurance_company/?partage_id={self.partage.id}'
+             f'&insurance_company_id={self.insurance_company.id}', item_table, 'item_partage_ic_created_idx'),
+            (f'{items_url}{self.item.id}/same_insurance_company_items/', item_table, 'item_partage_ic_created_idx'),
+            (f'{items_url}{self.item.id}/same_partage_companies/', item_table, 'item_partage_created_idx'),
+            (f'{items_url}by_partage/?partage_id={self.partage.id}', item_table, 'item_partage_created_idx'),
+            (f'{items_url}active_items/', item_table, 'item_active_created_idx'),
+            (f'{items_url}car_query_items/', item_table, 'item_car_query_created_idx'),
+            (f'{items_url}by_query_type/?query_type={self.query_type.name}', through_table, 'item_query_types_qt_item_idx'),
+            (f'/api/v1/companies/{self.company.id}/insurance_items/', item_table, 'item_company_created_idx'),
+        ]:
+            with self.subTest(path=path):
+                plan = self.explain(path, table)
+                self.assertIn(index, plan, plan)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class PermissionCacheTestCase(TestCase):
+    """CompanyUser yetki önbelleğinin doğruluğunu ve geçersiz kılınmasını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='perm')
+        cls.traffic = QueryType.objects.create(name='traffic')
+        cls.casco = QueryType.objects.create(name='casco')
+        cls.role = Role.objects.create(name='Operatör')
+        cls.other_role = Role.objects.create(name='Yönetici')
+        cls.permission = RolePermission.objects.create(role=cls.role, query_type=cls.traffic, can_query=True)
+        RolePermission.objects.create(role=cls.other_role, query_type=cls.casco, can_query=True, can_update=True)
+        user = User.objects.create(username='operator')
+        cls.company_user = CompanyUser.objects.create(user=user, company=cls.company)
+        cls.company_user.roles.add(cls.role)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_company_user(self):
+        return CompanyUser.objects.get(pk=self.company_user.pk)
+
+    def test_permission_checks_are_free_after_warm_up(self):
+        company_user = self.fresh_company_user()
+        self.assertTrue(company_user.has_permission('traffic'))
+        with self.assertNumQueries(0):
+            self.assertTrue(company_user.has_permission('traffic'))
+            self.assertFalse(company_user.has_permission('casco'))
+            self.assertFalse(company_user.has_permission('traffic', 'can_update'))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_local_cache_is_not_used(self):
+        # Başka bir worker'ın yaptığı (bu süreçte sinyal üretmeyen) değişiklik yeni istekte görülür
+        company_user = self.fresh_company_user()
+        self.assertTrue(company_user.has_permission('traffic'))
+        with self.assertNumQueries(0):
+            self.assertFalse(company_user.has_permission('casco'))
+        RolePermission.objects.filter(pk=self.permission.pk).update(can_query=False)
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+
+    def test_effective_permissions_merge_active_roles(self):
+        self.company_user.roles.add(self.other_role)
+        self.assertEqual(self.fresh_company_user().get_effective_permissions(), {
+            'is_admin': False,
+            'query_types': {
+                'traffic': {'can_query': True, 'can_create': False, 'can_update': False},
+                'casco': {'can_query': True, 'can_create': False, 'can_update': True},
+            },
+        })
+
+    def test_role_permission_change_invalidates(self):
+        self.assertTrue(self.fresh_company_user().has_permission('traffic'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.can_query = False
+            self.permission.save()
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+
+    def test_role_permission_move_invalidates_both_roles(self):
+        other_user = CompanyUser.objects.create(user=User.objects.create(username='manager'), company=self.company)
+        other_user.roles.add(self.other_role)
+        self.assertTrue(self.fresh_company_user().has_permission('traffic'))
+        self.assertFalse(CompanyUser.objects.get(pk=other_user.pk).has_permission('traffic'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.role = self.other_role
+            self.permission.save()
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+        self.assertTrue(CompanyUser.objects.get(pk=other_user.pk).has_permission('traffic'))
+
+    def test_role_permission_delete_invalidates(self):
+        self.assertTrue(self.fresh_company_user().has_permission('traffic'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.delete()
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+
+    def test_role_deactivation_invalidates(self):
+        self.assertTrue(self.fresh_company_user().has_permission('traffic'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.is_active = False
+            self.role.save()
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+
+    def test_role_rename_keeps_cache(self):
+        self.fresh_company_user().has_permission('traffic')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.name = 'Kıdemli Operatör'
+            self.role.save()
+        # Ad değişikliği yetkileri etkilemez; yetki önbelleği silinmemeli
+        self.assertIsNotNone(cache.get(permission_cache_key(self.company_user.pk)))
+
+    def test_roles_m2m_changes_invalidate(self):
+        company_user = self.fresh_company_user()
+        self.assertFalse(company_user.has_permission('casco'))
+        with self.captureOnCommitCallbacks(execute=True):
+            company_user.roles.add(self.other_role)
+        self.assertTrue(self.fresh_company_user().has_permission('casco'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_role.companyuser_set.remove(company_user)
+        self.assertFalse(self.fresh_company_user().has_permission('casco'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.companyuser_set.clear()
+        self.assertFalse(self.fresh_company_user().has_permission('traffic'))
+
+    def test_is_admin_change_invalidates(self):
+        self.assertFalse(self.fresh_company_user().has_permission('casco'))
+        company_user = self.fresh_company_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            company_user.is_admin = True
+            company_user.save()
+        self.assertTrue(self.fresh_company_user().has_permission('casco'))
+
+
+class StreamingListTestCase(TestCase):
+    """?stream=1 çıktısının normal yanıtla byte bazında aynı olduğunu denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='stream')
+        query_type = QueryType.objects.create(name='traffic')
+        partage = Partage.objects.create(name='Partaj', code='p1')
+        insurance_companies = [
+            InsuranceCompany.objects.create(name=f'Sigorta {i}', code=f'ins{i}') for i in range(3)
+        ]
+        for i in range(11):
+            item = InsuranceCompanyItem.objects.create(
+                insurance_company=insurance_companies[i % 3],
+                company=company,
+                partage=partage if i % 2 else None,
+            )
+            item.query_types.add(query_type)
+            InsuranceCompanyCookie.objects.create(insurance_company_item=item, name='sid', value=str(i), domain='d')
+        user = User.objects.create(username='streamer')
+        CompanyUser.objects.create(user=user, company=company)
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assertStreamMatches(self, path):
+        expected = self.client.get(path).content
+        response = self.client.get(path, {'stream': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(b''.join(response.streaming_content), expected)
+
+    def test_stream_matches_buffered_response(self):
+        for resource in [
+            'insurance-company-items', 'insurance-companies', 'companies', 'company-users',
+            'partages', 'query-types', 'roles', 'role-permissions',
+        ]:
+            with self.subTest(resource=resource):
+                self.assertStreamMatches(f'/api/v1/{resource}/all_items_no_pagination/')
+
+    def test_stream_batches_across_chunk_boundaries(self):
+        with mock.patch.object(InsuranceCompanyItemViewSet, 'stream_batch_size', 4):
+            self.assertStreamMatches('/api/v1/insurance-company-items/all_items_no_pagination/')
+
+    def test_empty_stream_is_valid_json(self):
+        RolePermission.objects.all().delete()
+        response = self.client.get('/api/v1/role-permissions/all_items_no_pagination/', {'stream': 'true'})
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTestCase(TestCase):
+    """Toplu kullanıcı oluşturmanın doğrulama, limit ve şifre hash yolunu denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acente', code='acente', user_limit=4)
+        cls.role = Role.objects.create(name='Operatör')
+        admin = User.objects.create_user(username='admin', password='admin')
+        cls.admin = CompanyUser.objects.create(user=admin, company=cls.company, is_admin=True)
+        cls.url = '/api/v1/company-users/bulk_provision/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin.user)
+
+    def provision(self, users, **extra):
+        return self.client.post(self.url, {'users': users, **extra}, format='json')
+
+    def test_creates_users_with_roles(self):
+        response = self.provision([
+            {'username': 'ayse', 'password': 'gizli', 'email': 'Ayse@ORNEK.com', 'roles': [self.role.id, self.role.id]},
+            {'username': 'mehmet', 'is_admin': True},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'created'])
+
+        ayse = CompanyUser.objects.select_related('user').get(id=results[0]['id'])
+        self.assertEqual(ayse.company, self.company)
+        self.assertEqual(ayse.user.email, 'Ayse@ornek.com')
+        self.assertTrue(ayse.user.check_password('gizli'))
+        self.assertEqual(list(ayse.roles.all()), [self.role])
+        mehmet = CompanyUser.objects.select_related('user').get(id=results[1]['id'])
+        self.assertTrue(mehmet.is_admin)
+        self.assertFalse(mehmet.user.has_usable_password())
+
+    def test_invalid_rows_are_reported_per_row(self):
+        response = self.provision([
+            {'username': 'gecerli'},
+            {'username': 'admin'},
+            {'username': 'gecerli'},
+            {'username': 'rolsuz', 'roles': [999999]},
+            {'username': 'bosluklu ad'},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'error', 'error', 'error'])
+        self.assertIn('username', results[1]['errors'])
+        self.assertIn('username', results[2]['errors'])
+        self.assertIn('roles', results[3]['errors'])
+        self.assertIn('username', results[4]['errors'])
+
+    def test_user_limit_is_enforced(self):
+        response = self.provision([{'username': f'kullanici{i}'} for i in range(5)])
+        self.assertEqual(response.status_code, 201, response.content)
+        data = response.json()
+        # Limit 4, admin ile birlikte 3 yer kalmıştır
+        self.assertEqual((data['created_count'], data['error_count']), (3, 2))
+        self.assertEqual(data['results'][4]['errors'], {'non_field_errors': ["Şirket kullanıcı limiti aşıldı."]})
+        self.assertEqual(CompanyUser.objects.filter(company=self.company).count(), 4)
+
+    def test_all_or_nothing_writes_nothing_on_error(self):
+        response = self.provision([{'username': f'kullanici{i}'} for i in range(5)], allOrNothing=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created_count'], 0)
+        self.assertEqual(CompanyUser.objects.filter(company=self.company).count(), 1)
+
+    def test_only_admins_can_provision(self):
+        self.admin.is_admin = False
+        self.admin.save()
+        self.assertEqual(self.provision([{'username': 'yeni'}]).status_code, 403)
+
+    def test_request_path_hashes_in_process(self):
+        with mock.patch('api.password_pool.get_pool') as get_pool:
+            response = self.provision([{'username': f'kullanici{i}', 'password': 'gizli'} for i in range(MIN_POOL_PASSWORDS)])
+        self.assertEqual(response.status_code, 201, response.content)
+        get_pool.assert_not_called()
+
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_passwords_are_hashed_in_process_pool(self):
+        passwords = [f'sifre{i}' for i in range(MIN_POOL_PASSWORDS)] + [None]
+        try:
+            hashed = hash_passwords(passwords)
+        finally:
+            shutdown_pool()
+        self.assertEqual(len(set(hashed)), len(passwords))
+        for password, encoded in zip(passwords[:-1], hashed):
+            self.assertTrue(check_password(password, encoded))
+        self.assertFalse(is_password_usable(hashed[-1]))
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+            f.write(f'username,email,password,is_admin,roles\nali,ali@ornek.com,gizli,true,{self.role.id}\nadmin,,,,\n')
+        self.addCleanup(os.remove, f.name)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('provision_company_users', 'acente', f.name, stdout=stdout, stderr=stderr)
+
+        self.assertIn('1 kullanıcı oluşturuldu, 1 satır hatalı', stdout.getvalue())
+        self.assertIn('Satır 2', stderr.getvalue())
+        ali = CompanyUser.objects.get(user__username='ali')
+        self.assertTrue(ali.is_admin)
+        self.assertTrue(ali.user.check_password('gizli'))
+        self.assertEqual(list(ali.roles.all()), [self.role])
+
+
+class BulkUpsertTestCase(TestCase):
+    """bulk_upsert'in doğrulama, satır sonuçları ve ara tablo yazımını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='bulk')
+        cls.insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.traffic = QueryType.objects.create(name='traffic')
+        cls.casco = QueryType.objects.create(name='casco')
+        cls.item = InsuranceCompanyItem.objects.create(
+            insurance_company=cls.insurance_company, company=cls.company, username='eski', password='sifre'
+        )
+        cls.item.query_types.add(cls.traffic)
+        cls.url = '/api/v1/insurance-company-items/bulk_upsert/'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def new_row(self, **extra):
+        return {'insurance_company': self.insurance_company.id, 'company': self.company.id, **extra}
+
+    def test_creates_and_updates_with_query_types(self):
+        response = self.client.post(self.url, {'items': [
+            self.new_row(username='yeni', query_types=['traffic', 'casco', 'traffic']),
+            {'id': self.item.id, 'username': 'degisti', 'query_types': ['casco']},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual((data['created_count'], data['updated_count'], data['error_count']), (1, 1, 0))
+        created_id = data['results'][0]['id']
+        self.assertEqual(data['results'][1], {'index': 1, 'status': 'updated', 'id': self.item.id})
+
+        created = InsuranceCompanyItem.objects.get(id=created_id)
+        self.assertEqual(set(created.query_types.values_list('name', flat=True)), {'traffic', 'casco'})
+        self.assertEqual(created.credential_hash, make_credential_hash('yeni', None))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.username, 'degisti')
+        self.assertEqual(self.item.password, 'sifre')
+        self.assertEqual(self.item.credential_hash, make_credential_hash('degisti', 'sifre'))
+        self.assertEqual(list(self.item.query_types.values_list('name', flat=True)), ['casco'])
+
+    def test_omitted_query_types_are_kept(self):
+        response = self.client.post(self.url, [{'id': self.item.id, 'is_active': False}], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.is_active)
+        self.assertEqual(list(self.item.query_types.values_list('name', flat=True)), ['traffic'])
+
+    def test_invalid_rows_are_reported_per_row(self):
+        response = self.client.post(self.url, {'items': [
+            self.new_row(username='gecerli'),
+            {'username': 'eksik'},
+            self.new_row(company=999999),
+            self.new_row(query_types=['bilinmeyen']),
+            {'id': 999999, 'is_active': False},
+            {'id': self.item.id, 'is_active': False},
+            {'id': self.item.id, 'is_active': True},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'error', 'error', 'error', 'updated', 'error'])
+        self.assertEqual(set(results[1]['errors']), {'insurance_company', 'company'})
+        self.assertIn('company', results[2]['errors'])
+        self.assertIn('query_types', results[3]['errors'])
+        self.assertIn('id', results[4]['errors'])
+        self.assertIn('id', results[6]['errors'])
+        self.assertTrue(InsuranceCompanyItem.objects.filter(username='gecerli').exists())
+
+    def test_all_or_nothing_writes_nothing_on_error(self):
+        response = self.client.post(self.url, {
+            'items': [self.new_row(username='gecerli'), self.new_row(company=999999)],
+            'allOrNothing': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['skipped', 'error'])
+        self.assertFalse(InsuranceCompanyItem.objects.filter(username='gecerli').exists())
+
+    def test_invalidates_conditional_get_version(self):
+        before = get_versions([InsuranceCompanyItem])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, [{'id': self.item.id, 'is_active': False}], format='json')
+        self.assertNotEqual(get_versions([InsuranceCompanyItem]), before)
+
+    def test_too_many_rows_are_rejected(self):
+        response = self.client.post(self.url, [{}] * (MAX_BULK_ROWS + 1), format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CookieUpsertTestCase(TestCase):
+    """update_cookies_bulk'ın toplu upsert yolunu denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='cookie')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.item = InsuranceCompanyItem.objects.create(insurance_company=insurance_company, company=company)
+        cls.url = f'/api/v1/insurance-company-items/{cls.item.id}/update_cookies_bulk/'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def sync(self, cookies, clear_existing=True):
+        response = self.client.post(self.url, {'cookies': cookies, 'clearExisting': clear_existing}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_statement_count_does_not_depend_on_cookie_count(self):
+        # Anlık görüntü satırı ilk yazımda oluşturulur
+        self.sync(cookie_payload(1))
+        counts = []
+        for size in (1, COOKIE_SYNC_SIZE):
+            # Değişmeyen cookie'ler yazılmadığı için her turda değerler değiştirilir
+            payload = cookie_payload(size)
+            for cookie in payload:
+                cookie['value'] = f'tur{size}'
+            with CaptureQueriesContext(connection) as queries:
+                self.sync(payload, clear_existing=False)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_merge_reports_created_and_updated(self):
+        self.sync(cookie_payload(2))
+        payload = cookie_payload(3)
+        payload[0]['value'] = 'yeni'
+        result = self.sync(payload, clear_existing=False)
+
+        self.assertEqual(result['created_cookies'], ['sync2'])
+        self.assertEqual(result['updated_cookies'], ['sync0', 'sync1'])
+        cookie = InsuranceCompanyCookie.objects.get(insurance_company_item=self.item, name='sync0')
+        self.assertEqual(cookie.value, 'yeni')
+        self.assertTrue(cookie.http_only)
+        self.assertEqual(cookie.expires.year, 2030)
+        self.assertEqual(InsuranceCompanyCookie.objects.filter(insurance_company_item=self.item).count(), 3)
+
+    def test_clear_existing_replaces_jar(self):
+        self.sync(cookie_payload(3))
+        result = self.sync(cookie_payload(1))
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(result['updated_count'], 0)
+        self.assertEqual(InsuranceCompanyCookie.objects.filter(insurance_company_item=self.item).count(), 1)
+
+    def test_pascal_case_and_duplicates(self):
+        result = self.sync([
+            {'Name': 'sid', 'Value': 'a', 'Domain': 'd', 'Creation': '2025-01-01T00:00:00'},
+            {'Name': 'sid', 'Value': 'b', 'Domain': 'd', 'LastAccess': 'geçersiz'},
+        ])
+        self.assertEqual(result['created_cookies'], ['sid'])
+        self.assertEqual(result['updated_cookies'], ['sid'])
+        cookie = InsuranceCompanyCookie.objects.get(insurance_company_item=self.item, name='sid')
+        self.assertEqual(cookie.value, 'b')
+        self.assertIsNone(cookie.last_access)
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cookie, 'sid=a; sid=b')
+
+
+class CookieJarTestCase(TestCase):
+    """Cookie anlık görüntüsünün cookie satırlarıyla birlikte yazılmasını ve tek sorguyla okunmasını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='jar')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.item = InsuranceCompanyItem.objects.create(insurance_company=insurance_company, company=company)
+        cls.url = f'/api/v1/insurance-company-items/{cls.item.id}/cookie_jar/'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def sync(self, cookies, clear_existing=True):
+        response = self.client.post(
+            f'/api/v1/insurance-company-items/{self.item.id}/update_cookies_bulk/',
+            {'cookies': cookies, 'clearExisting': clear_existing}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def jar(self):
+        return InsuranceCompanyCookieJar.objects.get(insurance_company_item=self.item)
+
+    def test_jar_matches_rows_without_admin_fields(self):
+        self.sync(cookie_payload(3))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['version'], 1)
+        self.assertEqual([cookie['name'] for cookie in body['cookies']], ['sync0', 'sync1', 'sync2'])
+        self.assertNotIn('created_at', body['cookies'][0])
+        self.assertNotIn('updated_at', body['cookies'][0])
+
+        rows = InsuranceCompanyCookieSerializer(
+            InsuranceCompanyCookie.objects.filter(insurance_company_item=self.item).order_by('name'), many=True
+        ).data
+        for cookie, row in zip(body['cookies'], rows):
+            self.assertEqual(cookie['value'], row['value'])
+            self.assertEqual(cookie['expires'], row['expires'])
+            self.assertEqual(cookie['httpOnly'], row['http_only'])
+
+    def test_jar_round_trips_through_bulk_update(self):
+        self.sync(cookie_payload(2))
+        cookies = self.client.get(self.url).json()['cookies']
+        self.sync(cookies)
+        self.assertEqual(self.client.get(self.url).json()['cookies'], cookies)
+        # Değişmeyen cookie'ler yeniden yazılmaz, sürüm artmaz
+        self.assertEqual(self.jar().version, 1)
+
+    def test_every_cookie_change_bumps_version_once(self):
+        self.sync(cookie_payload(3))
+        cookie = InsuranceCompanyCookie.objects.get(insurance_company_item=self.item, name='sync0')
+        cookie.value = 'yönetim'
+        cookie.save()
+        jar = self.jar()
+        self.assertEqual(jar.version, 2)
+        self.assertIn('"yönetim"', jar.data)
+
+        cookie.delete()
+        self.assertEqual(self.jar().version, 3)
+
+        # Çok satırlı silme anlık görüntüyü bir kez yazar
+        response = self.client.delete(f'/api/v1/insurance-company-items/{self.item.id}/clear_cookies/')
+        self.assertEqual(response.json()['deleted_count'], 2)
+        jar = self.jar()
+        self.assertEqual(jar.version, 4)
+        self.assertEqual(jar.data, '[]')
+
+    def test_jar_is_rolled_back_with_cookies(self):
+        self.sync(cookie_payload(1))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.sync(cookie_payload(2))
+            raise IntegrityError
+        self.assertEqual(self.jar().version, 1)
+        self.assertEqual(len(json.loads(self.jar().data)), 1)
+
+    def test_etag_and_missing_jar(self):
+        empty = self.client.get(self.url)
+        self.assertEqual(empty.json(), {'version': 0, 'cookies': []})
+        self.assertEqual(self.client.get('/api/v1/insurance-company-items/0/cookie_jar/').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/async/insurance-company-items/0/cookie_jar/').status_code, 404)
+
+        self.sync(cookie_payload(1))
+        response = self.client.get(self.url)
+        self.assertNotEqual(response['ETag'], empty['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        async_response = self.client.get(f'/api/v1/async/insurance-company-items/{self.item.id}/cookie_jar/')
+        self.assertEqual(async_response.content, response.content)
+        self.assertEqual(async_response['ETag'], response['ETag'])
+
+    def test_item_delete_removes_jar(self):
+        self.sync(cookie_payload(2))
+        self.item.delete()
+        self.assertFalse(InsuranceCompanyCookieJar.objects.exists())
+
+
+class CookieDeltaSyncTestCase(TestCase):
+    """Sürüm bazlı delta cookie senkronizasyonunu (sync_cookies, cookie_changes) denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='delta')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.item = InsuranceCompanyItem.objects.create(insurance_company=insurance_company, company=company)
+        cls.base_url = f'/api/v1/insurance-company-items/{cls.item.id}'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def push(self, base_version, cookies=(), removed=(), expected_status=200):
+        response = self.client.post(f'{self.base_url}/sync_cookies/', {
+            'baseVersion': base_version, 'cookies': list(cookies), 'removed': list(removed)
+        }, format='json')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def changes(self, since, expected_status=200):
+        response = self.client.get(f'{self.base_url}/cookie_changes/?since={since}')
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def test_push_and_pull_deltas(self):
+        result = self.push(0, cookie_payload(3))
+        self.assertEqual(result['version'], 1)
+        self.assertEqual(result['created_cookies'], ['sync0', 'sync1', 'sync2'])
+
+        changed = cookie_payload(1)[0]
+        changed['value'] = 'yeni'
+        result = self.push(1, [changed], [{'name': 'sync2', 'domain': '.sigorta.example'}])
+        self.assertEqual(result['version'], 2)
+        self.assertEqual(result['updated_cookies'], ['sync0'])
+        self.assertEqual(result['removed_cookies'], ['sync2'])
+
+        delta = self.changes(1)
+        self.assertEqual(delta['version'], 2)
+        self.assertEqual([(cookie['name'], cookie['value']) for cookie in delta['cookies']], [('sync0', 'yeni')])
+        self.assertEqual(delta['removed'], [{'name': 'sync2', 'domain': '.sigorta.example'}])
+        self.assertEqual([cookie['name'] for cookie in self.changes(0)['cookies']], ['sync0', 'sync1'])
+        self.assertEqual(self.changes(2), {'version': 2, 'cookies': [], 'removed': []})
+
+    def test_stale_base_is_rejected(self):
+        self.push(0, cookie_payload(1))
+        result = self.push(0, cookie_payload(2), expected_status=409)
+        self.assertEqual(result['version'], 1)
+        self.assertEqual(InsuranceCompanyCookie.objects.filter(insurance_company_item=self.item).count(), 1)
+        self.assertEqual(self.changes(5, expected_status=409)['version'], 1)
+        self.changes('x', expected_status=400)
+        self.push(-1, expected_status=400)
+
+    def test_unchanged_cookies_are_not_rewritten(self):
+        self.push(0, cookie_payload(2))
+        before = list(InsuranceCompanyCookie.objects.order_by('name').values_list('id', 'updated_at'))
+        result = self.push(1, cookie_payload(2), [{'name': 'yok', 'domain': 'd'}])
+        self.assertEqual((result['version'], result['updated_cookies'], result['removed_cookies']), (1, [], []))
+
+        # clearExisting ile tam gönderim de sadece farkı yazar
+        response = self.client.post(f'{self.base_url}/update_cookies_bulk/', {'cookies': cookie_payload(1)}, format='json')
+        self.assertEqual(response.json()['version'], 2)
+        self.assertEqual(list(InsuranceCompanyCookie.objects.values_list('id', 'updated_at')), before[:1])
+        self.assertEqual(self.changes(1)['removed'], [{'name': 'sync1', 'domain': '.sigorta.example'}])
+
+    def test_readded_and_renamed_cookies(self):
+        self.push(0, cookie_payload(2))
+        self.push(1, removed=[{'name': 'sync0', 'domain': '.sigorta.example'}])
+        self.push(2, cookie_payload(1))
+        delta = self.changes(1)
+        self.assertEqual([cookie['name'] for cookie in delta['cookies']], ['sync0'])
+        self.assertEqual(delta['removed'], [])
+
+        # Yönetim panelinden anahtar değişikliği eski anahtarı silinmiş olarak bildirir
+        cookie = InsuranceCompanyCookie.objects.get(name='sync1')
+        cookie.name = 'sync1b'
+        with transaction.atomic():
+            cookie.save()
+        delta = self.changes(3)
+        self.assertEqual(delta['version'], 4)
+        self.assertEqual([cookie['name'] for cookie in delta['cookies']], ['sync1b'])
+        self.assertEqual(delta['removed'], [{'name': 'sync1', 'domain': '.sigorta.example'}])
+
+
+class CookieSweeperTestCase(TestCase):
+    """Süresi dolan cookie'lerin partiler halinde silinmesini ve okumalardan çıkarılmasını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='sweep')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.item = InsuranceCompanyItem.objects.create(insurance_company=insurance_company, company=company)
+        cls.base_url = f'/api/v1/insurance-company-items/{cls.item.id}'
+
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        payload = cookie_payload(8)
+        for i, cookie in enumerate(payload):
+            # 5 süresi dolmuş, 2 geçerli, 1 oturum cookie'si
+            cookie['expires'] = (now + timedelta(days=-1 if i < 5 else 1)).isoformat() if i < 7 else None
+        self.client.post(f'{self.base_url}/update_cookies_bulk/', {'cookies': payload}, format='json')
+
+    def names(self, cookies):
+        return sorted(cookie['name'] for cookie in cookies)
+
+    def test_reads_drop_expired_cookies(self):
+        valid = ['sync5', 'sync6', 'sync7']
+        self.assertEqual(self.names(self.client.get(f'{self.base_url}/get_cookies/').json()), valid)
+        self.assertEqual(self.names(self.client.get(f'/api/v1/async/insurance-company-items/{self.item.id}/get_cookies/').json()), valid)
+        self.assertEqual(self.names(self.client.get(f'{self.base_url}/').json()['cookies']), valid)
+        self.assertEqual(self.names(self.client.get(f'{self.base_url}/cookie_changes/?since=0').json()['cookies']), valid)
+
+        jar = self.client.get(f'{self.base_url}/cookie_jar/')
+        self.assertEqual(self.names(jar.json()['cookies']), valid)
+        self.assertEqual(jar['ETag'], f'"cookie-jar-{self.item.id}-1-3"')
+
+    def test_expiry_invalidates_conditional_reads(self):
+        urls = [
+            '/api/v1/insurance-company-items/', f'{self.base_url}/',
+            f'/api/v1/async/insurance-company-items/{self.item.id}/',
+            f'/api/v1/async/insurance-company-items/{self.item.id}/get_cookies/',
+        ]
+        cached = {url: self.client.get(url) for url in urls}
+        # Sonraki cookie'lerin süresi dolduğunda hiçbir yazma olmasa da kopya bayatlar
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=2)):
+            for url, response in cached.items():
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+                    self.assertEqual(
+                        self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200
+                    )
+            fresh = self.client.get(f'{self.base_url}/')
+            self.assertEqual(self.names(fresh.json()['cookies']), ['sync7'])
+            self.assertEqual(self.client.get(f'{self.base_url}/', HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+
+    def test_sweep_deletes_in_batches(self):
+        size = sum(
+            len(cookie.name) + len(cookie.value) + len(cookie.domain) + len(cookie.path)
+            for cookie in InsuranceCompanyCookie.objects.filter(expires__lte=timezone.now())
+        )
+        self.assertEqual(sweep_expired_cookies(batch_size=2, max_batches=1), (2, size * 2 // 5, 1))
+        self.assertEqual(sweep_expired_cookies(batch_size=2), (3, size * 3 // 5, 2))
+        self.assertEqual(sweep_expired_cookies(batch_size=2), (0, 0, 0))
+
+        self.assertEqual(InsuranceCompanyCookie.objects.count(), 3)
+        # Her parti anlık görüntüyü bir kez yeniler ve silmeleri delta senkronizasyonuna bildirir
+        jar = InsuranceCompanyCookieJar.objects.get(insurance_company_item=self.item)
+        self.assertEqual(jar.version, 4)
+        self.assertEqual(len(json.loads(jar.data)), 3)
+        self.assertEqual(len(self.client.get(f'{self.base_url}/cookie_changes/?since=1').json()['removed']), 5)
+        self.assertEqual(self.client.get(f'{self.base_url}/cookie_jar/')['ETag'], f'"cookie-jar-{self.item.id}-4"')
+
+    def test_sweep_locks_jars_before_cookies(self):
+        # Yazma yoluyla aynı kilit sırası: anlık görüntü satırı cookie satırlarından önce
+        jar_table = InsuranceCompanyCookieJar._meta.db_table
+        cookie_table = InsuranceCompanyCookie._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            sweep_expired_cookies(batch_size=10)
+        statements = [query['sql'] for query in queries.captured_queries]
+        jar_lock = next(index for index, sql in enumerate(statements) if f'FROM "{jar_table}"' in sql)
+        cookie_reads = [index for index, sql in enumerate(statements) if sql.startswith(f'SELECT "{cookie_table}"')]
+        cookie_delete = next(index for index, sql in enumerate(statements) if sql.startswith(f'DELETE FROM "{cookie_table}"'))
+        # Adaylar kilitsiz okunur; cookie satırları anlık görüntülerden sonra kilitlenip silinir
+        self.assertLess(cookie_reads[0], jar_lock)
+        self.assertLess(jar_lock, cookie_reads[1])
+        self.assertLess(jar_lock, cookie_delete)
+
+    def test_sweep_uses_expires_index(self):
+        query = InsuranceCompanyCookie.objects.filter(expires__lte=timezone.now()).order_by('expires').values('id')[:500]
+        self.assertIn('cookie_expires_idx', query.explain())
+
+    def test_command_reports_reclaimed_rows(self):
+        output = StringIO()
+        call_command('sweep_expired_cookies', '--batch-size', '10', stdout=output)
+        self.assertIn('5 süresi dolmuş cookie silindi', output.getvalue())
+        self.assertIn('1 parti', output.getvalue())
+        counters, _ = metrics_store.collect()
+        self.assertGreaterEqual(counters[('cookie_sweep_deleted_total', ())], 5)
+
+    def test_postgresql_lease_uses_advisory_lock(self):
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = (True,)
+        context = mock.MagicMock(**{'__enter__.return_value': cursor})
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(connection, 'cursor', return_value=context):
+            with sweep_lease(60) as acquired:
+                self.assertTrue(acquired)
+            cursor.fetchone.return_value = (False,)
+            with sweep_lease(60) as acquired:
+                self.assertFalse(acquired)
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(statements, [
+            'SELECT pg_try_advisory_lock(%s)', 'SELECT pg_advisory_unlock(%s)', 'SELECT pg_try_advisory_lock(%s)'
+        ])
+
+
+class ConditionalGetTestCase(TestCase):
+    """Koleksiyon ve nesne ETag / Last-Modified doğrulayıcılarını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='etag')
+        cls.insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.partage = Partage.objects.create(name='Partaj', code='p1')
+        cls.other_partage = Partage.objects.create(name='Diğer Partaj', code='p2')
+        cls.query_type = QueryType.objects.create(name='traffic')
+        cls.item = InsuranceCompanyItem.objects.create(
+            insurance_company=cls.insurance_company, company=cls.company, partage=cls.partage
+        )
+        user = User.objects.create(username='etag')
+        CompanyUser.objects.create(user=user, company=cls.company)
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.items_url = '/api/v1/insurance-company-items/'
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def assertChangedBy(self, change):
+        etag = self.client.get(self.items_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.revalidate(self.items_url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unchanged_collection_returns_304_with_one_query(self):
+        response = self.client.get(self.items_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.revalidate(self.items_url, response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.items_url)
+        not_modified = self.client.get(self.items_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_object_level_validators(self):
+        url = f'{self.items_url}{self.item.id}/'
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], self.client.get(self.items_url)['ETag'])
+        self.assertEqual(self.revalidate(url, response['ETag']).status_code, 304)
+
+    def test_item_save_changes_etag(self):
+        def change():
+            self.item.is_active = False
+            self.item.save()
+        self.assertChangedBy(change)
+
+    def test_related_insurance_company_changes_item_etag(self):
+        def change():
+            self.insurance_company.name = 'Yeni Sigorta'
+            self.insurance_company.save()
+        self.assertChangedBy(change)
+
+    def test_query_type_m2m_changes_etag(self):
+        self.assertChangedBy(lambda: self.item.query_types.add(self.query_type))
+
+    def test_bulk_cookie_sync_changes_etag(self):
+        self.assertChangedBy(lambda: self.client.post(
+            f'{self.items_url}{self.item.id}/update_cookies_bulk/', {'cookies': cookie_payload(2)}, format='json'
+        ))
+
+    def test_bulk_partage_update_changes_etag(self):
+        self.assertChangedBy(lambda: self.client.post(
+            f'{self.items_url}bulk_update_partage/',
+            {'item_ids': [self.item.id], 'partage': self.other_partage.id}, format='json'
+        ))
+
+    def test_reference_collections_and_pages_have_distinct_validators(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        etags = set()
+        for url in [
+            '/api/v1/insurance-companies/', '/api/v1/partages/', '/api/v1/query-types/',
+            '/api/v1/query-types/?page=1', '/api/v1/query-types/all_items_no_pagination/',
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.revalidate(url, response['ETag']).status_code, 304)
+                etags.add(response['ETag'])
+        self.assertEqual(len(etags), 5)
+
+    def test_unauthenticated_request_is_rejected_before_validation(self):
+        response = self.client.get('/api/v1/partages/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class CachedTokenAuthenticationTestCase(TestCase):
+    """Cache'li token doğrulamasını ve geçersiz kılma senaryolarını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='auth')
+        cls.user = User.objects.create(username='auth-user')
+        cls.company_user = CompanyUser.objects.create(user=cls.user, company=cls.company, is_admin=True)
+        cls.token = Token.objects.create(user=cls.user)
+        cls.url = '/api/v1/company-users/all_items_no_pagination/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def warm_up(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_warm_request_skips_token_and_company_lookups(self):
+        self.warm_up()
+        # Sadece liste sorgusu ve satır başına ilişkiler kalır; token/kullanıcı/şirket sorgusu yok
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(len(queries), 4)
+
+    def test_logout_revokes_token(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/v1/logout/').status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_token_rotation_revokes_old_key(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+            Token.objects.create(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_user_deactivation_revokes_access(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_company_user_change_refreshes_cached_entry(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company_user.is_admin = False
+            self.company_user.save()
+        response = self.client.post('/api/v1/company-users/', {'company': self.company.id, 'user': {}}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_company_expiry_change_refreshes_cached_entry(self):
+        self.warm_up()
+        cache_key = token_cache_key(self.token.key)
+        self.assertIsNotNone(cache.get(cache_key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.expires_at = timezone.now() + timedelta(days=30)
+            self.company.save()
+        self.assertIsNone(cache.get(cache_key))
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_local_cache_is_not_used(self):
+        # LocMem'de diğer worker'lar iptali göremez; token her istekte veritabanından çözülür
+        self.warm_up()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertTrue(any('authtoken_token' in query['sql'] for query in queries.captured_queries))
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class GenerateTotpTestCase(TestCase):
+    """generate_totp'un indeksli arama ve cache davranışını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='totp')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='ins')
+        cls.item = InsuranceCompanyItem.objects.create(
+            insurance_company=insurance_company, company=company,
+            username='AKS120', password='ardahan', totp_code=TOTP_SECRET
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def generate(self, username='AKS120', password='ardahan'):
+        return self.client.get('/api/v1/totp/', {'username': username, 'password': password})
+
+    def test_lookup_uses_credential_hash_and_warm_calls_are_query_free(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.generate()
+        self.assertEqual(response.json(), int(pyotp.TOTP(TOTP_SECRET).now()))
+        self.assertIn('credential_hash', queries.captured_queries[0]['sql'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.generate().status_code, 200)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_process_local_cache_is_not_used(self):
+        # LocMem'de diğer worker'lar secret/şifre değişikliğini göremez; her çağrı aramayı tekrarlar
+        self.generate()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.generate().status_code, 200)
+
+    def test_credential_hash_is_not_exposed(self):
+        response = self.client.get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        self.assertNotIn('credential_hash', response.json())
+
+    def test_password_change_revokes_old_credentials(self):
+        self.generate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.password = 'yeni-sifre'
+            self.item.save(update_fields=['password'])
+        self.assertEqual(self.generate().status_code, 404)
+        self.assertEqual(self.generate(password='yeni-sifre').status_code, 200)
+
+    def test_secret_change_is_picked_up(self):
+        self.generate()
+        new_secret = pyotp.random_base32()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.totp_code = new_secret
+            self.item.save()
+        self.assertEqual(self.generate().json(), int(pyotp.TOTP(new_secret).now()))
+
+    def test_missing_secret_and_unknown_credentials(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.totp_code = ' '
+            self.item.save()
+        self.assertEqual(self.generate().status_code, 500)
+        self.assertEqual(self.generate(password='yanlis').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/totp/', {'username': 'AKS120'}).status_code, 400)
+
+
+class AsyncReadPathTestCase(TestCase):
+    """Async okuma uçlarının sync karşılıklarıyla aynı çıktıyı verdiğini denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='async')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        partage = Partage.objects.create(name='Partaj', code='P1')
+        query_type = QueryType.objects.create(name='traffic')
+        cls.items = [
+            InsuranceCompanyItem.objects.create(
+                insurance_company=insurance_company, company=company, partage=partage,
+                username=f'user{i}', password='secret', totp_code=TOTP_SECRET,
+                is_active=i % 2 == 0, is_car_query=i % 3 == 0
+            )
+            for i in range(6)
+        ]
+        for item in cls.items:
+            item.query_types.add(query_type)
+            InsuranceCompanyCookie.objects.create(insurance_company_item=item, name='sid', value='v', domain='.x')
+        cls.item = cls.items[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameResponse(self, sync_path, async_path):
+        sync_response = APIClient().get(sync_path)
+        async_response = self.client.get(async_path)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response['Content-Type'], sync_response['Content-Type'])
+        self.assertEqual(async_response.content, sync_response.content)
+        return async_response
+
+    def test_responses_match_sync_endpoints(self):
+        for sync_path, async_path in [
+            (f'/api/v1/insurance-company-items/{self.item.id}/', f'/api/v1/async/insurance-company-items/{self.item.id}/'),
+            (f'/api/v1/insurance-company-items/{self.item.id}/get_cookies/',
+             f'/api/v1/async/insurance-company-items/{self.item.id}/get_cookies/'),
+            ('/api/v1/insurance-company-items/active_items/', '/api/v1/async/insurance-company-items/active_items/'),
+            ('/api/v1/insurance-company-items/car_query_items/', '/api/v1/async/insurance-company-items/car_query_items/'),
+            ('/api/v1/totp/?username=user1&password=secret', '/api/v1/async/totp/?username=user1&password=secret'),
+            ('/api/v1/totp/?username=user1&password=wrong', '/api/v1/async/totp/?username=user1&password=wrong'),
+            ('/api/v1/totp/?username=user1', '/api/v1/async/totp/?username=user1'),
+            ('/api/v1/insurance-company-items/0/', '/api/v1/async/insurance-company-items/0/'),
+        ]:
+            with self.subTest(path=async_path):
+                self.assertSameResponse(sync_path, async_path)
+
+    def test_conditional_get(self):
+        path = '/api/v1/async/insurance-company-items/active_items/'
+        response = self.client.get(path)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(path, headers={'If-None-Match': etag}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InsuranceCompanyCookie.objects.create(insurance_company_item=self.item, name='new', value='v', domain='.x')
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_only_get_allowed(self):
+        response = self.client.post(f'/api/v1/async/insurance-company-items/{self.item.id}/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_concurrent_requests(self):
+        paths = [
+            '/api/v1/async/insurance-company-items/active_items/',
+            f'/api/v1/async/insurance-company-items/{self.item.id}/',
+            f'/api/v1/async/insurance-company-items/{self.item.id}/get_cookies/',
+            '/api/v1/async/totp/?username=user1&password=secret',
+        ] * 5
+        responses = await asyncio.gather(*(self.async_client.get(path) for path in paths))
+        self.assertEqual([response.status_code for response in responses], [200] * len(paths))
+
+
+class SiblingGroupsTestCase(TestCase):
+    """Kardeş öğe gruplarının sadece sayfadaki (partage, sigorta şirketi) çiftleri için yüklendiğini denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='sibling')
+
+    def create_items(self, pairs):
+        return InsuranceCompanyItem.objects.bulk_create([
+            InsuranceCompanyItem(
+                insurance_company=insurance_company, company=self.company, partage=partage, username='user'
+            )
+            for partage, insurance_company in pairs
+        ])
+
+    def test_cross_product_pairs_are_dropped(self):
+        partages = [Partage.objects.create(name=f'P{i}', code=f'P{i}') for i in range(2)]
+        insurance_companies = [InsuranceCompany.objects.create(name=f'S{i}', code=f'S{i}') for i in range(2)]
+        first, second, _, sibling = self.create_items([
+            (partages[0], insurance_companies[0]), (partages[1], insurance_companies[1]),
+            (partages[0], insurance_companies[1]), (partages[1], insurance_companies[1]),
+        ])
+
+        groups = build_sibling_groups([first, second])
+        self.assertEqual({key: {item.id for item in group} for key, group in groups.items()}, {
+            (partages[0].id, insurance_companies[0].id): {first.id},
+            (partages[1].id, insurance_companies[1].id): {second.id, sibling.id},
+        })
+
+    def test_many_groups(self):
+        # SQLite'ın ifade derinliği (1000) ve parametre sınırlarını aşacak kadar grup
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        partages = Partage.objects.bulk_create([Partage(name=f'P{i}', code=f'P{i}') for i in range(1600)])
+        items = self.create_items((partage, insurance_company) for partage in partages)
+
+        chunks = -(-len(partages) // SIBLING_CHUNK_SIZE)
+        with self.assertNumQueries(chunks):
+            groups = build_sibling_groups(items)
+        self.assertEqual(len(groups), 1600)
+        self.assertTrue(all(group == [item] for item, group in zip(items, (
+            groups[(item.partage_id, item.insurance_company_id)] for item in items
+        ))))
+        groups = async_to_sync(abuild_sibling_groups)(items)
+        self.assertEqual(sum(len(group) for group in groups.values()), 1600)
+
+
+class CompanyLoginTestCase(TestCase):
+    """company_login yanıt yapısını, hata mesajlarını ve sorgu sayısını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Şirket', code='tst')
+        cls.other_company = Company.objects.create(name='Diğer', code='other')
+        cls.role = Role.objects.create(name='Operatör')
+        cls.user = User.objects.create_user(username='login-user', password=BENCHMARK_PASSWORD, email='l@x.local')
+        cls.company_user = CompanyUser.objects.create(user=cls.user, company=cls.company)
+        cls.company_user.roles.add(cls.role)
+
+    def login(self, username='login-user', password=BENCHMARK_PASSWORD, company_code='tst'):
+        return APIClient().post('/api/v1/login/', {
+            'username': username, 'password': password, 'company_code': company_code,
+        }, format='json')
+
+    def assertLoginError(self, message, **kwargs):
+        response = self.login(**kwargs)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': [message]})
+
+    def test_successful_login_response_shape(self):
+        # İlk girişte token get_or_create ile (SELECT + SAVEPOINT/INSERT/RELEASE) oluşturulur
+        with self.assertNumQueries(6):
+            response = self.login()
+        token = Token.objects.get(user=self.user)
+        self.assertEqual(response.json(), {
+            'token': token.key,
+            'user_id': self.user.pk,
+            'username': 'login-user',
+            'email': 'l@x.local',
+            'company': {'id': self.company.id, 'name': 'Şirket', 'code': 'tst'},
+            'is_admin': False,
+            'roles': [{'id': self.role.id, 'name': 'Operatör'}],
+        })
+        # Sonraki girişler: kullanıcı+şirket+token join ve roller
+        with self.assertNumQueries(2):
+            self.assertEqual(self.login().json()['token'], token.key)
+
+    def test_company_errors_take_precedence(self):
+        self.assertLoginError("Geçersiz şirket kodu.", company_code='yok', password='yanlis')
+        Company.objects.filter(pk=self.company.pk).update(is_active=False)
+        self.assertLoginError("Şirket aktif değil.", password='yanlis')
+        Company.objects.filter(pk=self.company.pk).update(is_active=True, expires_at=timezone.now() - timedelta(days=1))
+        self.assertLoginError("Şirket abonelik süresi dolmuş.")
+
+    def test_credential_errors(self):
+        self.assertLoginError("Geçersiz kullanıcı adı veya şifre.", password='yanlis')
+        self.assertLoginError("Geçersiz kullanıcı adı veya şifre.", username='yok')
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertLoginError("Geçersiz kullanıcı adı veya şifre.")
+
+    def test_failed_login_sends_signal(self):
+        failures = []
+        def receiver(sender, credentials, request, **kwargs):
+            failures.append((credentials['username'], request is not None))
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.assertLoginError("Geçersiz kullanıcı adı veya şifre.", password='yanlis')
+        self.assertEqual(failures, [('login-user', True)])
+
+    def test_company_user_errors(self):
+        self.assertLoginError("Bu kullanıcı bu şirkete bağlı değil.", company_code='other')
+        CompanyUser.objects.filter(pk=self.company_user.pk).update(is_active=False)
+        self.assertLoginError("Kullanıcı hesabı aktif değil.")
+        CompanyUser.objects.filter(pk=self.company_user.pk).update(
+            is_active=True, expires_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertLoginError("Kullanıcı hesabı süresi dolmuş.")
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThroughputTestCase(TransactionTestCase):
+    """
+    Vardiya başındaki giriş yoğunluğunu taklit ederek company_login'in
+    eşzamanlı yük altındaki verimini ölçer. Hash maliyeti ölçümü domine
+    etmesin diye hızlı bir hasher kullanılır; ölçülen şey giriş akışıdır.
+    """
+
+    def setUp(self):
+        company = Company.objects.create(name='Benchmark Şirketi', code='bench')
+        role = Role.objects.create(name='Operatör')
+        password_hash = make_password(BENCHMARK_PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f'shift{i}', password=password_hash) for i in range(LOGIN_CONCURRENCY * 2)
+        ])
+        company_users = CompanyUser.objects.bulk_create([CompanyUser(user=user, company=company) for user in users])
+        CompanyUser.roles.through.objects.bulk_create([
+            CompanyUser.roles.through(companyuser_id=company_user.id, role_id=role.id) for company_user in company_users
+        ])
+        # Token'lar önceden oluşturulur; ölçülen yol mevcut token ile tekrar giriştir
+        Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+        self.usernames = [user.username for user in users]
+
+    def login(self, index):
+        try:
+            response = APIClient().post('/api/v1/login/', {
+                'username': self.usernames[index % len(self.usernames)],
+                'password': BENCHMARK_PASSWORD,
+                'company_code': 'bench',
+            }, format='json')
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_login_throughput(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.login(0), 200)
+        queries_per_login = len(queries)
+        self.assertLessEqual(queries_per_login, BUDGETS['company-login'][0])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=LOGIN_CONCURRENCY) as executor:
+            statuses = list(executor.map(self.login, range(LOGIN_REQUESTS)))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(statuses, [200] * LOGIN_REQUESTS)
+        RESULTS.append({
+            'name': 'company-login-concurrent',
+            'method': 'POST',
+            'path': '/api/v1/login/',
+            'status': 200,
+            'queries': queries_per_login,
+            'query_budget': BUDGETS['company-login'][0],
+            'seconds': round(elapsed, 6),
+            'concurrency': LOGIN_CONCURRENCY,
+            'requests': LOGIN_REQUESTS,
+            'logins_per_second': round(LOGIN_REQUESTS / elapsed, 2),
+        })
+        write_results()
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingTestCase(TestCase):
+    """Server-Timing başlığının ve zamanlama log'unun örneklenen isteklerde yazıldığını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='timing')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        cls.item = InsuranceCompanyItem.objects.create(
+            insurance_company=insurance_company, company=company, username='user', password='secret'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def parse(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_reports_each_phase(self):
+        path = f'/api/v1/insurance-company-items/{self.item.id}/'
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(path)
+        metrics = self.parse(response)
+
+        self.assertEqual(list(metrics), ['db', 'serialize', 'render', 'total'])
+        self.assertEqual(metrics['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+        self.assertGreater(float(metrics['render']['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']),
+            float(metrics['db']['dur']) + float(metrics['serialize']['dur']) + float(metrics['render']['dur'])
+        )
+
+    def test_structured_log_line(self):
+        with self.assertLogs('sigorta_api.timing', level='INFO') as logs:
+            APIClient().get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry['method'], 'GET')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(
+            set(entry), {'method', 'path', 'status', 'db_ms', 'queries', 'serialize_ms', 'render_ms', 'total_ms'}
+        )
+
+    def test_async_views_are_measured(self):
+        response = self.client.get(f'/api/v1/async/insurance-company-items/{self.item.id}/')
+        metrics = self.parse(response)
+        self.assertNotEqual(metrics['db']['desc'], '"0 queries"')
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = APIClient().get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(DUPLICATE_QUERY_SAMPLE_RATE=1.0, DUPLICATE_QUERY_STRICT=False)
+class DuplicateQueryTestCase(TestCase):
+    """Tekrarlanan sorgu tespitinin gruplama, raporlama ve sıkı mod davranışını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='dup')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        cls.partage = Partage.objects.create(name='Partaj', code='P1')
+        for i in range(6):
+            InsuranceCompanyItem.objects.create(
+                insurance_company=insurance_company, company=company, partage=cls.partage, username=f'user{i}'
+            )
+        cls.token = Token.objects.create(user=User.objects.create_user(username='dup', password='x'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql('SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s, %s, %s) AND "a"."name" = \'x\' LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) AND "a"."name" = ? LIMIT ?'
+        )
+        self.assertEqual(
+            normalize_sql('SELECT * FROM "a" WHERE "a"."id" IN (%s)'),
+            normalize_sql('SELECT *\n  FROM "a" WHERE "a"."id" IN (%s, %s)')
+        )
+
+    def test_fixed_endpoints_have_no_duplicates(self):
+        with self.assertNoLogs('sigorta_api.queries', level='WARNING'):
+            self.client.get(f'/api/v1/partages/{self.partage.id}/')
+            self.client.get(f'/api/v1/partages/{self.partage.id}/related_companies/')
+
+    def test_repeated_shapes_are_reported_with_view_and_call_site(self):
+        path = f'/api/v1/partages/{self.partage.id}/related_companies/'
+        # select_related devre dışıyken her öğe için şirket ve sigorta şirketi ayrı sorgulanır
+        with mock.patch.object(QuerySet, 'select_related', lambda queryset, *fields: queryset), \
+                self.assertLogs('sigorta_api.queries', level='WARNING') as logs:
+            self.client.get(path)
+        report = json.loads(logs.records[-1].getMessage())
+
+        self.assertEqual(report['path'], path)
+        self.assertEqual(report['view'], 'api.views.PartageViewSet.related_companies')
+        self.assertEqual([duplicate['count'] for duplicate in report['duplicates']], [6, 6])
+        self.assertIn('api/views.py', report['duplicates'][0]['call_site'][-1])
+
+    @override_settings(DUPLICATE_QUERY_STRICT=True, DUPLICATE_QUERY_SAMPLE_RATE=0)
+    def test_strict_mode_inspects_every_request_and_raises(self):
+        with mock.patch.object(QuerySet, 'select_related', lambda queryset, *fields: queryset), \
+                self.assertLogs('sigorta_api.queries', level='WARNING'), \
+                self.assertRaisesMessage(DuplicateQueryError, 'PartageViewSet.related_companies'):
+            self.client.get(f'/api/v1/partages/{self.partage.id}/related_companies/')
+
+    @override_settings(DUPLICATE_QUERY_SAMPLE_RATE=0, DUPLICATE_QUERY_THRESHOLD=1)
+    def test_unsampled_requests_are_not_inspected(self):
+        with self.assertNoLogs('sigorta_api.queries', level='WARNING'):
+            self.client.get(f'/api/v1/partages/{self.partage.id}/')
+
+
+class MetricsTestCase(TestCase):
+    """/metrics uç noktasının istek ve cache metriklerini worker'lar arası topladığını denetler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Şirket', code='metrics')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        cls.item = InsuranceCompanyItem.objects.create(
+            insurance_company=insurance_company, company=company, username='user'
+        )
+        cls.token = Token.objects.create(user=User.objects.create_user(username='metrics', password='x'))
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(METRICS_DIR=directory.name, METRICS_TOKEN=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics_store.reset()
+
+    def scrape(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_request_metrics_per_view(self):
+        for _ in range(2):
+            self.client.get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        self.client.get('/api/v1/insurance-company-items/0/')
+        samples = self.scrape()
+
+        view = 'view="api.views.InsuranceCompanyItemViewSet.retrieve",method="GET"'
+        self.assertEqual(samples[f'http_requests_total{{{view},status="200"}}'], 2)
+        self.assertEqual(samples[f'http_requests_total{{{view},status="404"}}'], 1)
+        self.assertEqual(samples[f'http_request_duration_seconds_count{{{view}}}'], 3)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{{view},le="+Inf"}}'], 3)
+        self.assertGreater(samples[f'http_request_queries_sum{{{view}}}'], 0)
+        self.assertGreater(samples[f'http_response_size_bytes_sum{{{view}}}'], 0)
+
+    def test_disabled_metrics_are_not_recorded(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.client.get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        view = 'view="api.views.InsuranceCompanyItemViewSet.retrieve",method="GET"'
+        self.assertNotIn(f'http_requests_total{{{view},status="200"}}', self.scrape())
+
+    def test_workers_are_aggregated(self):
+        self.client.get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        # Başka bir worker'ın yazdığı dosya
+        with mock.patch('os.getpid', return_value=os.getpid() + 100000):
+            worker = MetricsStore()
+            worker.inc('http_requests_total', (
+                ('view', 'api.views.InsuranceCompanyItemViewSet.retrieve'), ('method', 'GET'), ('status', '200')
+            ), 4)
+            worker.observe('http_request_duration_seconds', (
+                ('view', 'api.views.InsuranceCompanyItemViewSet.retrieve'), ('method', 'GET')
+            ), 20)
+            worker.flush()
+        samples = self.scrape()
+
+        view = 'view="api.views.InsuranceCompanyItemViewSet.retrieve",method="GET"'
+        self.assertEqual(samples[f'http_requests_total{{{view},status="200"}}'], 5)
+        self.assertEqual(samples[f'http_request_duration_seconds_count{{{view}}}'], 2)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{{view},le="10"}}'], 1)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{{view},le="+Inf"}}'], 2)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_cache_hit_ratio(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for _ in range(3):
+            client.get('/api/v1/query-types/all_items_no_pagination/')
+        samples = self.scrape()
+
+        self.assertEqual(samples['cache_requests_total{cache="auth_token",result="miss"}'], 1)
+        self.assertEqual(samples['cache_requests_total{cache="auth_token",result="hit"}'], 2)
+        self.assertEqual(samples['cache_requests_total{cache="response",result="miss"}'], 1)
+        self.assertEqual(samples['cache_requests_total{cache="response",result="hit"}'], 2)
+
+    def test_exited_workers_are_archived_once(self):
+        self.client.get(f'/api/v1/insurance-company-items/{self.item.id}/')
+        pid = os.getpid() + 100000
+        with mock.patch('os.getpid', return_value=pid):
+            worker = MetricsStore()
+            worker.inc('cache_requests_total', (('cache', 'totp'), ('result', 'hit')), 3)
+            worker.flush()
+        metrics_store.archive(pid)
+        metrics_store.archive(pid)
+
+        self.assertFalse(os.path.exists(os.path.join(settings.METRICS_DIR, f'{pid}.json')))
+        samples = self.scrape()
+        self.assertEqual(samples['cache_requests_total{cache="totp",result="hit"}'], 3)
+        self.assertEqual(
+            samples['http_requests_total{view="api.views.InsuranceCompanyItemViewSet.retrieve",method="GET",status="200"}'], 1
+        )
+
+    def test_token_protection(self):
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics/').status_code, 401)
+            response = self.client.get('/metrics/', headers={'Authorization': 'Bearer secret'})
+            self.assertEqual(response.status_code, 200)
+
+
+class WarmupTestCase(TestCase):
+    """Fork öncesi ısıtma adımlarının veritabanına gitmeden çalıştığını denetler."""
+
+    def test_pre_fork_warm_up_does_not_touch_database(self):
+        # Ana süreçte açılan bağlantı worker'lara paylaşılmamalı
+        with self.assertNumQueries(0):
+            warm_imports()
+            warm_models()
+            warm_urls()
+            warm_serializers()
+
+
+@override_settings(DB_REPLICA_ENABLED=True, DATABASE_ROUTERS=['sigorta_api.db_router.ReplicaRouter'])
+class ReplicaRouterTestCase(TransactionTestCase):
+    """
+    Okuma replikası yönlendirmesini 'default' ve onun test aynası olan 'replica'
+    takma adlarıyla denetler; sorgular bağlantı bazında sayılır.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        company = Company.objects.create(name='Şirket', code='replica')
+        insurance_company = InsuranceCompany.objects.create(name='Sigorta', code='SGR')
+        self.item = InsuranceCompanyItem.objects.create(
+            insurance_company=insurance_company, company=company, username='user'
+        )
+        self.token = Token.objects.create(user=User.objects.create_user(username='replica', password='x'))
+
+    def request(self, client, method, path, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(client, method)(path, data, format='json')
+        return response, len(primary), len(replica)
+
+    def test_safe_reads_go_to_replica(self):
+        response, primary, replica = self.request(APIClient(), 'get', f'/api/v1/insurance-company-items/{self.item.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+        self.assertNotIn(ReplicaRoutingMiddleware.pin_cookie_name, response.cookies)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0, DUPLICATE_QUERY_SAMPLE_RATE=0, DUPLICATE_QUERY_STRICT=False)
+    def test_pinning_does_not_depend_on_sampling(self):
+        path = f'/api/v1/insurance-company-items/{self.item.id}/'
+        response, _, replica = self.request(APIClient(), 'patch', path, {'username': 'changed'})
+        self.assertEqual(replica, 0)
+        self.assertIn(ReplicaRoutingMiddleware.pin_cookie_name, response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        client = APIClient()
+        path = f'/api/v1/insurance-company-items/{self.item.id}/'
+        response, primary, replica = self.request(client, 'patch', path, {'username': 'changed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+        self.assertEqual(response.cookies[ReplicaRoutingMiddleware.pin_cookie_name]['max-age'], 5)
+
+        # Aynı istemcinin sonraki okumaları birincilden yapılır ve kendi yazdığını görür
+        response, primary, replica = self.request(client, 'get', path)
+        self.assertEqual(response.json()['username'], 'changed')
+        self.assertEqual(replica, 0)
+
+        # Sabitleme cookie'si olmayan istemciler replikadan okur
+        _, primary, replica = self.request(APIClient(), 'get', path)
+        self.assertEqual(primary, 0)
+
+    def test_cache_fills_read_from_primary(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        # Token çözümlemesi cache'e yazıldığı için birincilden, liste replikadan okunur
+        response, primary, replica = self.request(client, 'get', '/api/v1/companies/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 1)
+        self.assertGreater(replica, 0)
+
+        # Cache'lenecek referans verisi yanıtları tamamen birincilden üretilir
+        _, primary, replica = self.request(client, 'get', '/api/v1/query-types/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_commands_and_shell_use_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            InsuranceCompanyItem.objects.get(pk=self.item.pk)
+        self.assertEqual(len(replica), 0)
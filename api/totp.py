@@ -0,0 +1,66 @@
+from functools import lru_cache
+
+import pyotp
+from django.conf import settings
+from django.core.cache import cache
+
+from sigorta_api.db_router import use_primary
+from sigorta_api.metrics import record_cache
+
+from .models import InsuranceCompanyItem, make_credential_hash
+
+
+def totp_cache_key(credential_hash):
+    return f"totp_secret:{credential_hash}"
+
+
+@lru_cache(maxsize=4096)
+def get_totp(secret):
+    """Aynı secret için pyotp.TOTP nesnesini her istekte yeniden oluşturmaz."""
+    return pyotp.TOTP(secret)
+
+
+def totp_queryset(credential_hash, username):
+    return InsuranceCompanyItem.objects.only('totp_code').filter(
+        credential_hash=credential_hash,
+        username=username
+    )
+
+
+def resolve_totp_secret(username, password):
+    """
+    Kullanıcı adı ve şifreye ait TOTP secret'ını döndürür. Arama indeksli
+    credential_hash alanı üzerinden yapılır. Sonuç sadece paylaşılan cache'te
+    (CACHE_IS_SHARED) tutulur; süreç içi cache'te şifre ya da secret değişikliğinin
+    silinmesi diğer worker'lara ulaşmaz. Kayıt yoksa InsuranceCompanyItem.DoesNotExist fırlatır.
+    """
+    credential_hash = make_credential_hash(username, password)
+    key = totp_cache_key(credential_hash)
+    secret = None
+    if settings.CACHE_IS_SHARED:
+        secret = cache.get(key)
+        record_cache('totp', secret is not None)
+    if secret is None:
+        with use_primary():
+            item = totp_queryset(credential_hash, username).get(password=password)
+        secret = item.totp_code or ""
+        if settings.CACHE_IS_SHARED:
+            cache.set(key, secret, settings.TOTP_CACHE_TIMEOUT)
+    return secret
+
+
+async def aresolve_totp_secret(username, password):
+    """resolve_totp_secret'ın async ORM ve async cache API'si ile çalışan karşılığı."""
+    credential_hash = make_credential_hash(username, password)
+    key = totp_cache_key(credential_hash)
+    secret = None
+    if settings.CACHE_IS_SHARED:
+        secret = await cache.aget(key)
+        record_cache('totp', secret is not None)
+    if secret is None:
+        with use_primary():
+            item = await totp_queryset(credential_hash, username).aget(password=password)
+        secret = item.totp_code or ""
+        if settings.CACHE_IS_SHARED:
+            await cache.aset(key, secret, settings.TOTP_CACHE_TIMEOUT)
+    return secret
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     CompanyViewSet, CompanyUserViewSet, InsuranceCompanyViewSet, InsuranceCompanyItemViewSet,
-    RoleViewSet, QueryTypeViewSet, RolePermissionViewSet, PartageViewSet, company_login, generate_totp
+    RoleViewSet, QueryTypeViewSet, RolePermissionViewSet, PartageViewSet, company_login, company_logout, generate_totp
 )
 
 router = DefaultRouter()
@@ -18,5 +19,14 @@ router.register(r'partages', PartageViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('login/', company_login, name='company-login'),
+    path('logout/', company_logout, name='company-logout'),
     path('totp/', generate_totp, name='generate-totp'),
+
+    # ASGI altında thread tutmadan çalışan async okuma uçları
+    path('async/insurance-company-items/active_items/', async_views.active_items, name='async-active-items'),
+    path('async/insurance-company-items/car_query_items/', async_views.car_query_items, name='async-car-query-items'),
+    path('async/insurance-company-items/<int:pk>/', async_views.item_detail, name='async-item-detail'),
+    path('async/insurance-company-items/<int:pk>/get_cookies/', async_views.item_cookies, name='async-item-cookies'),
+    path('async/insurance-company-items/<int:pk>/cookie_jar/', async_views.item_cookie_jar, name='async-item-cookie-jar'),
+    path('async/totp/', async_views.generate_totp, name='async-generate-totp'),
 ] 
\ No newline at end of file
@@ -0,0 +1,82 @@
+import threading
+
+from django.db import transaction
+from django.db.models import Case, F, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import DataVersion, InsuranceCompanyCookie
+
+_pending = threading.local()
+
+
+def version_name(model):
+    return model._meta.label_lower
+
+
+def mark_changed(*models):
+    """
+    Verilen modellerin sürüm sayaçlarını transaction commit edildiğinde artırır.
+    Aynı transaction içindeki çok sayıda değişiklik tek bir UPDATE ile yazılır.
+    """
+    labels = getattr(_pending, 'labels', None)
+    if labels is None:
+        labels = _pending.labels = set()
+    labels.update(version_name(model) for model in models)
+    transaction.on_commit(flush_pending_versions)
+
+
+def flush_pending_versions():
+    labels = getattr(_pending, 'labels', None)
+    if not labels:
+        return
+    _pending.labels = set()
+    bump_versions(labels)
+
+
+def bump_versions(labels):
+    updated = DataVersion.objects.filter(name__in=labels).update(
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if updated < len(labels):
+        # Eksik sayaç satırlarını oluştur; yeni satır da değişiklik anlamına gelir
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=label, version=1) for label in labels],
+            ignore_conflicts=True
+        )
+
+
+def changed_at():
+    """
+    Sayacın son değişiklik zamanı. Cookie içeren yanıtların gövdesi bir cookie'nin
+    süresi dolduğu an da değişir; bu yüzden InsuranceCompanyCookie sayacında, daha
+    yeniyse süresi en son dolmuş cookie'nin expires değeri kullanılır (expires
+    indeksiyle tek satır, aynı sorgu içinde okunur).
+    """
+    last_expired = InsuranceCompanyCookie.objects.filter(
+        expires__lte=timezone.now()
+    ).order_by('-expires').values('expires')[:1]
+    return Case(
+        When(
+            name=version_name(InsuranceCompanyCookie),
+            then=Greatest('updated_at', Coalesce(Subquery(last_expired), 'updated_at')),
+        ),
+        default='updated_at',
+    )
+
+
+def versions_queryset(models):
+    return DataVersion.objects.filter(
+        name__in=[version_name(model) for model in models]
+    ).values_list('name', 'version', changed_at())
+
+
+def get_versions(models):
+    """Modellerin (sürüm, son değişiklik) bilgisini tek sorguda döndürür."""
+    return {name: (version, updated_at) for name, version, updated_at in versions_queryset(models)}
+
+
+async def aget_versions(models):
+    """get_versions'ın async ORM ile çalışan karşılığı."""
+    return {name: (version, updated_at) async for name, version, updated_at in versions_queryset(models)}
@@ -1,3 +1,5 @@
+from collections import Counter
+
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
@@ -11,12 +13,28 @@ from .serializers import (
     InsuranceCompanyItemCreateUpdateSerializer, InsuranceCompanyCookieSerializer, InsuranceCompanyCookieCreateSerializer,
     UserSerializer, RoleSerializer, RoleDetailSerializer, 
     QueryTypeSerializer, RolePermissionSerializer, PartageSerializer, PartageDetailSerializer,
-    CompanyLoginSerializer
+    CompanyLoginSerializer, sibling_item_data
 )
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+from .cookies import (
+    CookieJarConflict, apply_cookie_delta, cookie_changes, cookie_changes_response, cookie_jar_queryset,
+    cookie_jar_response, defer_cookie_jars, upsert_cookies
+)
+from .bulk import MAX_BULK_ROWS, bulk_upsert_items
+from .conditional import ConditionalGetMixin
+from .instrumentation import ServerTimingMixin
+from .pagination import KeysetPaginationMixin, keyset_parameters
+from .provisioning import MAX_PROVISION_ROWS, provision_company_users
+from .response_cache import ResponseCacheMixin
+from .sparse import sparse_parameters
+from .streaming import StreamingListMixin, stream_parameter
+from .totp import get_totp, resolve_totp_secret
+from .versions import mark_changed
+from django.utils.decorators import method_decorator
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-import pyotp
 
 # Create your views here.
 
@@ -74,15 +92,13 @@ def company_login(request):
     Kullanıcı adı, şifre ve şirket kodu ile giriş yapar.
     Kullanıcı ve şirket durumlarını kontrol eder.
     """
-    serializer = CompanyLoginSerializer(data=request.data)
+    serializer = CompanyLoginSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
         user = serializer.validated_data['user']
         company = serializer.validated_data['company']
         company_user = serializer.validated_data['company_user']
-        
-        # Token oluştur veya mevcut olanı getir
-        token, created = Token.objects.get_or_create(user=user)
+        token = serializer.validated_data['token']
         
         return Response({
             'token': token.key,
@@ -100,58 +116,89 @@ def company_login(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class RoleViewSet(viewsets.ModelViewSet):
+@swagger_auto_schema(
+    method='post',
+    responses={
+        200: openapi.Response(description='Başarılı çıkış'),
+        401: openapi.Response(description='Kimlik doğrulama gerekli'),
+    }
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def company_logout(request):
+    """
+    Kullanıcının token'ını siler.
+    Token'a ait cache kaydı da geçersiz kılınır; token bir daha kullanılamaz.
+    """
+    if isinstance(request.auth, Token):
+        request.auth.delete()
+    return Response({"message": "Çıkış yapıldı"}, status=status.HTTP_200_OK)
+
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=keyset_parameters))
+class RoleViewSet(ServerTimingMixin, KeysetPaginationMixin, ResponseCacheMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Role.objects.all()
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # RoleDetailSerializer izinleri sorgu türü adlarıyla birlikte döndürür
+            return queryset.prefetch_related(
+                Prefetch('permissions', queryset=RolePermission.objects.select_related('query_type'))
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return RoleDetailSerializer
         return RoleSerializer
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm rolleri pagination olmadan döndürür
         """
         roles = Role.objects.all()
-        serializer = self.get_serializer(roles, many=True)
-        return Response(serializer.data)
+        return self.list_response(roles)
     
     @action(detail=True, methods=['get'])
     def permissions(self, request, pk=None):
         role = self.get_object()
-        permissions = role.permissions.all()
+        permissions = role.permissions.select_related('query_type')
         serializer = RolePermissionSerializer(permissions, many=True)
         return Response(serializer.data)
 
-class QueryTypeViewSet(viewsets.ModelViewSet):
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=keyset_parameters))
+class QueryTypeViewSet(ServerTimingMixin, KeysetPaginationMixin, ConditionalGetMixin, ResponseCacheMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = QueryType.objects.all()
     serializer_class = QueryTypeSerializer
     permission_classes = [IsAuthenticated]
+    conditional_models = [QueryType]
 
+    @swagger_auto_schema(manual_parameters=[stream_parameter])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm sorgu türlerini pagination olmadan döndürür
         """
         query_types = QueryType.objects.all()
-        serializer = self.get_serializer(query_types, many=True)
-        return Response(serializer.data)
+        return self.list_response(query_types)
 
-class RolePermissionViewSet(viewsets.ModelViewSet):
-    queryset = RolePermission.objects.all()
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=keyset_parameters))
+class RolePermissionViewSet(ServerTimingMixin, KeysetPaginationMixin, StreamingListMixin, viewsets.ModelViewSet):
+    queryset = RolePermission.objects.select_related('query_type')
     serializer_class = RolePermissionSerializer
     permission_classes = [IsAuthenticated]
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm rol izinlerini pagination olmadan döndürür
         """
-        permissions = RolePermission.objects.all()
-        serializer = self.get_serializer(permissions, many=True)
-        return Response(serializer.data)
+        permissions = self.get_queryset()
+        return self.list_response(permissions)
     
     @swagger_auto_schema(
         manual_parameters=[
@@ -168,7 +215,7 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
     def by_role(self, request):
         role_id = request.query_params.get('role_id')
         if role_id:
-            permissions = RolePermission.objects.filter(role_id=role_id)
+            permissions = self.get_queryset().filter(role_id=role_id)
             serializer = self.get_serializer(permissions, many=True)
             return Response(serializer.data)
         return Response({"error": "role_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -188,24 +235,25 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
     def by_query_type(self, request):
         query_type_id = request.query_params.get('query_type_id')
         if query_type_id:
-            permissions = RolePermission.objects.filter(query_type_id=query_type_id)
+            permissions = self.get_queryset().filter(query_type_id=query_type_id)
             serializer = self.get_serializer(permissions, many=True)
             return Response(serializer.data)
         return Response({"error": "query_type_id query parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class CompanyViewSet(viewsets.ModelViewSet):
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=keyset_parameters))
+class CompanyViewSet(ServerTimingMixin, KeysetPaginationMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     permission_classes = [IsAuthenticated]
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm şirketleri pagination olmadan döndürür
         """
         companies = Company.objects.all()
-        serializer = self.get_serializer(companies, many=True)
-        return Response(serializer.data)
+        return self.list_response(companies)
     
     @action(detail=True, methods=['get'])
     def users(self, request, pk=None):
@@ -221,7 +269,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
         serializer = InsuranceCompanyItemSerializer(items, many=True)
         return Response(serializer.data)
 
-class CompanyUserViewSet(viewsets.ModelViewSet):
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=[*sparse_parameters, *keyset_parameters]))
+@method_decorator(name='retrieve', decorator=swagger_auto_schema(manual_parameters=sparse_parameters))
+class CompanyUserViewSet(ServerTimingMixin, KeysetPaginationMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = CompanyUser.objects.all()
     permission_classes = [IsAuthenticated]
     
@@ -244,14 +294,14 @@ class CompanyUserViewSet(viewsets.ModelViewSet):
                 return CompanyUser.objects.none()
         return CompanyUser.objects.none()
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter, *sparse_parameters])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Kullanıcının şirketindeki tüm kullanıcıları pagination olmadan döndürür
         """
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     def create(self, request, *args, **kwargs):
         # Sadece admin kullanıcılar yeni kullanıcı ekleyebilir
@@ -316,6 +366,70 @@ class CompanyUserViewSet(viewsets.ModelViewSet):
             return Response({"error": f"Şirket kullanıcısı oluşturulurken hata oluştu: {str(e)}"}, 
                            status=status.HTTP_400_BAD_REQUEST)
     
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['users'],
+            properties={
+                'users': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        required=['username'],
+                        properties={
+                            'username': openapi.Schema(type=openapi.TYPE_STRING),
+                            'email': openapi.Schema(type=openapi.TYPE_STRING),
+                            'password': openapi.Schema(type=openapi.TYPE_STRING),
+                            'first_name': openapi.Schema(type=openapi.TYPE_STRING),
+                            'last_name': openapi.Schema(type=openapi.TYPE_STRING),
+                            'is_admin': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False),
+                            'is_active': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=True),
+                            'expires_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                            'roles': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                        }
+                    ),
+                    description='Oluşturulacak kullanıcılar'
+                ),
+                'allOrNothing': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False, description='Hatalı satır varsa hiçbir kullanıcıyı oluşturma'),
+            },
+        )
+    )
+    @action(detail=False, methods=['post'])
+    def bulk_provision(self, request):
+        """
+        Admin kullanıcının şirketine toplu kullanıcı oluşturur ve satır bazında sonuç döndürür
+        """
+        if not request.user.companyuser.is_admin:
+            return Response(
+                {"error": "Sadece admin kullanıcılar yeni kullanıcı ekleyebilir."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if isinstance(request.data, list):
+            rows = request.data
+            all_or_nothing = False
+        elif isinstance(request.data, dict):
+            rows = request.data.get('users', [])
+            all_or_nothing = request.data.get('allOrNothing', False)
+        else:
+            return Response({"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(rows, list):
+            return Response({"error": "users must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_PROVISION_ROWS:
+            return Response(
+                {"error": f"At most {MAX_PROVISION_ROWS} users per request; use the provision_company_users command"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results, written = provision_company_users(request.user.companyuser.company, rows, bool(all_or_nothing))
+        counts = Counter(result['status'] for result in results)
+        return Response({
+            "created_count": counts['created'],
+            "error_count": counts['error'],
+            "results": results
+        }, status=status.HTTP_201_CREATED if written else status.HTTP_400_BAD_REQUEST)
+
     def update(self, request, *args, **kwargs):
         # Sadece admin kullanıcılar güncelleme yapabilir
         if not request.user.companyuser.is_admin:
@@ -329,7 +443,7 @@ class CompanyUserViewSet(viewsets.ModelViewSet):
         
         # Admin kullanıcı sadece kendi şirketindeki kullanıcıları güncelleyebilir
         admin_company = request.user.companyuser.company
-        if company_user.company.id != admin_company.id:
+        if company_user.company_id != admin_company.id:
             return Response(
                 {"error": "Sadece kendi şirketinizdeki kullanıcıları güncelleyebilirsiniz."}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -454,20 +568,22 @@ class CompanyUserViewSet(viewsets.ModelViewSet):
         has_permission = company_user.has_permission(query_type)
         return Response({"has_permission": has_permission})
 
-class InsuranceCompanyViewSet(viewsets.ModelViewSet):
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=keyset_parameters))
+class InsuranceCompanyViewSet(ServerTimingMixin, KeysetPaginationMixin, ConditionalGetMixin, ResponseCacheMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = InsuranceCompany.objects.all().order_by('name')
     serializer_class = InsuranceCompanySerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None
+    conditional_models = [InsuranceCompany]
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm sigorta şirketlerini pagination olmadan döndürür
         """
         insurance_companies = InsuranceCompany.objects.all()
-        serializer = self.get_serializer(insurance_companies, many=True)
-        return Response(serializer.data)
+        return self.list_response(insurance_companies)
     
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
@@ -476,28 +592,35 @@ class InsuranceCompanyViewSet(viewsets.ModelViewSet):
         serializer = InsuranceCompanyItemSerializer(items, many=True)
         return Response(serializer.data)
 
-class PartageViewSet(viewsets.ModelViewSet):
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=[*sparse_parameters, *keyset_parameters]))
+@method_decorator(name='retrieve', decorator=swagger_auto_schema(manual_parameters=sparse_parameters))
+class PartageViewSet(ServerTimingMixin, KeysetPaginationMixin, ConditionalGetMixin, ResponseCacheMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = Partage.objects.all()
     permission_classes = [IsAuthenticated]
+    conditional_models = [Partage]
+    conditional_action_models = {
+        # Detay yanıtı partaja bağlı öğelerin şirket bilgilerini de içerir
+        'retrieve': [Partage, InsuranceCompanyItem, Company, InsuranceCompany],
+    }
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return PartageDetailSerializer
         return PartageSerializer
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter, *sparse_parameters])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm partajları pagination olmadan döndürür
         """
         partages = Partage.objects.all()
-        serializer = self.get_serializer(partages, many=True)
-        return Response(serializer.data)
+        return self.list_response(partages)
     
     @action(detail=True, methods=['get'])
     def related_companies(self, request, pk=None):
         partage = self.get_object()
-        items = InsuranceCompanyItem.objects.filter(partage=partage)
+        items = InsuranceCompanyItem.objects.filter(partage=partage).select_related('company', 'insurance_company')
         
         companies_data = []
         for item in items:
@@ -516,10 +639,31 @@ class PartageViewSet(viewsets.ModelViewSet):
         
         return Response(companies_data)
 
-class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
+# İstemcinin cookie formatı (update_cookies_bulk, sync_cookies)
+cookie_schema = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'name': openapi.Schema(type=openapi.TYPE_STRING),
+        'value': openapi.Schema(type=openapi.TYPE_STRING),
+        'domain': openapi.Schema(type=openapi.TYPE_STRING),
+        'path': openapi.Schema(type=openapi.TYPE_STRING, default='/'),
+        'expires': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', description='ISO format: 2023-12-31T23:59:59Z'),
+        'creation': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+        'lastAccess': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+        'httpOnly': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False),
+        'secure': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False),
+        'sameSite': openapi.Schema(type=openapi.TYPE_INTEGER, default=0, description='0: None, 1: Lax, 2: Strict'),
+        'priority': openapi.Schema(type=openapi.TYPE_INTEGER, default=0, description='0: Low, 1: Medium, 2: High'),
+    }
+)
+
+@method_decorator(name='list', decorator=swagger_auto_schema(manual_parameters=[*sparse_parameters, *keyset_parameters]))
+@method_decorator(name='retrieve', decorator=swagger_auto_schema(manual_parameters=sparse_parameters))
+class InsuranceCompanyItemViewSet(ServerTimingMixin, KeysetPaginationMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
     queryset = InsuranceCompanyItem.objects.all().order_by('insurance_company__name')
     permission_classes = [AllowAny]
     pagination_class = None
+    conditional_models = [InsuranceCompanyItem, InsuranceCompanyCookie, InsuranceCompany, Partage, Company, QueryType]
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -528,14 +672,14 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
             return InsuranceCompanyItemDetailSerializer
         return InsuranceCompanyItemSerializer
     
+    @swagger_auto_schema(manual_parameters=[stream_parameter, *sparse_parameters])
     @action(detail=False, methods=['get'])
     def all_items_no_pagination(self, request):
         """
         Tüm InsuranceCompanyItem'ları pagination olmadan döndürür
         """
         items = InsuranceCompanyItem.objects.all()
-        serializer = self.get_serializer(items, many=True)
-        return Response(serializer.data)
+        return self.list_response(items)
     
     @action(detail=False, methods=['get'])
     def active_items(self, request):
@@ -602,7 +746,10 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
             return Response([])
         
         # Aynı partaja sahip diğer öğeleri bul
-        related_items = InsuranceCompanyItem.objects.filter(partage=partage).exclude(id=item.id).distinct()
+        related_items = (
+            InsuranceCompanyItem.objects.filter(partage=partage).exclude(id=item.id).distinct()
+            .select_related('company', 'insurance_company')
+        )
         
         # Şirket bilgilerini hazırla
         companies_data = []
@@ -618,9 +765,9 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
                 },
                 'insurance_company_item_id': related_item.id,
                 'partage': {
-                    'id': related_item.partage.id, 
-                    'name': related_item.partage.name, 
-                    'code': related_item.partage.code
+                    'id': partage.id, 
+                    'name': partage.name, 
+                    'code': partage.code
                 }
             }
             companies_data.append(company_data)
@@ -642,35 +789,9 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
         related_items = InsuranceCompanyItem.objects.filter(
             partage=partage,
             insurance_company=insurance_company
-        ).exclude(id=item.id).distinct()
+        ).exclude(id=item.id).select_related('company', 'insurance_company', 'partage')
         
-        # Öğe bilgilerini hazırla
-        items_data = []
-        for related_item in related_items:
-            item_data = {
-                'id': related_item.id,
-                'company': {
-                    'id': related_item.company.id,
-                    'name': related_item.company.name,
-                    'code': related_item.company.code
-                },
-                'insurance_company': {
-                    'id': related_item.insurance_company.id,
-                    'name': related_item.insurance_company.name,
-                    'code': related_item.insurance_company.code
-                },
-                'partage': {
-                    'id': related_item.partage.id, 
-                    'name': related_item.partage.name, 
-                    'code': related_item.partage.code
-                },
-                'is_active': related_item.is_active,
-                'is_proxy_active': related_item.is_proxy_active,
-                'is_car_query': related_item.is_car_query
-            }
-            items_data.append(item_data)
-        
-        return Response(items_data)
+        return Response([sibling_item_data(related_item) for related_item in related_items])
     
     @swagger_auto_schema(
         manual_parameters=[
@@ -793,6 +914,7 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
             updated_count = InsuranceCompanyItem.objects.filter(
                 id__in=item_ids
             ).update(partage=partage)
+            mark_changed(InsuranceCompanyItem)
             
             return Response({
                 "message": f"{updated_count} adet öğe başarıyla güncellendi",
@@ -852,6 +974,49 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['items'],
+            properties={
+                'items': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                    description='Öğe listesi; id içerenler güncellenir, diğerleri oluşturulur. '
+                                'query_types sorgu türü kodlarının listesidir (örn. ["traffic"])'
+                ),
+                'allOrNothing': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False, description='Hatalı satır varsa hiçbir satırı yazma'),
+            },
+        )
+    )
+    @action(detail=False, methods=['post'])
+    def bulk_upsert(self, request):
+        """
+        InsuranceCompanyItem'ları toplu olarak oluşturur/günceller ve satır bazında sonuç döndürür
+        """
+        if isinstance(request.data, list):
+            rows = request.data
+            all_or_nothing = False
+        elif isinstance(request.data, dict):
+            rows = request.data.get('items', [])
+            all_or_nothing = request.data.get('allOrNothing', False)
+        else:
+            return Response({"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(rows, list):
+            return Response({"error": "items must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_BULK_ROWS:
+            return Response({"error": f"At most {MAX_BULK_ROWS} items per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, written = bulk_upsert_items(rows, bool(all_or_nothing))
+        counts = Counter(result['status'] for result in results)
+        return Response({
+            "created_count": counts['created'],
+            "updated_count": counts['updated'],
+            "error_count": counts['error'],
+            "results": results
+        }, status=status.HTTP_200_OK if written or not rows else status.HTTP_400_BAD_REQUEST)
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -859,22 +1024,7 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
             properties={
                 'cookies': openapi.Schema(
                     type=openapi.TYPE_ARRAY,
-                    items=openapi.Schema(
-                        type=openapi.TYPE_OBJECT,
-                        properties={
-                            'name': openapi.Schema(type=openapi.TYPE_STRING),
-                            'value': openapi.Schema(type=openapi.TYPE_STRING),
-                            'domain': openapi.Schema(type=openapi.TYPE_STRING),
-                            'path': openapi.Schema(type=openapi.TYPE_STRING, default='/'),
-                            'expires': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', description='ISO format: 2023-12-31T23:59:59Z'),
-                            'creation': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
-                            'lastAccess': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
-                            'httpOnly': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False),
-                            'secure': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=False),
-                            'sameSite': openapi.Schema(type=openapi.TYPE_INTEGER, default=0, description='0: None, 1: Lax, 2: Strict'),
-                            'priority': openapi.Schema(type=openapi.TYPE_INTEGER, default=0, description='0: Low, 1: Medium, 2: High'),
-                        }
-                    ),
+                    items=cookie_schema,
                     description='Cookie listesi'
                 ),
                 'clearExisting': openapi.Schema(type=openapi.TYPE_BOOLEAN, default=True, description='Mevcut cookie\'leri temizle'),
@@ -887,7 +1037,6 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
         Belirtilen InsuranceCompanyItem'ın cookie'lerini toplu olarak günceller
         """
         item = self.get_object()
-        print(request.data)
         
         # request.data'nın formatını kontrol et
         if isinstance(request.data, list):
@@ -905,112 +1054,13 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
             return Response({"error": "cookies must be a list"}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Mevcut cookie'leri temizle (istenirse)
-            if clear_existing:
-                InsuranceCompanyCookie.objects.filter(insurance_company_item=item).delete()
-            
-            created_cookies = []
-            updated_cookies = []
-            
-            # Eski cookie formatı için string oluştur
-            cookie_strings = []
-            
-            for cookie_data in cookies_data:
-                # C# PascalCase ve Python camelCase field'larını destekle
-                def get_field(data, *field_names):
-                    for field_name in field_names:
-                        if field_name in data:
-                            return data[field_name]
-                    return None
-                
-                # Tarih alanlarını parse et
-                expires = None
-                creation = None
-                last_access = None
-                
-                expires_str = get_field(cookie_data, 'expires', 'Expires')
-                if expires_str:
-                    try:
-                        from datetime import datetime
-                        if expires_str.endswith('Z'):
-                            expires = datetime.fromisoformat(expires_str.replace('Z', '+00:00'))
-                        else:
-                            expires = datetime.fromisoformat(expires_str)
-                    except Exception as e:
-                        print(f"Expires parse error: {e}")
-                        pass
-                
-                creation_str = get_field(cookie_data, 'creation', 'Creation')
-                if creation_str:
-                    try:
-                        if creation_str.endswith('Z'):
-                            creation = datetime.fromisoformat(creation_str.replace('Z', '+00:00'))
-                        else:
-                            creation = datetime.fromisoformat(creation_str)
-                    except Exception as e:
-                        print(f"Creation parse error: {e}")
-                        pass
-                
-                last_access_str = get_field(cookie_data, 'lastAccess', 'LastAccess')
-                if last_access_str:
-                    try:
-                        if last_access_str.endswith('Z'):
-                            last_access = datetime.fromisoformat(last_access_str.replace('Z', '+00:00'))
-                        else:
-                            last_access = datetime.fromisoformat(last_access_str)
-                    except Exception as e:
-                        print(f"LastAccess parse error: {e}")
-                        pass
-                
-                # Field'ları oku
-                name = get_field(cookie_data, 'name', 'Name') or ''
-                value = get_field(cookie_data, 'value', 'Value') or ''
-                domain = get_field(cookie_data, 'domain', 'Domain') or ''
-                path = get_field(cookie_data, 'path', 'Path') or '/'
-                http_only = get_field(cookie_data, 'httpOnly', 'HttpOnly') or False
-                secure = get_field(cookie_data, 'secure', 'Secure') or False
-                same_site = get_field(cookie_data, 'sameSite', 'SameSite') or 0
-                priority = get_field(cookie_data, 'priority', 'Priority') or 0
-                
-                # Eski format için cookie string'e ekle
-                cookie_strings.append(f"{name}={value}")
-                
-                # Yeni tabloya cookie'yi oluştur veya güncelle
-                cookie, created = InsuranceCompanyCookie.objects.update_or_create(
-                    insurance_company_item=item,
-                    name=name,
-                    domain=domain,
-                    defaults={
-                        'value': value,
-                        'path': path,
-                        'expires': expires,
-                        'creation': creation,
-                        'last_access': last_access,
-                        'http_only': http_only,
-                        'secure': secure,
-                        'same_site': same_site,
-                        'priority': priority,
-                    }
-                )
-                
-                # Debug log ekle
-                print(f"Cookie {'created' if created else 'updated'}: {name} for item {item.id}")
-                
-                if created:
-                    created_cookies.append(name)
-                else:
-                    updated_cookies.append(name)
-            
-            # Eski cookie alanını da güncelle
-            if cookie_strings:
-                legacy_cookie_string = "; ".join(cookie_strings)
-                item.cookie = legacy_cookie_string
-                item.save(update_fields=['cookie'])
-                print(f"Legacy cookie updated with {len(cookie_strings)} cookies")
+            # Tüm cookie'ler tek transaction içinde toplu upsert ile yazılır
+            created_cookies, updated_cookies, version = upsert_cookies(item, cookies_data, clear_existing)
             
             return Response({
                 "message": "Cookie'ler başarıyla güncellendi",
                 "item_id": item.id,
+                "version": version,
                 "created_count": len(created_cookies),
                 "updated_count": len(updated_cookies),
                 "created_cookies": created_cookies,
@@ -1020,6 +1070,82 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['baseVersion'],
+            properties={
+                'baseVersion': openapi.Schema(type=openapi.TYPE_INTEGER, description='İstemcinin sahip olduğu cookie jar sürümü'),
+                'cookies': openapi.Schema(type=openapi.TYPE_ARRAY, items=cookie_schema, description='Eklenen ve değişen cookie\'ler'),
+                'removed': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'name': openapi.Schema(type=openapi.TYPE_STRING),
+                            'domain': openapi.Schema(type=openapi.TYPE_STRING),
+                        }
+                    ),
+                    description='Silinen cookie\'ler'
+                ),
+            },
+        )
+    )
+    @action(detail=True, methods=['post'])
+    def sync_cookies(self, request, pk=None):
+        """
+        Belirtilen InsuranceCompanyItem'ın cookie'lerini baseVersion'a göre sadece
+        değişikliklerle günceller. baseVersion güncel değilse 409 döner.
+        """
+        item = self.get_object()
+        if not isinstance(request.data, dict):
+            return Response({"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        base_version = request.data.get('baseVersion')
+        cookies_data = request.data.get('cookies', [])
+        removed_data = request.data.get('removed', [])
+        if not isinstance(base_version, int) or isinstance(base_version, bool) or base_version < 0:
+            return Response({"error": "baseVersion must be a non-negative integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(cookies_data, list) or not isinstance(removed_data, list):
+            return Response({"error": "cookies and removed must be lists"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            version, created_cookies, updated_cookies, removed_cookies = apply_cookie_delta(
+                item, base_version, cookies_data, removed_data
+            )
+        except CookieJarConflict as e:
+            return Response({"error": "baseVersion is stale", "version": e.version}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "item_id": item.id,
+            "version": version,
+            "created_cookies": created_cookies,
+            "updated_cookies": updated_cookies,
+            "removed_cookies": removed_cookies
+        }, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='İstemcinin sahip olduğu cookie jar sürümü', default=0),
+    ])
+    @action(detail=True, methods=['get'])
+    def cookie_changes(self, request, pk=None):
+        """
+        Belirtilen InsuranceCompanyItem'ın since sürümünden sonra eklenen, değişen
+        ve silinen cookie'lerini döndürür
+        """
+        item = self.get_object()
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            since = -1
+        if since < 0:
+            return Response({"error": "since must be a non-negative integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return cookie_changes_response(*cookie_changes(item.pk, since))
+        except CookieJarConflict as e:
+            return Response({"error": "since is ahead of the cookie jar", "version": e.version}, status=status.HTTP_409_CONFLICT)
+
     @action(detail=True, methods=['get'])
     def get_cookies(self, request, pk=None):
         """
@@ -1030,13 +1156,27 @@ class InsuranceCompanyItemViewSet(viewsets.ModelViewSet):
         serializer = InsuranceCompanyCookieSerializer(cookies, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def cookie_jar(self, request, pk=None):
+        """
+        Belirtilen InsuranceCompanyItem'ın cookie'lerini sürümlü, önceden kodlanmış
+        anlık görüntüden tek sorguyla döndürür
+        """
+        row = cookie_jar_queryset(pk).first() if str(pk).isdigit() else None
+        if row is None:
+            # Hiç cookie yazılmamış öğe; öğe yoksa 404
+            item = self.get_object()
+            pk, row = item.pk, (0, '[]', None)
+        return cookie_jar_response(request, pk, *row)
+
     @action(detail=True, methods=['delete'])
     def clear_cookies(self, request, pk=None):
         """
         Belirtilen InsuranceCompanyItem'ın tüm cookie'lerini siler
         """
         item = self.get_object()
-        deleted_count = InsuranceCompanyCookie.objects.filter(insurance_company_item=item).delete()[0]
+        with transaction.atomic(), defer_cookie_jars():
+            deleted_count = InsuranceCompanyCookie.objects.filter(insurance_company_item=item).delete()[0]
         
         return Response({
             "message": "Cookie'ler başarıyla silindi",
@@ -1125,23 +1265,19 @@ def generate_totp(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # InsuranceCompanyItem'dan kullanıcı bilgilerini ara
+        # InsuranceCompanyItem'dan kullanıcı bilgilerini ara (indeksli özet + cache)
         try:
-            insurance_item = InsuranceCompanyItem.objects.get(
-                username=username, 
-                password=password
-            )
+            totp_code = resolve_totp_secret(username, password)
             
             # TOTP secret kontrolü
-            if not insurance_item.totp_code or insurance_item.totp_code.strip() == "":
+            if not totp_code or totp_code.strip() == "":
                 return Response(
                     {"error": "TOTP secret bulunamadı."}, 
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
             
             # TOTP token oluştur
-            totp = pyotp.TOTP(insurance_item.totp_code)
-            token = totp.now()
+            token = get_totp(totp_code).now()
             
             return Response(int(token), status=status.HTTP_200_OK)
             
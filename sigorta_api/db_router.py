@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# İsteğin okumalarının replikaya gidip gidemeyeceği; istek dışında (komutlar,
+# shell) tanımsızdır ve tüm sorgular birincil veritabanına gider
+_current_routing = ContextVar('replica_routing', default=None)
+
+REPLICA_DB_ALIAS = 'replica'
+
+
+class ReplicaRouting:
+    """Bir isteğin yönlendirme durumu; ilk yazmadan sonra okumalar da birincile döner."""
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """
+    Güvenli metotlu (GET/HEAD/OPTIONS) isteklerin okumalarını 'replica' takma adına,
+    diğer tüm sorguları birincil veritabanına yönlendirir. Durum
+    ReplicaRoutingMiddleware tarafından istek başına kurulur. İstek içinde bir yazma
+    olduğunda, açık bir transaction içindeyken ya da use_primary() bloklarında okumalar
+    da birincilden yapılır; böylece istek kendi yazdığını okur.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is None or not routing.use_replica:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _current_routing.get()
+        if routing is not None:
+            routing.use_replica = False
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika birincilin kopyası olduğu için iki takma addaki nesneler ilişkilendirilebilir
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_primary():
+    """
+    Bloktaki okumaları birincil veritabanına yönlendirir. Uzun süre cache'te tutulan
+    değerler (yetkiler, TOTP secret'ları, token'lar) replika gecikmesi yüzünden eski
+    veriyle doldurulmasın diye kullanılır.
+    """
+    routing = _current_routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+    routing.use_replica = False
+    try:
+        yield
+    finally:
+        routing.use_replica = not routing.wrote
+
+
+def pin_primary():
+    """İsteğin kalan okumalarını birincil veritabanına sabitler."""
+    routing = _current_routing.get()
+    if routing is not None:
+        routing.use_replica = False
+
+
+def is_replica_enabled():
+    return settings.DB_REPLICA_ENABLED and REPLICA_DB_ALIAS in settings.DATABASES
@@ -0,0 +1,52 @@
+"""
+Production gunicorn profili:
+
+    gunicorn -c python:sigorta_api.gunicorn_conf sigorta_api.wsgi:application
+
+Uygulama fork öncesi ana süreçte yüklenir ve ısıtılır (sigorta_api.warmup);
+worker'lar hazır modülleri, URL çözümleyicisini ve serializer/model meta
+verisini devralır, fork sonrası sadece veritabanı bağlantısını açar. Worker'lar
+max_requests (+ jitter) sonrasında sırayla yeniden başlatılır; bellek
+sızıntıları sınırlanır ve tüm worker'lar aynı anda yenilenmez.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 3))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+preload_app = True
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+
+def when_ready(server):
+    # preload_app ile uygulama yüklendikten sonra, ilk fork'tan önce çalışır
+    from sigorta_api.warmup import warm_up
+    warm_up()
+
+
+def post_fork(server, worker):
+    from sigorta_api.warmup import warm_up_connections
+    warm_up_connections()
+    # COOKIE_SWEEP_INTERVAL > 0 ise süresi dolan cookie'ler worker içinde temizlenir
+    from api.cookie_sweeper import start_sweeper
+    start_sweeper()
+
+
+def worker_exit(server, worker):
+    # Worker içinde, çıkmadan önce son metrikler dosyaya yazılır
+    from sigorta_api.metrics import store
+    store.flush()
+    # Toplu kullanıcı oluşturmada açılan şifre hash havuzu kapatılır
+    from api.password_pool import shutdown_pool
+    shutdown_pool()
+
+
+def child_exit(server, worker):
+    # Sonlanan worker'ın metrik dosyası arşive eklenir
+    from sigorta_api.metrics import store
+    store.archive(worker.pid)
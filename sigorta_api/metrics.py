@@ -0,0 +1,248 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse
+
+# Ad -> (tür, açıklama, histogram sınırları)
+METRICS = {
+    'http_requests_total': (
+        'counter', "Görünüm, metod ve durum koduna göre istek sayısı", None
+    ),
+    'http_request_duration_seconds': (
+        'histogram', "Görünüm bazında istek süresi (saniye)",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    ),
+    'http_request_queries': (
+        'histogram', "Görünüm bazında istek başına veritabanı sorgusu",
+        (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+    ),
+    'http_response_size_bytes': (
+        'histogram', "Görünüm bazında yanıt boyutu (byte, streaming yanıtlar hariç)",
+        (100, 1000, 10000, 100000, 1000000, 10000000)
+    ),
+    'cache_requests_total': (
+        'counter', "Uygulama cache'lerinde isabet (hit) ve ıskalama (miss) sayısı", None
+    ),
+    'cookie_sweep_deleted_total': (
+        'counter', "Süresi dolduğu için silinen cookie sayısı", None
+    ),
+    'cookie_sweep_bytes_total': (
+        'counter', "Silinen cookie'lerin yaklaşık metin boyutu (byte)", None
+    ),
+}
+
+
+class MetricsStore:
+    """
+    Süreç içi metrik deposu. Kayıtlar sadece bellekteki sözlükleri günceller;
+    her süreç birikmiş değerleri METRICS_FLUSH_INTERVAL saniyede bir METRICS_DIR
+    altındaki kendi dosyasına (pid bazında) atomik olarak yazar. Okuma sırasında
+    tüm süreçlerin dosyaları toplanır; böylece gunicorn worker'ları arasında kilit
+    gerekmeden doğru toplam elde edilir. Worker yeniden başlasa da eski dosyası
+    kaldığı için sayaçlar geriye gitmez.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def path(self):
+        return os.path.join(settings.METRICS_DIR, f'{self.pid}.json')
+
+    def check_fork(self):
+        # preload ile fork edilen worker'lar ana sürecin değerlerini devralmamalı
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self.lock:
+            self.check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Sınır başına (kümülatif olmayan) sayılar, son eleman +Inf; ardından toplam ve adet
+                histogram = self.histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.check_fork()
+            payload = serialize(self.counters, self.histograms)
+            self.last_flush = time.monotonic()
+        write_payload(self.path(), payload)
+
+    def collect(self):
+        """Bu sürecin değerlerini yazıp tüm süreçlerin dosyalarını toplar."""
+        self.flush()
+        directory = settings.METRICS_DIR
+        archive = read_payload(os.path.join(directory, ARCHIVE_NAME)) or {}
+        archived = {f'{pid}.json' for pid in archive.get('merged', [])}
+        payloads = [
+            payload for path in glob.glob(os.path.join(directory, '*.json'))
+            if os.path.basename(path) not in archived and (payload := read_payload(path)) is not None
+        ]
+        return merge(payloads)
+
+    def archive(self, pid):
+        """
+        Sonlanan worker'ın dosyasını arşive ekleyip siler; max_requests ile yeniden
+        başlatılan worker'lar dosya biriktirmez ve sayaçlar geriye gitmez. Arşiv önce
+        yazılır ve worker'ı 'merged' listesinde tutar, böylece dosya silinene kadar
+        okuyan bir worker aynı değerleri iki kez saymaz. gunicorn ana sürecinde çağrılır.
+        """
+        directory = settings.METRICS_DIR
+        worker_path = os.path.join(directory, f'{pid}.json')
+        payload = read_payload(worker_path)
+        if payload is None:
+            return
+        archive_path = os.path.join(directory, ARCHIVE_NAME)
+        archive = read_payload(archive_path) or {}
+        merged = serialize(*merge([archive, payload]))
+        merged['merged'] = [
+            previous for previous in archive.get('merged', [])
+            if os.path.exists(os.path.join(directory, f'{previous}.json'))
+        ] + [pid]
+        write_payload(archive_path, merged)
+        os.remove(worker_path)
+
+
+ARCHIVE_NAME = 'archive.json'
+
+
+def serialize(counters, histograms):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), buckets, total, count]
+            for (name, labels), (buckets, total, count) in histograms.items()
+        ],
+    }
+
+
+def merge(payloads):
+    counters, histograms = {}, {}
+    for payload in payloads:
+        for name, labels, value in payload.get('counters', []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, total, count in payload.get('histograms', []):
+            key = (name, tuple(map(tuple, labels)))
+            current = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            current[0] = [a + b for a, b in zip(current[0], buckets)]
+            current[1] += total
+            current[2] += count
+    return counters, histograms
+
+
+def read_payload(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_payload(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(payload, file)
+    os.replace(temporary, path)
+
+
+store = MetricsStore()
+
+
+def record_request(view, method, status, duration, queries, size):
+    labels = (('view', view), ('method', method))
+    store.inc('http_requests_total', labels + (('status', str(status)),))
+    store.observe('http_request_duration_seconds', labels, duration)
+    store.observe('http_request_queries', labels, queries)
+    if size is not None:
+        store.observe('http_response_size_bytes', labels, size)
+    store.maybe_flush()
+
+
+def record_cache(name, hit):
+    """Uygulama cache'lerinin isabet oranı için her okumada çağrılır."""
+    if settings.METRICS_ENABLED:
+        store.inc('cache_requests_total', (('cache', name), ('result', 'hit' if hit else 'miss')))
+
+
+def record_cookie_sweep(rows, size):
+    if settings.METRICS_ENABLED:
+        store.inc('cookie_sweep_deleted_total', (), rows)
+        store.inc('cookie_sweep_bytes_total', (), size)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """Toplanan metrikleri Prometheus metin formatında döndürür."""
+    counters, histograms = store.collect()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+            continue
+        for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Tüm worker'ların metriklerini Prometheus metin formatında döndürür.
+    METRICS_TOKEN tanımlıysa Authorization: Bearer <token> başlığı gerekir.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
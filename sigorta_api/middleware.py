@@ -1,7 +1,32 @@
+import json
+import logging
+import random
 import re
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.utils.deprecation import MiddlewareMixin
 
+from .db_router import _current_routing, ReplicaRouting, is_replica_enabled
+from .metrics import record_request
+
+timing_logger = logging.getLogger('sigorta_api.timing')
+query_logger = logging.getLogger('sigorta_api.queries')
+
+# Örneklenen isteğin ölçümleri ve sorgu kaydı; async view'larda sync_to_async
+# thread'lerine de taşınır
+_current_timings = ContextVar('request_timings', default=None)
+_current_capture = ContextVar('query_capture', default=None)
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
 class CSRFExemptMiddleware(MiddlewareMixin):
     def process_request(self, request):
         if hasattr(settings, 'CSRF_EXEMPT_URLS'):
@@ -9,4 +34,423 @@ class CSRFExemptMiddleware(MiddlewareMixin):
                 if re.match(url, request.path_info):
                     setattr(request, '_dont_enforce_csrf_checks', True)
                     break
-        return None 
\ No newline at end of file
+        return None
+
+
+class RequestTimings:
+    """Bir isteğin DB, serialize ve render sürelerini (saniye) toplar."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        self.query_count = 0
+        self.depth = {}
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+@contextmanager
+def timed(metric):
+    """
+    Bloğun süresini örneklenen isteğin ilgili ölçümüne ekler. İç içe çağrılarda
+    (ör. serializer içinde başka bir serializer'ın .data'sı) sadece en dıştaki sayılır.
+    """
+    timings = _current_timings.get()
+    if timings is None or timings.depth.get(metric):
+        yield
+        return
+    timings.depth[metric] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[metric] += time.perf_counter() - started
+        timings.depth[metric] = 0
+
+
+def timing_checkpoint():
+    """Örneklenen istekte o anki zaman ve toplam DB süresi; örneklenmiyorsa None."""
+    timings = _current_timings.get()
+    if timings is None:
+        return None
+    return time.perf_counter(), timings.durations['db']
+
+
+def add_elapsed(metric, checkpoint):
+    """checkpoint'ten bu yana veritabanı dışında geçen süreyi ilgili ölçüme ekler."""
+    timings = _current_timings.get()
+    if checkpoint is None or timings is None:
+        return
+    started, db = checkpoint
+    elapsed = time.perf_counter() - started - (timings.durations['db'] - db)
+    timings.durations[metric] += max(elapsed, 0.0)
+
+
+def time_query(execute, sql, params, many, context):
+    """Tüm bağlantılara eklenen execute wrapper; sadece örneklenen isteklerde ölçer."""
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.durations['db'] += time.perf_counter() - started
+        timings.query_count += 1
+
+
+class DuplicateQueryError(Exception):
+    """Sıkı modda aynı biçimdeki sorgu eşik kadar tekrarlandığında fırlatılır."""
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Parametre, sabit ve IN listesi uzunluğu farklarını atarak sorgunun biçimini döndürür."""
+    sql = _STRING_LITERAL.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site(limit=6):
+    """Sorguyu tetikleyen proje içi çağrı zincirinin son adımları (Django ve DRF hariç)."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return [f"{frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}" for frame in frames[-limit:]]
+
+
+class QueryCapture:
+    """Bir istekte çalışan sorguları normalize edilmiş biçimlerine göre gruplar."""
+
+    def __init__(self):
+        self.shapes = Counter()
+        self.call_sites = {}
+
+    def record(self, alias, sql):
+        shape = (alias, normalize_sql(sql))
+        self.shapes[shape] += 1
+        # Çağrı zinciri sadece biçimin ilk tekrarında alınır; döngü içindeki satırı gösterir
+        if self.shapes[shape] == 2:
+            self.call_sites[shape] = call_site()
+
+    def duplicates(self, threshold):
+        return [
+            {
+                'database': alias,
+                'sql': sql,
+                'count': count,
+                'call_site': self.call_sites.get((alias, sql), []),
+            }
+            for (alias, sql), count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def capture_query(execute, sql, params, many, context):
+    """Tüm bağlantılara eklenen execute wrapper; sadece örneklenen isteklerde kaydeder."""
+    capture = _current_capture.get()
+    if capture is not None:
+        capture.record(context['connection'].alias, sql)
+    return execute(sql, params, many, context)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'query_count')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+
+
+def count_query(execute, sql, params, many, context):
+    """Tüm bağlantılara eklenen execute wrapper; metrikler için sorgu sayısını tutar."""
+    request_metrics = _current_metrics.get()
+    if request_metrics is not None:
+        request_metrics.query_count += 1
+    return execute(sql, params, many, context)
+
+
+QUERY_WRAPPERS = (time_query, capture_query, count_query)
+
+
+def install_query_wrappers(connection, **kwargs):
+    for wrapper in QUERY_WRAPPERS:
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+connection_created.connect(install_query_wrappers, dispatch_uid='request-query-wrappers')
+
+
+class SampledMiddleware:
+    """
+    İsteklerin sample_rate_setting oranındaki kısmı için start() ile bir durum
+    nesnesi oluşturup istek boyunca context ContextVar'ında tutar ve yanıtı
+    finish() ile işler. Sync ve async stack'lerde çalışır.
+    """
+    sync_capable = True
+    async_capable = True
+    sample_rate_setting = None
+    context = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_sample_rate(self):
+        return getattr(settings, self.sample_rate_setting)
+
+    def is_sampled(self):
+        sample_rate = self.get_sample_rate()
+        return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+    def begin(self, request):
+        if not self.is_sampled():
+            return None
+        # Middleware yüklenmeden önce açılmış bağlantılar da ölçülsün
+        for connection in connections.all(initialized_only=True):
+            install_query_wrappers(connection)
+        return self.start(request)
+
+    def start(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, state):
+        raise NotImplementedError
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.begin(request)
+        if state is None:
+            return self.get_response(request)
+        token = self.context.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.context.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.begin(request)
+        if state is None:
+            return await self.get_response(request)
+        token = self.context.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.context.reset(token)
+        return self.finish(request, response, state)
+
+
+class ServerTimingMiddleware(SampledMiddleware):
+    """
+    İsteklerin bir kısmını (SERVER_TIMING_SAMPLE_RATE) örnekleyerek DB süresi ve
+    sorgu sayısını, serialize, render ve toplam süreyi ölçer. Sonuçlar
+    Server-Timing başlığı ve JSON formatında log satırı olarak yazılır.
+    Stack'in en başında yer alır; toplam süre diğer middleware'leri de kapsar.
+    """
+    sample_rate_setting = 'SERVER_TIMING_SAMPLE_RATE'
+    context = _current_timings
+
+    def start(self, request):
+        return RequestTimings()
+
+    def finish(self, request, response, timings):
+        total = timings.total()
+        durations = timings.durations
+        metrics = [
+            f'db;dur={durations["db"] * 1000:.2f};desc="{timings.query_count} queries"',
+            f'serialize;dur={durations["serialize"] * 1000:.2f}',
+            f'render;dur={durations["render"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ", ".join(([existing] if existing else []) + metrics)
+
+        timing_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'db_ms': round(durations['db'] * 1000, 2),
+            'queries': timings.query_count,
+            'serialize_ms': round(durations['serialize'] * 1000, 2),
+            'render_ms': round(durations['render'] * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = getattr(match.func, 'cls', match.func)
+    name = f"{view.__module__}.{view.__qualname__}"
+    actions = getattr(match.func, 'actions', None)
+    if actions:
+        return f"{name}.{actions.get(request.method.lower(), '')}".rstrip('.')
+    return name
+
+
+class DuplicateQueryMiddleware(SampledMiddleware):
+    """
+    Örneklenen isteklerde (DUPLICATE_QUERY_SAMPLE_RATE) çalışan SQL'i biçimine göre
+    gruplar; aynı biçim DUPLICATE_QUERY_THRESHOLD kez veya daha fazla tekrarlanırsa
+    (N+1) görünüm ve çağrı zinciriyle birlikte uyarı log'u yazar.
+    DUPLICATE_QUERY_STRICT açıkken her istek incelenir ve DuplicateQueryError
+    fırlatılır; testlerde yeni N+1'lerin yakalanması için kullanılır.
+    Streaming yanıtların içerik okunurken yaptığı sorgular kapsam dışındadır.
+    """
+    sample_rate_setting = 'DUPLICATE_QUERY_SAMPLE_RATE'
+    context = _current_capture
+
+    def get_sample_rate(self):
+        return 1.0 if settings.DUPLICATE_QUERY_STRICT else super().get_sample_rate()
+
+    def start(self, request):
+        return QueryCapture()
+
+    def finish(self, request, response, capture):
+        duplicates = capture.duplicates(settings.DUPLICATE_QUERY_THRESHOLD)
+        if not duplicates:
+            return response
+
+        report = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name(request),
+            'queries': sum(capture.shapes.values()),
+            'duplicates': duplicates,
+        }
+        query_logger.warning(json.dumps(report, ensure_ascii=False))
+        if settings.DUPLICATE_QUERY_STRICT:
+            raise DuplicateQueryError(
+                f"{report['view']} ({request.method} {request.path}) tekrarlanan sorgular içeriyor:\n" +
+                "\n".join(
+                    f"{duplicate['count']}x {duplicate['sql']}\n    " + "\n    ".join(duplicate['call_site'])
+                    for duplicate in duplicates
+                )
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    METRICS_ENABLED açıkken her isteğin görünüm bazında süresini, sorgu sayısını,
+    yanıt boyutunu ve durum kodunu sigorta_api.metrics deposuna kaydeder.
+    Örnekleme yapmaz; kapalıyken isteğe dokunmaz. Stack'in en başında yer alır.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        # Middleware yüklenmeden önce açılmış bağlantılar da sayılsın; sonradan
+        # açılanlara wrapper'lar connection_created ile eklenir
+        for connection in connections.all(initialized_only=True):
+            install_query_wrappers(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        request_metrics = RequestMetrics()
+        token = _current_metrics.set(request_metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        request_metrics = RequestMetrics()
+        token = _current_metrics.set(request_metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response, request_metrics)
+
+    def record(self, request, response, request_metrics):
+        record_request(
+            view=view_name(request) or 'unmatched',
+            method=request.method,
+            status=response.status_code,
+            duration=time.perf_counter() - request_metrics.started,
+            queries=request_metrics.query_count,
+            size=None if response.streaming else len(response.content),
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Okuma replikası etkinken (DB_REPLICA_ENABLED) isteğin yönlendirme durumunu kurar:
+    güvenli metotlu isteklerin okumaları replikaya gider. Yazma yapan ya da güvenli
+    olmayan metotlu bir istekten sonra istemci, DB_REPLICA_PIN_SECONDS boyunca bir
+    cookie ile birincil veritabanına sabitlenir; replika gecikmesi olsa da kendi
+    yazdığını okur. Doğruluk gerektirdiği için örneklenmez; her istekte çalışır.
+    """
+    sync_capable = True
+    async_capable = True
+    pin_cookie_name = 'db_primary_pin'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_replica_enabled():
+            return self.get_response(request)
+        routing = self.get_routing(request)
+        token = _current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.pin_primary(request, response, routing)
+
+    async def __acall__(self, request):
+        if not is_replica_enabled():
+            return await self.get_response(request)
+        routing = self.get_routing(request)
+        token = _current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_routing.reset(token)
+        return self.pin_primary(request, response, routing)
+
+    def get_routing(self, request):
+        pinned = self.pin_cookie_name in request.COOKIES
+        return ReplicaRouting(use_replica=request.method in self.safe_methods and not pinned)
+
+    def pin_primary(self, request, response, routing):
+        if routing.wrote or request.method not in self.safe_methods:
+            response.set_cookie(
+                self.pin_cookie_name, '1',
+                max_age=settings.DB_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
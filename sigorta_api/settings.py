@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "sigorta_api.middleware.MetricsMiddleware",  # /metrics için istek metrikleri (en dışta)
+    "sigorta_api.middleware.ServerTimingMiddleware",  # Server-Timing ölçümleri
+    "sigorta_api.middleware.DuplicateQueryMiddleware",  # Tekrarlanan sorgu (N+1) tespiti
+    "sigorta_api.middleware.ReplicaRoutingMiddleware",  # Okumaları replikaya yönlendirme
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # CORS middleware
@@ -130,14 +135,145 @@ if os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_DB'):
             "PORT": os.environ.get("DB_PORT", "5432"),
         }
     }
+
+    # Bağlantıların yeniden kullanımı. DB_POOL=True ise psycopg 3 bağlantı havuzu
+    # (worker başına DB_POOL_MIN_SIZE-DB_POOL_MAX_SIZE bağlantı) kullanılır; aksi halde
+    # bağlantılar DB_CONN_MAX_AGE saniye açık tutulur ve her istekte ilk kullanımdan
+    # önce sağlık kontrolü yapılır. ASGI altında kalıcı bağlantılar yerine havuz tercih edilmelidir.
+    if os.environ.get("DB_POOL", "False") == "True":
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+                "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 4)),
+                "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            },
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+    # DB_REPLICA_HOST verilirse okuma replikası aynı kimlik bilgileriyle tanımlanır
+    if os.environ.get("DB_REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.environ.get("DB_REPLICA_HOST"),
+            "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+        },
+        # Yerel denemeler ve testler için aynı dosyayı gösteren replika takma adı;
+        # yönlendirme sadece DB_REPLICA_ENABLED=True ise yapılır
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "TEST": {"MIRROR": "default"},
+        },
+    }
+
+# Güvenli metotlu isteklerin okumaları 'replica' takma adına yönlendirilir (sigorta_api.db_router).
+# Yazma yapan istemci DB_REPLICA_PIN_SECONDS boyunca birincil veritabanından okur.
+DB_REPLICA_ENABLED = os.environ.get("DB_REPLICA_ENABLED", str(bool(os.environ.get("DB_REPLICA_HOST")))) == "True"
+DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+DATABASE_ROUTERS = ["sigorta_api.db_router.ReplicaRouter"] if DB_REPLICA_ENABLED else []
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Birden fazla worker çalışırken geçersiz kılmaların tüm worker'lara ulaşması
+# için REDIS_URL ile paylaşılan bir cache kullanılmalıdır
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         }
     }
 
+# LocMem cache süreç başınadır: bir worker'daki geçersiz kılma diğer worker'lara
+# ulaşmaz. Bu durumda iptal edilmesi güvenlik gerektiren cache'ler (token, TOTP secret,
+# yetkiler) kapatılır.
+CACHE_IS_SHARED = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Kullanıcı yetki yapısının önbellekte tutulma süresi (saniye); sadece CACHE_IS_SHARED ise kullanılır
+PERMISSION_CACHE_TIMEOUT = int(os.environ.get("PERMISSION_CACHE_TIMEOUT", 300))
+
+# Çözümlenmiş token'ların (kullanıcı, şirket kullanıcısı, şirket) cache süresi (saniye);
+# sadece CACHE_IS_SHARED ise kullanılır
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get("AUTH_TOKEN_CACHE_TIMEOUT", 60))
+
+# generate_totp için çözümlenmiş TOTP secret'larının cache süresi (saniye);
+# sadece CACHE_IS_SHARED ise kullanılır
+TOTP_CACHE_TIMEOUT = int(os.environ.get("TOTP_CACHE_TIMEOUT", 3600))
+
+# Referans verisi uçlarının (sorgu türleri, roller, sigorta şirketleri, partajlar)
+# cache'lenmiş yanıtlarının süresi (saniye); yazma işlemleri yanıtları sinyallerle geçersiz kılar
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 3600))
+
+# Server-Timing başlığı ve zamanlama log'u yazılacak isteklerin oranı (0-1)
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get("SERVER_TIMING_SAMPLE_RATE", 0.05))
+
+# Tekrarlanan sorgu (N+1) tespiti: incelenecek isteklerin oranı, aynı biçimdeki
+# sorgunun kaç tekrardan sonra raporlanacağı ve raporlamak yerine hata fırlatılması
+DUPLICATE_QUERY_SAMPLE_RATE = float(os.environ.get("DUPLICATE_QUERY_SAMPLE_RATE", 0.01))
+DUPLICATE_QUERY_THRESHOLD = int(os.environ.get("DUPLICATE_QUERY_THRESHOLD", 5))
+DUPLICATE_QUERY_STRICT = os.environ.get("DUPLICATE_QUERY_STRICT", "False") == "True"
+
+# /metrics için istek ve cache metrikleri. Her worker değerlerini METRICS_DIR altındaki
+# kendi dosyasına METRICS_FLUSH_INTERVAL saniyede bir yazar; uç nokta tüm dosyaları toplar.
+# METRICS_TOKEN verilirse uç nokta Authorization: Bearer <token> ister.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(tempfile.gettempdir(), "sigorta_api_metrics"))
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Süresi dolan cookie'lerin temizliği (api.cookie_sweeper). COOKIE_SWEEP_INTERVAL > 0 ise
+# gunicorn worker'ları bu aralıkla süreç içinde temizlik yapar; PostgreSQL advisory lock
+# ile aynı anda tek bir worker çalışır. Silme COOKIE_SWEEP_BATCH_SIZE satırlık transaction'larla yapılır.
+COOKIE_SWEEP_INTERVAL = int(os.environ.get("COOKIE_SWEEP_INTERVAL", 0))
+COOKIE_SWEEP_BATCH_SIZE = int(os.environ.get("COOKIE_SWEEP_BATCH_SIZE", 500))
+
+# bulk_provision isteklerinde şifre hash'lerinin hesaplandığı süreç sayısı. Varsayılan 1:
+# hash'ler istek iş parçacığında hesaplanır ve gunicorn worker'ları ek süreç açmaz.
+# Büyük içe aktarımlar için havuzu kullanan provision_company_users komutu tercih edilmelidir.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 1))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "sigorta_api.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get("SERVER_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "sigorta_api.queries": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Kullanıcı, şirket kullanıcısı, şirket ve token'ı tek sorguda yükleyen ModelBackend
+AUTHENTICATION_BACKENDS = ["api.backends.CompanyUserBackend"]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -191,14 +327,14 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.instrumentation.TimedJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
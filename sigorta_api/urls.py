@@ -21,6 +21,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .metrics import metrics_view
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Sigorta API",
@@ -37,6 +39,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/v1/', include('api.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     
     # Swagger/OpenAPI dokümantasyonu
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
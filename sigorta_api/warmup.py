@@ -0,0 +1,107 @@
+import importlib
+import logging
+import time
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver, resolve, Resolver404
+from django.test import RequestFactory
+
+logger = logging.getLogger('sigorta_api.warmup')
+
+# İlk istekte tembel olarak yüklenen ağır modüller
+WARM_MODULES = (
+    'api.views',
+    'api.async_views',
+    'api.serializers',
+    'drf_yasg.views',
+    'drf_yasg.generators',
+    'pyotp',
+    'rest_framework.authtoken.views',
+)
+
+# Çözümleyicinin ön belleğini ısıtmak için çözülen örnek adresler
+WARM_PATHS = (
+    '/api/v1/',
+    '/api/v1/insurance-company-items/',
+    '/api/v1/insurance-company-items/1/',
+    '/api/v1/insurance-company-items/1/get_cookies/',
+    '/api/v1/insurance-company-items/1/cookie_jar/',
+    '/api/v1/insurance-company-items/active_items/',
+    '/api/v1/login/',
+    '/api/v1/totp/',
+    '/api/v1/async/insurance-company-items/1/',
+    '/metrics/',
+)
+
+
+def warm_imports():
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def warm_models():
+    """Model meta verisi (alanlar, ters ilişkiler) ilk erişimde hesaplanıp saklanır."""
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.related_objects
+
+
+def warm_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for path in WARM_PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            pass
+
+
+def router_viewsets():
+    from api.urls import router
+    return [viewset for _, viewset, _ in router.registry]
+
+
+def warm_serializers():
+    """
+    Tüm ViewSet'lerin aksiyonları için serializer alanlarını bir kez oluşturur.
+    ModelSerializer alanları her örnekte yeniden kurulur; ilk kurulum alan
+    eşlemelerini, doğrulayıcıları ve model meta verisini ısıtır.
+    """
+    request = RequestFactory().get('/')
+    for viewset in router_viewsets():
+        actions = ['list', 'retrieve'] + [extra.__name__ for extra in viewset.get_extra_actions()]
+        for action in actions:
+            view = viewset(action=action, request=request, format_kwarg=None, kwargs={})
+            try:
+                serializer_class = view.get_serializer_class()
+            except Exception:
+                # Isıtma en iyi çabadır; isteğe bağlı seçim yapan bir görünüm açılışı engellememeli
+                continue
+            serializer_class(context={}).fields
+
+
+def warm_up():
+    """
+    Fork öncesi (gunicorn preload) ana süreçte çalışır: modülleri, URL
+    çözümleyicisini, model meta verisini ve serializer alanlarını hazırlar.
+    Fork edilen worker'lar bu hali copy-on-write olarak devralır. Veritabanı
+    bağlantısı açılmaz; soketler worker'lar arasında paylaşılmamalıdır.
+    """
+    started = time.perf_counter()
+    warm_imports()
+    warm_models()
+    warm_urls()
+    warm_serializers()
+    connections.close_all()
+    logger.info("Uygulama ısıtıldı (%.1f ms)", (time.perf_counter() - started) * 1000)
+
+
+def warm_up_connections():
+    """
+    Fork sonrası worker içinde çalışır ve veritabanı bağlantılarını açar.
+    Kalıcı bağlantılarda (CONN_MAX_AGE > 0) bağlantı, havuz açıksa worker'ın
+    kendi havuzu ilk istekte hazırdır; aksi halde sadece sürücü hazırlanmış olur.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()